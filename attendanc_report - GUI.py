@@ -4,13 +4,21 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
+from collections import namedtuple
 from datetime import datetime, timedelta
+import queue
+import threading
 import time
-import os
-import random # added for some unpredictability
+
+from batch_submit import run_batched_submit
+from browser_profile import LEAN_ARGUMENTS, prepare_profile, prune_profile
+from browser_watchdog import BrowserWatchdog, reap_orphans
+from date_planner import is_workday, load_exceptions
+from driver_cache import cached_driver_path
+from page_scripts import CALENDAR_JS
+from wait_engine import WaitEngine
 
 
 # global timeout values
@@ -18,39 +26,119 @@ SMALL_TIMEOUT = 2.5  # inconsistent decimal value
 BIG_TIMEOUT = 11     # slightly odd number
 
 # Some globals - not ideal but realistic for quick scripts
-success_count = 0
-fail_count = 0
 browser = None  # will be set later
 
+# progress events that run_all puts on bot.events - a front-end just polls the queue
+DateStarted = namedtuple('DateStarted', 'date')
+StrategyTried = namedtuple('StrategyTried', 'date strategy worked')
+StepCompleted = namedtuple('StepCompleted', 'date step')
+DateDone = namedtuple('DateDone', 'date ok status')
+RunFinished = namedtuple('RunFinished', 'result')
+
+
+class Cancelled(Exception):
+    '''raised between steps once cancel() was called'''
+
+
+class RunResult:
+    '''what one run_all did - used to live in the success_count/fail_count globals'''
+    def __init__(self):
+        self.success_count = 0
+        self.fail_count = 0
+        self.dates = {}  # date -> 'reported' / 'report failed' / 'not selectable'
+        self.cancelled = False
+        self.error = None
+
+    def add(self, day, status):
+        self.dates[day] = status
+        if status == 'reported':
+            self.success_count += 1
+        else:
+            self.fail_count += 1
+
+# one JS pass over the calendar instead of probing every day with xpaths
+# returns {signature, cells: [{day, element, disabled, reported}]}
+CAL_SCAN_JS = CALENDAR_JS + """
+if (arguments[0]) return calendarSignature(calendarRoot());  // only the signature was asked for
+var days = dayCells(false);
+var out = [];
+for (var k in days) out.push(days[k]);
+return {signature: calendarSignature(calendarRoot()), cells: out};
+"""
+
 
 class myReportBot:
     '''simple bot to report attendance'''
-    def __init__(self):
+    def __init__(self, humanize=False, step_waits=None, batch_clicks=False, headless=False,
+                 site_url="https://one.prat.idf.il/finish", chrome_folder=None):
+        # humanize=True brings back the random pauses between clicks
+        # batch_clicks=True does all 4 report buttons in one js call
+        # site_url / chrome_folder are mostly for pointing it at mock_site.py
         # Set up the browser with my prefs
+        t0 = time.monotonic()
         my_options = Options()
-        chrome_folder = os.path.expanduser('~') + r'\AppData\Local\Google\Chrome\User Data'
-        my_options.add_argument(f'user-data-dir={chrome_folder}')
+        # own little profile (seeded from the everyday one) so an open Chrome doesn't break us anymore
+        self.chrome_folder = chrome_folder or prepare_profile()
+        self.lean_profile = chrome_folder is None  # only our own profile gets pruned
+        my_options.add_argument(f'user-data-dir={self.chrome_folder}')
         my_options.add_argument('--profile-directory=Default')
+        for arg in LEAN_ARGUMENTS:
+            my_options.add_argument(arg)
+        if headless:  # finally, for background running
+            my_options.add_argument("--headless")
+            my_options.add_argument("--disable-gpu")
+            my_options.add_argument("--no-sandbox")
+        self.site_url = site_url
         
-        # some personal todo comments left in the code
-        # TODO: add headless option for background running
-        # FIXME: sometimes this breaks if Chrome is already open
-        
+        reap_orphans(self.chrome_folder)  # chrome left over from a crashed run would lock the profile
         global browser
         browser = webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()),
+            service=ChromeService(cached_driver_path()),  # no network check unless chrome got updated
             options=my_options
         )
+        self.t0 = t0
+        print(f"browser up after {time.monotonic() - t0:.2f}s")
         self.driver = browser  # redundant assignment, common in real code
+        self.watchdog = BrowserWatchdog()
+        self.watchdog.attach(self.driver)
         self._wait = WebDriverWait(self.driver, BIG_TIMEOUT)  # underscore prefix inconsistently used
+        self.waits = WaitEngine(self.driver, step_waits, humanize)  # real waits instead of sleeps
+        self.batch_clicks = batch_clicks
+        self.days_map = None  # day number -> calendar cell, filled by scan_calendar
+        self._days_sig = None
+        self.holidays = load_exceptions()  # days off / extra workdays from holidays.txt
+        # for running in the background (start_in_background / cancel)
+        self.events = queue.Queue()
+        self.stop_asked = threading.Event()
+        self.result = RunResult()
+        self.worker = None
+        self.current_date = None
         print("Got the browser running!")
 
+    def emit(self, event):
+        self.events.put(event)
+
+    def check_cancel(self):
+        if self.stop_asked.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        # cooperative - the run stops before its next step and still closes the browser
+        self.stop_asked.set()
+
+    def start_in_background(self):
+        # run_all on a worker thread so the caller (a GUI) doesn't freeze
+        self.stop_asked.clear()
+        self.worker = threading.Thread(target=self.run_all, name='report-bot', daemon=True)
+        self.worker.start()
+        return self.worker
+
     def go_to_website(self):
-        # Random sleep timings that vary slightly - more human-like
         try:
-            self.driver.get("https://one.prat.idf.il/finish")
-            time.sleep(2 + random.random())  # sleep between 2-3 seconds
-            print("Got to the website ok")
+            self.driver.get(self.site_url)
+            self.waits.page_ready('navigate')
+            print(f"Got to the website ok ({time.monotonic() - self.t0:.2f}s since start)")
+            self.waits.human_pause()  # only does something in humanize mode
             return True
         except Exception as e:
             print(f"Crap, website error: {e}")
@@ -66,18 +154,74 @@ class myReportBot:
             )
             future_btn.click()
             
-            # Some hard-coded sleep values rather than waits - common in real code
-            time.sleep(1.8)
+            self.waits.settled('future_reports')
             print("Found the future reports button!")
+            self.scan_calendar()
             return True
         except Exception as e:
             print(f"Couldn't find future button: {e}")
             return False
 
+    def scan_calendar(self):
+        # one round trip - grab every day cell at once
+        try:
+            res = self.driver.execute_script(CAL_SCAN_JS, False) or {}
+        except Exception as e:
+            print(f"calendar scan blew up: {e}")
+            res = {}
+        self.days_map = {int(c['day']): c for c in res.get('cells', [])}
+        self._days_sig = res.get('signature')
+        print(f"scanned calendar, got {len(self.days_map)} days")
+        return self.days_map
+
+    def get_days_map(self):
+        # only rescan if the calendar view actually changed
+        if self.days_map is None:
+            return self.scan_calendar()
+        try:
+            sig = self.driver.execute_script(CAL_SCAN_JS, True)
+        except Exception:
+            sig = None
+        if sig != self._days_sig:
+            return self.scan_calendar()
+        return self.days_map
+
+    def click_from_map(self, target_date):
+        # None = not in the map, let the xpath stuff have a go
+        cell = self.get_days_map().get(target_date.day)
+        if cell is None:
+            return None
+        if cell['disabled'] or cell['reported']:
+            print(f"day {target_date.day} is disabled/already reported, skipping")
+            return False
+        try:
+            self.driver.execute_script("arguments[0].scrollIntoView(true);", cell['element'])
+            self.driver.execute_script("arguments[0].click();", cell['element'])
+        except StaleElementReferenceException:
+            self.days_map = None
+            return None
+        try:
+            self.waits.until(
+                'date_click',
+                EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'נמצא/ת ביחידה')]"))
+            )
+        except TimeoutException:
+            print(f"clicked day {target_date.day} from the map but no form showed up")
+            return None
+        print(f"FOUND IT (from map)! clicked day {target_date.day}")
+        cell['reported'] = True
+        return True
+
     def find_date_and_click(self, target_date):
         # Method with unnecessarily complex implementation - common in real code
         date_num = str(target_date.day)
         print(f"Looking for day number {date_num}")
+
+        # try the scanned calendar first, xpaths are just the backup now
+        from_map = self.click_from_map(target_date)
+        if from_map is not None:
+            self.emit(StrategyTried(target_date, 'calendar map', from_map))
+            return from_map
         
         # Over-engineering with multiple approaches
         xpath_attempts = [
@@ -87,14 +231,11 @@ class myReportBot:
             f"//*[@aria-label[contains(., '{date_num}')]]"
         ]
         
-        # Different sleep times for different attempts - typical of human debugging
-        attempt_sleeps = [1.1, 0.75, 1.5, 0.9]
-        
         for i, xpath in enumerate(xpath_attempts):
+            self.check_cancel()
             try:
-                el = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, xpath))
-                )
+                # full date_click wait for the first xpath only, the others get SMALL_TIMEOUT
+                el = self.waits.stable('date_click', (By.XPATH, xpath), None if i == 0 else SMALL_TIMEOUT)
                 
                 # JS scroll with inconsistent argument style
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", el)
@@ -112,25 +253,21 @@ class myReportBot:
                         actions = ActionChains(self.driver)
                         actions.move_to_element(el).click().perform()
                 
-                # Sleep time from array - typical of quickly written scripts  
-                time.sleep(attempt_sleeps[i])
-                
                 # Check if it worked
                 try:
-                    check = self._wait.until(
+                    check = self.waits.until(
+                        'date_click',
                         EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'נמצא/ת ביחידה')]"))
                     )
                     print(f"FOUND IT! clicked day {date_num}")
-                    global success_count
-                    success_count += 1
+                    self.emit(StrategyTried(target_date, f"xpath #{i+1}", True))
                     return True
                 except TimeoutException:
                     print(f"click didn't work right for try #{i+1}")
-                    continue
                     
             except Exception as e:
                 print(f"nope, try #{i+1} failed")
-                continue
+            self.emit(StrategyTried(target_date, f"xpath #{i+1}", False))
         
         # Last ditch effort with some poorly formatted JS
         try:
@@ -147,42 +284,57 @@ class myReportBot:
             return false;
             """
             worked = self.driver.execute_script(js_try)
+            self.emit(StrategyTried(target_date, 'js trick', bool(worked)))
             if worked:
                 print(f"js trick worked for day {date_num}!!")
-                time.sleep(0.7)  # inconsistent sleep time
-                success_count += 1
+                self.waits.settled('date_click')
                 return True
         except Exception as e:
             print(f"js trick failed too: {e}")
         
         print(f"can't click on {date_num}, skipping it")
-        global fail_count
-        fail_count += 1
         return False
 
     def do_the_reporting(self):
         # Function with less formal name
+        # Hebrew and English mixed in comments and variables
+        buttons = [
+            ("נמצא/ת ביחידה", "at_unit"),
+            ("נוכח/ת", "present"),
+            ("שליחת דיווח", "send_it"),
+            ("אישור וסיום", "confirm")
+        ]
+        start_at = 0
+
+        if self.batch_clicks:
+            try:
+                start_at, batch_res = run_batched_submit(self.driver, buttons, self.waits.step_waits['submit_step']['timeout'])
+                for step in (batch_res or {}).get('results', []):
+                    if step['ok']:
+                        self.emit(StepCompleted(self.current_date, step['step']))
+            except Exception as e:
+                print(f"batch clicking blew up: {e}")
+                start_at = 0
+            if start_at is None:
+                self.waits.settled('submit_step')
+                return True
+            print(f"batch got stuck, doing the rest one by one from {buttons[start_at][1]}")
+
         try:
-            # Hebrew and English mixed in comments and variables
-            buttons = [
-                ("נמצא/ת ביחידה", "at_unit"),
-                ("נוכח/ת", "present"),
-                ("שליחת דיווח", "send_it"),
-                ("אישור וסיום", "confirm")
-            ]
-            
-            for heb_text, btn_name in buttons:
-                b = self._wait.until(
-                    EC.element_to_be_clickable((By.XPATH, f"//*[contains(text(), '{heb_text}')]"))
-                )
+            for heb_text, btn_name in buttons[start_at:]:
+                self.check_cancel()
+                b = self.waits.clickable('submit_step', (By.XPATH, f"//*[contains(text(), '{heb_text}')]"))
                 b.click()
                 print(f"Clicked: {btn_name}")
+                self.emit(StepCompleted(self.current_date, btn_name))
                 
-                # Variable sleep times
-                wait_time = 0.8 + (random.random() * 0.4)  # 0.8 - 1.2 seconds
-                time.sleep(wait_time)
+                # wait for the page to calm down instead of sleeping
+                self.waits.settled('submit_step')
+                self.waits.human_pause()
             
             return True
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"Error while clicking buttons: {e}")
             return False
@@ -201,14 +353,14 @@ class myReportBot:
         return today, end
 
     def is_work_day(self, d):
-        # Shortened variable name - typical in quickly written scripts
-        return d.weekday() in [0, 1, 2, 3]  # Sun-Thu, explicit list instead of range
+        # Sun-Thu minus holidays - weekday() counts from Monday so Sunday is 6, not 0
+        return is_workday(d, self.holidays)
 
-    def run_all(self):
+    def run_all(self, dates=None):
         # Main function with error handling
-        global success_count, fail_count
-        success_count = 0
-        fail_count = 0
+        # returns a RunResult (also in self.result), progress goes to self.events
+        # dates - the days to do, by default today until Thursday (figure_out_dates)
+        res = self.result = RunResult()
         
         try:
             print("\n### STARTING THE BOT ###")
@@ -216,37 +368,54 @@ class myReportBot:
             # Some inconsistent error handling - sometimes returning, sometimes continuing
             if not self.go_to_website():
                 print("Can't even get to the site, giving up")
-                return
+                res.error = "couldn't reach the site"
+                return res
             
             if not self.click_future_stuff():
                 print("Future reports button problem, will try to continue anyway")
                 # Continuing despite failure - common in real code
             
             # Get dates to work with
-            start, end = self.figure_out_dates()
-            curr = start
+            if dates is None:
+                start, end = self.figure_out_dates()
+                dates = [start + timedelta(days=n) for n in range((end - start).days + 1)]
             
             # Loop through dates
-            while curr <= end:
+            for curr in dates:
+                self.check_cancel()
                 if self.is_work_day(curr):
                     print(f"\nTrying for {curr.strftime('%d/%m/%Y')}")
+                    self.current_date = curr
+                    self.emit(DateStarted(curr))
                     if self.find_date_and_click(curr):
-                        if not self.do_the_reporting():
+                        if self.do_the_reporting():
+                            status = 'reported'
+                        else:
+                            status = 'report failed'
                             print(f"Failed reporting for {curr.strftime('%d/%m/%Y')}")
                     else:
+                        status = 'not selectable'
                         print(f"Skipping {curr.strftime('%d/%m/%Y')} - couldn't select it")
+                    res.add(curr, status)
+                    self.emit(DateDone(curr, status == 'reported', status))
                 else:
                     print(f"Skipping {curr.strftime('%d/%m/%Y')} - not a work day")
-                
-                curr += timedelta(days=1)
             
-            print(f"\n### ALL DONE! Success: {success_count}, Failed: {fail_count} ###")
+            print(f"\n### ALL DONE! Success: {res.success_count}, Failed: {res.fail_count} ###")
             
+        except Cancelled:
+            print(f"\nStopped on request after {len(res.dates)} dates")
+            res.cancelled = True
         except Exception as e:
             print(f"\nSomething broke in the main process: {e}")
+            res.error = str(e)
         finally:
             print("\nShutting down...")
-            self.driver.quit()
+            self.watchdog.terminate(self.driver)  # quit, and kill what's left if quit hangs
+            if self.lean_profile:
+                prune_profile(self.chrome_folder)  # drop the caches, keep the cookies
+            self.emit(RunFinished(res))
+        return res
 
 
 # Script entry point with slightly inconsistent style
@@ -4,123 +4,520 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                                        UnexpectedAlertPresentException, WebDriverException,
+                                        SessionNotCreatedException)
 from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime, timedelta
+import json
 import time
 import os
+import sys
+
+from batch_submit import run_batched_submit
+from browser_profile import LEAN_ARGUMENTS, LEAN_PROFILE_DIR, PROFILE_IN_USE, prepare_profile, prune_profile
+from browser_watchdog import WATCHDOG_METRICS, BrowserWatchdog, reap_orphans
+from checkpoint import CHECKPOINT_DIR, JobCheckpoint
+from date_planner import (HOLIDAYS_FILE, as_day, default_range, group_by_month, month_of,
+                          parse_day, parse_month_title, plan_dates)
+from date_planner import is_workday as planned_workday
+from dom_snapshot import SnapshotRecorder
+from driver_cache import cached_driver_path
+from ledger import LEDGER_FILE, Ledger
+from locator_stats import STATS_FILE, LocatorRegistry
+from locators import (FUTURE_REPORTS_TEXT, SUBMIT_SEQUENCE, button_strategies, date_strategies,
+                      month_button_strategies)
+from run_log import RUN_LOG, Tracer, rotate_log, traced
+from tab_pool import TabPool
+from page_load import (DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_URLS, apply_lean_options,
+                       enable_request_blocking, page_metrics)
+from page_scripts import CALENDAR_SCAN_SCRIPT, CALENDAR_SIGNATURE_SCRIPT, MONTH_TITLE_SCRIPT
+from wait_engine import WaitEngine
+
+SITE_URL = "https://one.prat.idf.il/finish"
+
+STARTUP_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_times.jsonl')
+PAGE_LOAD_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'page_loads.jsonl')
+
+# Timeout for the alternative strategies once the top-ranked one has already waited
+FALLBACK_LOCATOR_TIMEOUT = 2
+
+# Attempts per step inside the live session, waiting RETRY_BASE_DELAY seconds doubled after each failure
+STEP_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+
+# New browsers started for a run whose session died
+MAX_BROWSER_RECYCLES = 2
+
+
+class BrowserSessionDead(Exception):
+    """Only a new browser can continue: this one stopped answering or crossed a watchdog limit"""
+
+    def __init__(self, reason='dead', step=None):
+        super().__init__(f"{reason} at {step}" if step else reason)
+        self.reason = reason
+
+
+def get_date_range():
+    """Calculate the date range from today until next Thursday"""
+    start_date, end_date = default_range()
+    print(f"Date range: {start_date.strftime('%d/%m/%Y')} to {end_date.strftime('%d/%m/%Y')}")
+    return start_date, end_date
+
+
+def is_workday(date, exceptions=None):
+    """Check if given date is a workday (Sunday-Thursday, see date_planner.load_exceptions for exceptions)"""
+    return planned_workday(date, exceptions)
+
+
+def target_workdays(start=None, end=None, holidays_file=HOLIDAYS_FILE):
+    """List the workdays from start until end, by default from today until next Thursday"""
+    if start is None and end is None:
+        start, end = get_date_range()
+    else:
+        print(f"Date range: {(start or datetime.now()).strftime('%d/%m/%Y')} to "
+              f"{end.strftime('%d/%m/%Y') if end else 'the Thursday after'}")
+    return plan_dates(start, end, holidays_file)
+
+
+def report_with_browser(dates=None, site_url=SITE_URL):
+    """Run the Selenium reporter on dates"""
+    return AttendanceReporter(site_url=site_url).report_attendance(dates)
+
 
 class AttendanceReporter:
-    def __init__(self):
-        """Initialize the Chrome WebDriver with appropriate options"""
+    def __init__(self, step_waits=None, humanize=False, batch_submit=False,
+                 user_data_dir=None, profile_directory='Default', lean_profile=True, lean_profile_dir=LEAN_PROFILE_DIR,
+                 lean_page_load=False, page_load_strategy='eager',
+                 blocked_resource_types=DEFAULT_BLOCKED_TYPES, blocked_url_patterns=DEFAULT_BLOCKED_URLS,
+                 site_url=SITE_URL, account=None, reconcile_ledger=False, persistent=False,
+                 record_snapshots=False, watchdog_limits=None, tabs=1, state_dir=None):
+        """Initialize the Chrome WebDriver with appropriate options.
+
+        user_data_dir/profile_directory select the Chrome profile holding the session.
+        Without user_data_dir the dedicated lean profile is used (lean_profile=True, see
+        browser_profile.py) or else the everyday Chrome profile of the current user.
+        lean_profile_dir puts the lean profile elsewhere, e.g. report_daemon.py's own profile.
+        step_waits overrides the per-step wait timeouts/poll intervals (see wait_engine.DEFAULT_STEP_WAITS).
+        humanize adds random pauses between actions.
+        batch_submit runs the submit button sequence in one in-page script.
+        lean_page_load uses page_load_strategy ('eager' or 'none'), blocks the given resource
+        types and URL patterns and disables unneeded Chrome subsystems (see page_load.py).
+        site_url points the reporter at another site, e.g. the local mock_site.py.
+        account names the ledger entries (defaults to the profile directory); dates it already
+        confirms are skipped. reconcile_ledger first marks the days the calendar shows as reported.
+        persistent keeps the browser open after report_attendance for the next run (see
+        report_daemon.py); close() then shuts it down.
+        record_snapshots saves a DOM snapshot of the page at every locator (see dom_snapshot.py),
+        for checking locator changes offline with snapshot_replay.py.
+        watchdog_limits override the browser's memory/CPU/response limits (see browser_watchdog.py);
+        browsers left on the profile by crashed runs are killed before Chrome starts.
+        tabs > 1 reports that many dates at once, each in its own tab of the browser (see tab_pool.py).
+        state_dir keeps the locator stats, ledger, checkpoints, run log and timing logs in another
+        directory than the script's, e.g. for benchmarks against the mock site.
+        """
+        self.site_url = site_url
+        self.started_at = time.monotonic()
+        self.startup_times = {}
         self.options = Options()
-        self.user_data_dir = os.path.expanduser('~') + r'\AppData\Local\Google\Chrome\User Data'
+        self.lean_profile = lean_profile and user_data_dir is None
+        if self.lean_profile:
+            self.user_data_dir = prepare_profile(lean_profile_dir)
+            for argument in LEAN_ARGUMENTS:
+                self.options.add_argument(argument)
+        else:
+            self.user_data_dir = user_data_dir or os.path.expanduser('~') + r'\AppData\Local\Google\Chrome\User Data'
         self.options.add_argument(f'user-data-dir={self.user_data_dir}')
-        self.options.add_argument('--profile-directory=Default')
+        self.options.add_argument(f'--profile-directory={profile_directory}')
         self.options.add_argument("--headless")  # Run in headless mode
         self.options.add_argument("--disable-gpu")  # Extra stability
         self.options.add_argument("--no-sandbox")  # Avoid permission issues
+        self.lean_page_load = lean_page_load
+        if lean_page_load:
+            apply_lean_options(self.options, page_load_strategy, blocked_resource_types)
+
+        self.blocked_resource_types = blocked_resource_types
+        self.blocked_url_patterns = blocked_url_patterns
+        self.step_waits = step_waits
+        self.humanize = humanize
+        self.account = account or self.user_data_dir
+        self.state_paths(state_dir)
+        self.watchdog = BrowserWatchdog(watchdog_limits, self.watchdog_metrics, account=str(self.account))
+        reap_orphans(self.user_data_dir)
+        self.start_browser()
+        self.batch_submit = batch_submit
+        self.calendar_index = None
+        self.calendar_signature = None
+        self.shown_month = None
+        self.locator_stats = LocatorRegistry(self.locator_stats_file)
+        self.tracer = Tracer(self.run_log, account=self.account)
+        self.snapshots = SnapshotRecorder(self.tracer.run_id) if record_snapshots else None
+        self.ledger = Ledger(self.ledger_file)
+        self.reconcile_ledger = reconcile_ledger
+        self.persistent = persistent
+        self.tabs = tabs
+        self.results = {}
+        print("Browser initialized successfully")
+
+    def state_paths(self, state_dir=None):
+        """Where the reporter keeps its state and logs: the script's directory or state_dir"""
+        def path(default):
+            return os.path.join(state_dir, os.path.basename(default)) if state_dir else default
 
+        self.locator_stats_file = path(STATS_FILE)
+        self.ledger_file = path(LEDGER_FILE)
+        self.checkpoint_dir = path(CHECKPOINT_DIR)
+        self.run_log = path(RUN_LOG)
+        self.watchdog_metrics = path(WATCHDOG_METRICS)
+        self.startup_log = path(STARTUP_LOG)
+        self.page_load_log = path(PAGE_LOAD_LOG)
 
-        self.driver = webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()),
-            options=self.options
-        )
+    def start_browser(self):
+        """Launch Chrome with the reporter's options"""
+        driver_path = cached_driver_path()
+        self.startup_times.setdefault('driver_resolved', time.monotonic() - self.started_at)
+        try:
+            self.driver = webdriver.Chrome(
+                service=ChromeService(driver_path),
+                options=self.options
+            )
+        except SessionNotCreatedException as e:
+            if PROFILE_IN_USE in str(e):
+                print(f"Chrome profile {self.user_data_dir} is in use by another browser, e.g. a running "
+                      f"report_daemon.py or Chrome itself. Stop it or choose another profile")
+            raise
+        self.startup_times.setdefault('browser_launched', time.monotonic() - self.started_at)
+        if self.lean_page_load:
+            blocked = enable_request_blocking(self.driver, self.blocked_resource_types, self.blocked_url_patterns)
+            print(f"Lean page load: blocking {len(blocked)} URL patterns")
         self.wait = WebDriverWait(self.driver, 10)
-        print("Browser initialized successfully")
+        self.waits = WaitEngine(self.driver, self.step_waits, self.humanize)
+        self.watchdog.attach(self.driver)
+
+    def session_alive(self):
+        """Whether the browser still answers commands"""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except UnexpectedAlertPresentException:
+            return True
+        except WebDriverException:
+            return False
+
+    def recycle_browser(self, reason='dead'):
+        """Replace a dead, hung or bloated browser with a new one on the same profile"""
+        print(f"Recycling the browser ({reason}), starting a new one")
+        self.watchdog.record_recycle(reason)
+        self.watchdog.terminate(self.driver)
+        self.start_browser()
+        self.calendar_index = None
+        self.calendar_signature = None
+        self.shown_month = None
+
+    def retry_step(self, step, action, *args, give_up=None):
+        """Call action until it returns a true value, backing off exponentially between attempts.
 
+        give_up() returning true stops the retries early. Raises BrowserSessionDead when the
+        browser stopped answering, since no retry in this session can succeed.
+        """
+        delay = RETRY_BASE_DELAY
+        for attempt in range(1, STEP_ATTEMPTS + 1):
+            result = action(*args)
+            if result:
+                return result
+            if not self.session_alive():
+                raise BrowserSessionDead('dead', step)
+            if attempt == STEP_ATTEMPTS or (give_up and give_up()):
+                return result
+            print(f"{step} failed (attempt {attempt}/{STEP_ATTEMPTS}), retrying in {delay:.1f}s")
+            self.tracer.record('retry', delay, 'ok', locator=step, attempt=attempt)
+            time.sleep(delay)
+            delay *= 2
+        return result
+
+    def find_clickable(self, locator, strategies, timeout=10):
+        """Wait for a clickable element trying the strategies in their ranked order.
+
+        Every attempt is recorded in the locator stats. Raises TimeoutException if none matched.
+        """
+        for attempt, (name, xpath) in enumerate(self.locator_stats.ranked(locator, strategies)):
+            started = time.monotonic()
+            try:
+                element = WebDriverWait(self.driver, timeout if attempt == 0 else FALLBACK_LOCATOR_TIMEOUT).until(
+                    EC.element_to_be_clickable((By.XPATH, xpath))
+                )
+            except TimeoutException:
+                self.record_attempt(locator, name, False, time.monotonic() - started)
+                print(f"Locator {locator} strategy {name} timed out")
+                continue
+            self.record_attempt(locator, name, True, time.monotonic() - started)
+            return element
+        raise TimeoutException(f"No strategy found {locator}")
+
+    def snapshot(self, name, **context):
+        """Record the current page for the offline replay, when recording"""
+        if self.snapshots:
+            self.snapshots.take(self.driver, name, **context)
+
+    def record_attempt(self, locator, strategy, success, seconds, **fields):
+        """Record a locator strategy attempt in the locator stats and the run log"""
+        self.locator_stats.record(locator, strategy, success, seconds)
+        self.tracer.record('locate', seconds, 'ok' if success else 'failed',
+                           locator=locator, strategy=strategy, **fields)
+
+    @traced('navigate_to_site')
     def navigate_to_site(self):
         """Navigate to the reporting site"""
         try:
-            self.driver.get("https://one.prat.idf.il/finish")
-            time.sleep(2)
+            started = time.monotonic()
+            self.driver.get(self.site_url)
+            self.waits.page_ready('navigate')
+            self.log_page_load(time.monotonic() - started)
+            if 'first_page' not in self.startup_times:
+                self.startup_times['first_page'] = time.monotonic() - self.started_at
+                self.log_startup_times()
+            self.waits.human_pause()
             print("Successfully navigated to site")
             return True
         except Exception as e:
             print(f"Error navigating to site: {e}")
             return False
 
+    def log_page_load(self, ready_seconds):
+        """Print the page-ready latency and bytes transferred and append them to the page load log"""
+        try:
+            bytes_transferred, resources = page_metrics(self.driver)
+        except Exception as e:
+            print(f"Could not read page metrics: {e}")
+            return
+        mode = "lean" if self.lean_page_load else "full"
+        print(f"Page ready in {ready_seconds:.2f}s, {bytes_transferred / 1024:.0f} KB in {resources} resources ({mode} mode)")
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'lean_page_load': self.lean_page_load,
+            'ready_seconds': round(ready_seconds, 3),
+            'bytes': bytes_transferred,
+            'resources': resources,
+        }
+        try:
+            with open(self.page_load_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Could not write page load log: {e}")
+
+    def log_startup_times(self):
+        """Print the startup timings and append them to the startup log"""
+        print("Startup: " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in self.startup_times.items()))
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'lean_profile': self.lean_profile,
+            'lean_page_load': self.lean_page_load,
+        }
+        entry.update({step: round(seconds, 3) for step, seconds in self.startup_times.items()})
+        try:
+            with open(self.startup_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Could not write startup log: {e}")
+
+    @traced('access_future_reports')
     def access_future_reports(self):
         """Access the future reports section"""
         try:
             # חיפוש וקליק על כפתור 'דיווחים עתידיים'
-            future_button = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), 'דיווחים עתידיים')]"))
-            )
+            try:
+                future_button = self.find_clickable("future_reports", button_strategies(FUTURE_REPORTS_TEXT))
+            finally:
+                self.snapshot('future_reports', kind='button', locator='future_reports', text=FUTURE_REPORTS_TEXT)
             future_button.click()
-            time.sleep(2)
+            self.waits.settled('future_reports')
+            self.waits.human_pause()
             print("Accessed future reports successfully")
+            self.build_calendar_index()
+            # The view opens on the current month
+            self.shown_month = self.read_shown_month() or month_of(datetime.now())
             return True
         except Exception as e:
             print(f"Error accessing future reports: {e}")
             return False
 
+    def build_calendar_index(self):
+        """Scan the calendar once and index the day cells by day number"""
+        try:
+            scan = self.driver.execute_script(CALENDAR_SCAN_SCRIPT) or {}
+        except Exception as e:
+            print(f"Calendar scan failed: {e}")
+            scan = {}
+        self.calendar_index = {int(cell['day']): cell for cell in scan.get('cells', [])}
+        self.calendar_signature = scan.get('signature')
+        print(f"Indexed {len(self.calendar_index)} calendar days")
+        return self.calendar_index
+
+    def read_shown_month(self):
+        """(year, month) of the calendar title, or None when no title could be read"""
+        try:
+            texts = self.driver.execute_script(MONTH_TITLE_SCRIPT) or []
+        except WebDriverException:
+            return None
+        for text in texts:
+            month = parse_month_title(text)
+            if month:
+                return month
+        return None
+
+    def calendar_view(self):
+        """Signature and titles of the calendar on screen, to notice when it changes"""
+        return self.driver.execute_script(CALENDAR_SIGNATURE_SCRIPT), self.driver.execute_script(MONTH_TITLE_SCRIPT)
+
+    @traced('show_month')
+    def show_month(self, month):
+        """Move the calendar to month, a (year, month) tuple, with its next/previous buttons"""
+        if self.shown_month is None and not self.access_future_reports():
+            return False
+        steps = (month[0] - self.shown_month[0]) * 12 + month[1] - self.shown_month[1]
+        if steps == 0:
+            return True
+        direction = 1 if steps > 0 else -1
+        locator = "month/next" if direction > 0 else "month/previous"
+        try:
+            for _ in range(abs(steps)):
+                before = self.calendar_view()
+                self.click_element(self.find_clickable(locator, month_button_strategies(direction)))
+                self.waits.until(
+                    'month_change',
+                    lambda driver: self.calendar_view() != before,
+                    "month_change: calendar did not change",
+                )
+                self.shown_month = month_of(datetime(self.shown_month[0], self.shown_month[1], 1)
+                                            + timedelta(days=31 if direction > 0 else -1))
+            self.waits.settled('month_change')
+        except WebDriverException as e:
+            print(f"Could not move the calendar to {month[1]:02d}/{month[0]}: {e}")
+            self.shown_month = self.read_shown_month()
+            return False
+        finally:
+            self.calendar_index = None
+        shown = self.read_shown_month()
+        if shown and shown != month:
+            print(f"Calendar shows {shown[1]:02d}/{shown[0]} instead of {month[1]:02d}/{month[0]}")
+            self.shown_month = shown
+            return False
+        print(f"Calendar moved to {month[1]:02d}/{month[0]}")
+        return True
+
+    def get_calendar_index(self):
+        """Return the calendar index, rebuilding it only when the calendar view changed"""
+        if self.calendar_index is None:
+            return self.build_calendar_index()
+        try:
+            signature = self.driver.execute_script(CALENDAR_SIGNATURE_SCRIPT)
+        except Exception:
+            signature = None
+        if signature != self.calendar_signature:
+            return self.build_calendar_index()
+        return self.calendar_index
+
+    def click_element(self, element):
+        """Scroll an element into view and click it, falling back to JavaScript and action chains"""
+        self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
+        try:
+            # Method 1: Standard click
+            element.click()
+        except Exception:
+            try:
+                # Method 2: JavaScript click
+                self.driver.execute_script("arguments[0].click();", element)
+            except Exception:
+                # Method 3: Action chains
+                actions = ActionChains(self.driver)
+                actions.move_to_element(element)
+                actions.click()
+                actions.perform()
+
+    def report_form_opened(self):
+        """Check that the report form appeared after selecting a date"""
+        try:
+            self.waits.until(
+                'date_click',
+                EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'נמצא/ת ביחידה')]"))
+            )
+            return True
+        except TimeoutException:
+            return False
+
+    def click_indexed_date(self, date):
+        """Click a date through the calendar index. Returns None when the index could not select the day"""
+        cell = self.get_calendar_index().get(date.day)
+        if cell is None:
+            return None
+
+        date_str = str(date.day)
+        if cell['disabled']:
+            print(f"Date {date_str} is disabled in the calendar")
+            return False
+        if cell['reported']:
+            print(f"Date {date_str} is already reported")
+            return False
+
+        try:
+            self.click_element(cell['element'])
+        except StaleElementReferenceException:
+            # התצוגה השתנתה מאז הסריקה - בונים מחדש פעם אחת
+            cell = self.build_calendar_index().get(date.day)
+            if cell is None or cell['disabled'] or cell['reported']:
+                return None
+            self.click_element(cell['element'])
+
+        if self.report_form_opened():
+            print(f"Successfully clicked on date {date_str} using calendar index")
+            cell['reported'] = True
+            return True
+        # the index may have picked the wrong element, let the XPath strategies try
+        print(f"Click on indexed date {date_str} didn't open the report form")
+        return None
+
     def find_and_click_date(self, date):
-        """Find and click on a specific date number in the calendar using multiple strategies"""
+        """Find and click on a specific date number in the calendar.
+
+        The calendar index built when the future reports view loads is consulted first;
+        the XPath strategies are only probed for days the index could not see.
+        """
         try:
             date_str = str(date.day)
             print(f"Looking for date: {date_str}")
+
+            started = time.monotonic()
+            indexed = self.click_indexed_date(date)
+            if indexed is not None:
+                if indexed:
+                    self.record_attempt("date_cell", "calendar_index", True, time.monotonic() - started, date=date)
+                return indexed
             
-            # Strategy 1: Try finding by table cell with multiple attributes
-            xpath_strategies = [
-                # Look for the number within a table cell
-                f"//td[normalize-space(.)='{date_str}' and not(contains(@class, 'disabled'))]",
-                
-                # Look for the number within any clickable element
-                f"//*[text()='{date_str}' and not(ancestor::*[contains(@class, 'disabled')])]",
-                
-                # Look specifically within the calendar table
-                f"//table[contains(@class, 'calendar')]//td[text()='{date_str}']",
-                
-                # Try finding by aria-label if available
-                f"//*[@aria-label[contains(., '{date_str}')]]"
-            ]
+            # Historically fastest working strategy first
+            xpath_strategies = self.locator_stats.ranked("date_cell", date_strategies(date_str))
             
-            for xpath in xpath_strategies:
+            for attempt, (name, xpath) in enumerate(xpath_strategies):
+                started = time.monotonic()
                 try:
-                    # Wait for element to be present and visible
-                    element = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.XPATH, xpath))
-                    )
+                    # Wait for the cell to be visible and done moving (the calendar may still animate)
+                    element = self.waits.stable('date_click', (By.XPATH, xpath),
+                                                None if attempt == 0 else FALLBACK_LOCATOR_TIMEOUT)
                     
-                    # Scroll element into view using JavaScript
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                    
-                    # Try multiple click methods
-                    try:
-                        # Method 1: Standard click
-                        element.click()
-                    except:
-                        try:
-                            # Method 2: JavaScript click
-                            self.driver.execute_script("arguments[0].click();", element)
-                        except:
-                            # Method 3: Action chains
-                            from selenium.webdriver.common.action_chains import ActionChains
-                            actions = ActionChains(self.driver)
-                            actions.move_to_element(element)
-                            actions.click()
-                            actions.perform()
+                    self.click_element(element)
                     
                     # Verify the click worked by checking for any expected changes
-                    time.sleep(1)
-                    try:
-                        # Look for elements that should appear after successful date selection
-                        success = self.wait.until(
-                            EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'נמצא/ת ביחידה')]"))
-                        )
+                    if self.report_form_opened():
+                        self.record_attempt("date_cell", name, True, time.monotonic() - started, date=date)
                         print(f"Successfully clicked on date {date_str} using strategy: {xpath}")
                         return True
-                    except TimeoutException:
-                        print(f"Click didn't produce expected results for strategy: {xpath}")
-                        continue
+                    print(f"Click didn't produce expected results for strategy: {xpath}")
                         
                 except Exception as e:
                     print(f"Strategy failed: {xpath}")
-                    continue
+                self.record_attempt("date_cell", name, False, time.monotonic() - started, date=date)
             
             # If all strategies fail, try one last approach with direct JavaScript injection
+            started = time.monotonic()
             try:
                 js_click_script = f"""
                 var dates = document.evaluate("//td[contains(text(), '{date_str}')]", 
@@ -134,10 +531,11 @@ class AttendanceReporter:
                 }}
                 return false;
                 """
-                clicked = self.driver.execute_script(js_click_script)
+                clicked = self.driver.execute_script(js_click_script) and self.report_form_opened()
+                self.tracer.record('locate', time.monotonic() - started, 'ok' if clicked else 'failed',
+                                   locator="date_cell", strategy="javascript", date=date)
                 if clicked:
                     print(f"Successfully clicked date {date_str} using JavaScript")
-                    time.sleep(1)
                     return True
             except Exception as e:
                 print(f"JavaScript click strategy failed: {e}")
@@ -150,79 +548,307 @@ class AttendanceReporter:
             return False
 
     def submit_report(self):
-        """Submit the attendance report through the sequence of buttons"""
-        try:
-            button_sequence = [
-                ("נמצא/ת ביחידה", "Unit presence"),
-                ("נוכח/ת", "Presence"),
-                ("שליחת דיווח", "Submit report"),
-                ("אישור וסיום", "Confirm")
-            ]
-            
-            for text, step_name in button_sequence:
-                button = self.wait.until(
-                    EC.element_to_be_clickable((By.XPATH, f"//*[contains(text(), '{text}')]"))
-                )
-                button.click()
-                print(f"Completed step: {step_name}")
-                time.sleep(1)
-            
-            return True
+        """Submit the attendance report, batched in the page when enabled"""
+        if not self.batch_submit:
+            return self.submit_report_steps()
+
+        try:
+            failed_index, result = run_batched_submit(
+                self.driver, SUBMIT_SEQUENCE, self.waits.step_waits['submit_step']['timeout']
+            )
         except Exception as e:
-            print(f"Error in submit_report at step {step_name}: {e}")
-            return False
+            print(f"Batched submit failed: {e}")
+            failed_index, result = 0, None
+        for step in (result or {}).get('results', []):
+            self.tracer.record('submit_step', step['ms'] / 1000, 'ok' if step['ok'] else 'failed',
+                               button=step['step'], strategy='batched')
+        if failed_index is None:
+            self.waits.settled('submit_step')
+            return True
+        print(f"Continuing with per-step submit from step {SUBMIT_SEQUENCE[failed_index][1]}")
+        return self.submit_report_steps(failed_index)
+
+    def submit_report_steps(self, start=0):
+        """Submit the attendance report through the sequence of buttons, one round trip per step.
+
+        Each step is retried with backoff in the live session before the submit counts as failed.
+        """
+        for text, step_name in SUBMIT_SEQUENCE[start:]:
+            if not self.retry_step(f"submit/{step_name}", self.click_submit_step, text, step_name):
+                print(f"Error in submit_report at step {step_name}")
+                return False
+            self.waits.human_pause()
+        return True
+
+    def click_submit_step(self, text, step_name):
+        """Click one button of the submit sequence"""
+        with self.tracer.span('submit_step', button=step_name, strategy='per_step') as span:
+            try:
+                try:
+                    button = self.find_clickable(f"submit/{step_name}", button_strategies(text))
+                finally:
+                    self.snapshot(f"submit/{step_name}", kind='button', locator=f"submit/{step_name}", text=text)
+                button.click()
+            except WebDriverException as e:
+                print(f"Step {step_name} failed: {e}")
+                span.fail(type(e).__name__)
+                return False
+            print(f"Completed step: {step_name}")
+            self.waits.settled('submit_step')
+        return True
 
     def get_date_range(self):
         """Calculate the date range from today until next Thursday"""
-        start_date = datetime.now()
-        end_date = start_date
-        
-        # מציאת יום חמישי הקרוב
-        while end_date.weekday() != 3:  # 3 = Thursday
-            end_date += timedelta(days=1)
-        
-        print(f"Date range: {start_date.strftime('%d/%m/%Y')} to {end_date.strftime('%d/%m/%Y')}")
-        return start_date, end_date
+        return get_date_range()
 
     def is_workday(self, date):
         """Check if given date is a workday (Sunday-Thursday)"""
-        return date.weekday() in range(0, 4)  # 0 = Sunday, 3 = Thursday
+        return is_workday(date)
+
+    def reconcile_with_calendar(self, dates):
+        """Confirm in the ledger the dates the calendar index shows as reported. Returns the others"""
+        # Only the days of the month on screen can be read from the index
+        index = self.get_calendar_index()
+        reported = [d for d in dates if month_of(d) == self.shown_month and index.get(d.day, {}).get('reported')]
+        for confirmed_date in self.ledger.reconcile(self.account, reported):
+            print(f"Ledger: {confirmed_date.strftime('%d/%m/%Y')} is already reported in the calendar")
+        for confirmed_date in reported:
+            self.results[confirmed_date] = 'calendar reported'
+        return [d for d in dates if d not in reported]
+
+    def open_calendar(self):
+        """Open the site and the future reports view, retrying each step in the live session"""
+        if not self.retry_step('navigate_to_site', self.navigate_to_site):
+            return False
+        if not self.retry_step('access_future_reports', self.access_future_reports):
+            print("Failed to access future reports")
+            return False
+        return True
+
+    def day_is_final(self, date):
+        """Whether the calendar shows date as disabled or reported, so selecting it again is pointless"""
+        cell = (self.calendar_index or {}).get(date.day)
+        return bool(cell) and month_of(date) == self.shown_month and (cell['disabled'] or cell['reported'])
+
+    def missing_from_calendar(self, date):
+        """Whether a fresh scan of the shown month sees its day cells but not date's.
+
+        No strategy can select such a day, so it is not worth the XPath ladder and its retries.
+        A scan that sees no cells at all (e.g. numbers drawn with CSS) proves nothing.
+        """
+        if month_of(date) != self.shown_month or date.day in self.get_calendar_index():
+            return False
+        # the cached index may predate a change of the view
+        index = self.build_calendar_index()
+        return bool(index) and date.day not in index
+
+    def report_date(self, date):
+        """Select and submit one date. Returns its status"""
+        print(f"\nProcessing date: {date.strftime('%d/%m/%Y')}")
+        if self.ledger.status(self.account, date) == 'submitting' and not self.reconcile_with_calendar([date]):
+            # The submit of an interrupted run went through after all
+            return self.results[date]
+        if self.missing_from_calendar(date):
+            status = 'not in calendar'
+            print(f"Skipping date {date.strftime('%d/%m/%Y')} - not in the calendar")
+        elif self.retry_step('select_date', self.find_and_click_date, date, give_up=lambda: self.day_is_final(date)):
+            self.ledger.record(self.account, date, 'submitting')
+            if self.submit_report():
+                status = 'reported'
+            else:
+                status = 'submit failed'
+                print(f"Failed to submit report for {date.strftime('%d/%m/%Y')}")
+                # leave the half-finished form for the next date
+                self.open_calendar()
+        else:
+            status = 'not selectable'
+            print(f"Skipping date {date.strftime('%d/%m/%Y')} - could not select")
+        self.results[date] = status
+        self.ledger.record(self.account, date, status)
+        return status
+
+    def finish_tab_date(self, job, date, status, seconds, tab):
+        """Record the status of a date reported in a tab"""
+        self.results[date] = status
+        self.ledger.record(self.account, date, status)
+        self.tracer.record('tab_date', seconds, 'ok' if status == 'reported' else 'failed',
+                           tab=tab, date=date, status=status)
+        job.mark(date, status)
+
+    def report_in_tabs(self, pool, month, dates, job):
+        """Report the dates of the month on screen concurrently in the tabs of pool"""
+        interrupted = [d for d in dates if self.ledger.status(self.account, d) == 'submitting']
+        if interrupted:
+            # The submits of an interrupted run may have gone through after all
+            unconfirmed = self.reconcile_with_calendar(interrupted)
+            for confirmed_date in interrupted:
+                if confirmed_date not in unconfirmed:
+                    job.mark(confirmed_date, self.results[confirmed_date])
+            dates = [d for d in dates if d not in interrupted or d in unconfirmed]
 
-    def report_attendance(self):
-        """Main function to report attendance"""
+        def started(date):
+            # The in-page flow selects and submits in one go, so the date counts as submitting from its start
+            self.ledger.record(self.account, date, 'submitting')
+
+        def healthy():
+            reason = self.watchdog.check(self.driver)
+            if reason:
+                raise BrowserSessionDead(reason)
+
+        left = pool.report(month, dates, started,
+                           lambda date, status, seconds, tab: self.finish_tab_date(job, date, status, seconds, tab),
+                           healthy)
+        for current_date in left:
+            self.finish_tab_date(job, current_date, 'month not shown', 0, None)
+
+    def run_job(self, job):
+        """Work through the job's remaining dates in the current browser session, one calendar month at a time"""
+        if not self.open_calendar():
+            return False
+        pool = TabPool(self, self.tabs) if self.tabs > 1 else None
+        try:
+            self.run_months(job, pool)
+        except BrowserSessionDead:
+            # the browser is replaced, tabs and all
+            pool = None
+            raise
+        finally:
+            if pool is not None:
+                pool.close()
+        return True
+
+    def run_months(self, job, pool=None):
+        """Report the job's remaining dates month by month, in the tabs of pool when given"""
+        # After a browser recycle only the dates this run has not reached yet are left
+        pending = [d for d in job.remaining() if d not in self.results]
+        for month, month_dates in group_by_month(pending).items():
+            if not self.retry_step('show_month', self.show_month, month):
+                for current_date in month_dates:
+                    self.results[current_date] = 'month not shown'
+                    self.ledger.record(self.account, current_date, 'month not shown')
+                    job.mark(current_date, 'month not shown')
+                continue
+            self.snapshot(f"calendar {month[0]}-{month[1]:02d}", kind='calendar', month=f"{month[0]}-{month[1]:02d}",
+                          days=[d.day for d in month_dates])
+            if self.reconcile_ledger:
+                unconfirmed = self.reconcile_with_calendar(month_dates)
+                for confirmed_date in month_dates:
+                    if confirmed_date not in unconfirmed:
+                        job.mark(confirmed_date, 'calendar reported')
+                month_dates = unconfirmed
+            if pool is not None:
+                self.report_in_tabs(pool, month, month_dates, job)
+                continue
+            for current_date in month_dates:
+                reason = self.watchdog.check(self.driver)
+                if reason:
+                    raise BrowserSessionDead(reason)
+                # Recovering from a failed submit reopens the calendar on the current month
+                if self.shown_month != month and not self.retry_step('show_month', self.show_month, month):
+                    break
+                job.mark(current_date, self.report_date(current_date))
+
+    def report_attendance(self, dates=None):
+        """Main function to report attendance.
+
+        dates defaults to the workdays from today until next Thursday. The run is kept as a
+        checkpointed job (see checkpoint.py): an earlier run of the account that did not finish
+        is resumed from its first incomplete date. Failed steps are retried in the live session;
+        the browser is only restarted when its session is dead, and the job goes on from the
+        date it was at.
+        Returns {date: status} for the processed dates.
+        """
+        job = None
+        self.results = {}
         try:
             print("\n=== Starting attendance reporting process ===")
             
-            if not self.navigate_to_site():
-                return
-            
-            if not self.access_future_reports():
-                print("Failed to access future reports")
-                return
+            if dates is None:
+                dates = target_workdays()
+            job = JobCheckpoint.resume(self.account, [as_day(d) for d in dates], self.checkpoint_dir)
             
-            start_date, end_date = self.get_date_range()
-            current_date = start_date
+            pending = self.ledger.pending(self.account, job.remaining())
+            for confirmed_date in job.remaining():
+                if confirmed_date not in pending:
+                    self.results[confirmed_date] = 'already confirmed'
+                    job.mark(confirmed_date, 'already confirmed')
+            if not pending and not self.reconcile_ledger:
+                print("All dates are already confirmed in the ledger")
+                return self.results
             
-            while current_date <= end_date:
-                if self.is_workday(current_date):
-                    print(f"\nProcessing date: {current_date.strftime('%d/%m/%Y')}")
-                    if self.find_and_click_date(current_date):
-                        if not self.submit_report():
-                            print(f"Failed to submit report for {current_date.strftime('%d/%m/%Y')}")
-                    else:
-                        print(f"Skipping date {current_date.strftime('%d/%m/%Y')} - could not select")
-                
-                current_date += timedelta(days=1)
+            recycles = 0
+            while True:
+                try:
+                    self.run_job(job)
+                    break
+                except (BrowserSessionDead, WebDriverException) as e:
+                    if not isinstance(e, BrowserSessionDead) and self.session_alive():
+                        raise
+                    if recycles == MAX_BROWSER_RECYCLES:
+                        print(f"Browser failed {recycles + 1} times, leaving {len(job.remaining())} dates for the next run")
+                        break
+                    recycles += 1
+                    job.note_recycle()
+                    self.tracer.record('recycle_browser', 0, 'ok', reason=str(e))
+                    self.recycle_browser(getattr(e, 'reason', 'dead'))
             
             print("\n=== Attendance reporting completed ===")
             
         except Exception as e:
             print(f"\nAn error occurred in main process: {e}")
         finally:
-            print("\nClosing browser...")
-            self.driver.quit()
+            if job is not None and not job.finish():
+                print(f"Checkpoint kept, {len(job.remaining())} dates left for the next run")
+            if self.persistent:
+                self.locator_stats.save()
+            else:
+                self.close()
+        return self.results
+
+    def close(self):
+        """Save the locator stats, close the ledger and quit the browser"""
+        self.locator_stats.save()
+        self.ledger.close()
+        print("\nClosing browser...")
+        self.watchdog.terminate(self.driver)
+        if self.lean_profile:
+            prune_profile(self.user_data_dir)
+
+def option_value(name, default=None):
+    """Value following name on the command line"""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
 
 if __name__ == "__main__":
-    print("\n=== Initializing attendance reporter ===")
-    reporter = AttendanceReporter()
-    reporter.report_attendance()
\ No newline at end of file
+    # --from/--to YYYY-MM-DD backfill another range, --holidays names the exceptions file,
+    # --tabs N reports N dates at once in tabs of the same browser
+    first, last = option_value("--from"), option_value("--to")
+    try:
+        dates = target_workdays(parse_day(first) if first else None, parse_day(last) if last else None,
+                                option_value("--holidays", HOLIDAYS_FILE))
+    except ValueError as e:
+        sys.exit(f"Bad date range: {e}")
+    if "--http" in sys.argv:
+        # Plain HTTP with the profile's session cookies, browser only as a fallback. The API is
+        # mock_site.py's, so --http needs the base URL of the mock (the real site's is unknown)
+        base_url = option_value("--http")
+        if not base_url or base_url.startswith("--"):
+            sys.exit("--http needs the base URL of a site serving mock_site.py's API, e.g. --http http://127.0.0.1:8765")
+        from http_backend import HttpAttendanceReporter
+        HttpAttendanceReporter(base_url, fallback=lambda dates: report_with_browser(dates, base_url + "/finish")
+                               ).report_attendance(dates)
+    elif "--cdp" in sys.argv:
+        # Asynchronous DevTools backend instead of chromedriver
+        from cdp_backend import CdpAttendanceReporter
+        if len(group_by_month(dates)) > 1:
+            sys.exit("--cdp reports the month the calendar opens on only; use the default backend for ranges "
+                     "across months")
+        CdpAttendanceReporter().report_attendance(dates)
+    else:
+        rotate_log()
+        print("\n=== Initializing attendance reporter ===")
+        reporter = AttendanceReporter(lean_page_load="--lean" in sys.argv, reconcile_ledger="--reconcile" in sys.argv,
+                                      record_snapshots="--record" in sys.argv, tabs=int(option_value("--tabs", 1)))
+        reporter.report_attendance(dates)
@@ -0,0 +1,148 @@
+"""Report attendance for many accounts in parallel, one isolated headless browser per account.
+
+The accounts file is a JSON list, one entry per person:
+    [{"name": "dana", "user_data_dir": "C:/profiles/dana", "profile_directory": "Default",
+      "start": "2026-10-18", "end": "2026-10-22"}]
+start/end are optional and default to today until next Thursday; an optional "holidays"
+names the account's exceptions file (see date_planner.py).
+
+Each account runs in its own process, at most --workers at a time. A worker that runs longer
+than --timeout seconds is killed and reported as timed out; the rest of the batch goes on.
+
+    python batch_report.py accounts.json --workers 3 --timeout 900
+"""
+import argparse
+import json
+import multiprocessing
+import queue
+import time
+
+from browser_watchdog import reap_orphans
+from date_planner import HOLIDAYS_FILE, parse_day, plan_dates
+from ledger import DONE_STATUSES
+from run_log import rotate_log
+from script_loader import load_public_script
+
+try:
+    import psutil
+except ImportError:  # without psutil a killed worker's browser is left to reap_orphans
+    psutil = None
+
+DEFAULT_WORKERS = 2
+DEFAULT_ACCOUNT_TIMEOUT = 900
+
+def account_dates(account):
+    """Workdays of the account's date range"""
+    return plan_dates(
+        parse_day(account['start']) if 'start' in account else None,
+        parse_day(account['end']) if 'end' in account else None,
+        account.get('holidays', HOLIDAYS_FILE),
+    )
+
+
+def run_account(account, results_queue):
+    """Worker process: report one account and put its summary on the queue"""
+    started = time.monotonic()
+    summary = {'account': account['name'], 'ok': False}
+    try:
+        public = load_public_script()
+        reporter = public.AttendanceReporter(
+            user_data_dir=account['user_data_dir'],
+            profile_directory=account.get('profile_directory', 'Default'),
+            account=account['name'],
+        )
+        results = reporter.report_attendance(account_dates(account))
+        summary['results'] = {d.strftime('%Y-%m-%d'): status for d, status in results.items()}
+        summary['ok'] = bool(results) and all(status in DONE_STATUSES for status in results.values())
+    except Exception as e:
+        summary['error'] = str(e)
+    summary['seconds'] = round(time.monotonic() - started, 1)
+    results_queue.put(summary)
+
+
+def collect(results_queue, summaries, wait=0.5):
+    """Move the finished summaries from the queue into summaries"""
+    try:
+        while True:
+            summary = results_queue.get(timeout=wait)
+            summaries[summary['account']] = summary
+            wait = 0
+    except queue.Empty:
+        pass
+
+
+def kill_worker(process, account):
+    """Kill a worker with the chromedriver and Chrome it started, so they do not keep the profile locked"""
+    children = []
+    if psutil is not None:
+        try:
+            children = psutil.Process(process.pid).children(recursive=True)
+        except psutil.Error:
+            pass
+    process.kill()
+    process.join()
+    for child in children:
+        try:
+            child.kill()
+        except psutil.Error:
+            continue
+    reap_orphans(account['user_data_dir'])
+
+
+def run_batch(accounts, workers=DEFAULT_WORKERS, account_timeout=DEFAULT_ACCOUNT_TIMEOUT):
+    """Report all accounts with at most workers browsers at once. Returns {account name: summary}"""
+    # the workers all append to the run log, rotate it while none is running
+    rotate_log()
+    context = multiprocessing.get_context('spawn')
+    results_queue = context.Queue()
+    pending = list(accounts)
+    running = {}
+    summaries = {}
+
+    while pending or running:
+        while pending and len(running) < workers:
+            account = pending.pop(0)
+            process = context.Process(target=run_account, args=(account, results_queue), daemon=True)
+            process.start()
+            running[account['name']] = (process, time.monotonic(), account)
+            print(f"Started {account['name']} (pid {process.pid})")
+
+        collect(results_queue, summaries)
+
+        for name, (process, started, account) in list(running.items()):
+            if not process.is_alive():
+                process.join()
+                collect(results_queue, summaries, wait=1)
+                if name not in summaries:
+                    summaries[name] = {'account': name, 'ok': False,
+                                       'error': f"worker exited with code {process.exitcode}"}
+                del running[name]
+            elif time.monotonic() - started > account_timeout:
+                print(f"Killing hung worker of {name} after {account_timeout}s")
+                kill_worker(process, account)
+                summaries[name] = {'account': name, 'ok': False, 'error': 'timed out',
+                                   'seconds': round(time.monotonic() - started, 1)}
+                del running[name]
+
+    return summaries
+
+
+def print_summary(summaries):
+    print("\n=== Batch summary ===")
+    for name, summary in summaries.items():
+        status = "OK" if summary['ok'] else f"FAILED {summary.get('error', '')}".strip()
+        print(f"{name}: {status} ({summary.get('seconds', '-')}s)")
+        for date, date_status in summary.get('results', {}).items():
+            print(f"    {date}: {date_status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report attendance for several accounts in parallel")
+    parser.add_argument("accounts", help="JSON file with the accounts")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="browsers running at once")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_ACCOUNT_TIMEOUT, help="seconds before a worker is killed")
+    args = parser.parse_args()
+
+    with open(args.accounts, encoding='utf-8') as f:
+        accounts = json.load(f)
+    print_summary(run_batch(accounts, args.workers, args.timeout))
@@ -0,0 +1,53 @@
+"""Run the whole submit button sequence inside the page in one async script round trip.
+
+The script waits for each button with a MutationObserver, clicks it and records the
+step result and timing. Progress is kept in sessionStorage so the caller can tell which
+step was reached even when a click navigates the page and the script never returns.
+"""
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from page_scripts import FIND_TEXT_JS, SUBMIT_STEPS_JS
+
+PROGRESS_KEY = 'attendanceBatchStep'
+
+BATCH_SUBMIT_SCRIPT = FIND_TEXT_JS + SUBMIT_STEPS_JS + """
+var progressKey = arguments[2];
+var done = arguments[arguments.length - 1];
+sessionStorage.removeItem(progressKey);
+// answers before the deferred last click runs
+clickSteps(arguments[0], arguments[1], function(i) { sessionStorage.setItem(progressKey, String(i)); }).then(done);
+"""
+
+
+def run_batched_submit(driver, sequence, step_timeout=10):
+    """Run the (text, step name) sequence in the page.
+
+    Returns (failed_index, result). failed_index is None when every step was clicked,
+    otherwise the index of the first step still to be done through the per-step path.
+    """
+    driver.set_script_timeout(step_timeout * len(sequence) + 5)
+    started = time.monotonic()
+    try:
+        result = driver.execute_async_script(
+            BATCH_SUBMIT_SCRIPT, [list(step) for step in sequence], int(step_timeout * 1000), PROGRESS_KEY
+        )
+    except WebDriverException as e:
+        # The page navigated or the script timed out - ask the page how far it got
+        try:
+            reached = driver.execute_script("return sessionStorage.getItem(arguments[0]);", PROGRESS_KEY)
+        except WebDriverException:
+            reached = None
+        failed_index = int(reached) + 1 if reached is not None else 0
+        print(f"Batched submit interrupted after {time.monotonic() - started:.2f}s: {e.msg}")
+        return (failed_index if failed_index < len(sequence) else None), None
+
+    for index, step in enumerate(result['results']):
+        status = "ok" if step['ok'] else f"failed ({step.get('error')})"
+        print(f"Batched step {step['step']}: {status} in {step['ms']}ms")
+        if not step['ok']:
+            return index, result
+    if len(result['results']) < len(sequence):
+        return len(result['results']), result
+    return None, result
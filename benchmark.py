@@ -0,0 +1,199 @@
+"""End-to-end benchmark of the reporting scripts against the local mock site.
+
+Starts mock_site.MockAttendanceSite, drives AttendanceReporter.report_attendance and/or
+myReportBot.run_all against it with a fresh temporary Chrome profile, both on the same
+--days workdays of the current month, and reports per-date latency percentiles (first date
+selection attempt through the last submit step, one sample per date however often it was
+retried), total wall time and peak browser memory (RSS of chromedriver and its Chrome
+processes, needs psutil).
+
+    python benchmark.py --target both --layout aria --latency 0.05 --step-delay 0.2 --runs 3
+
+--tabs runs the public script once per tab count, e.g. --tabs 1 4 compares the sequential
+path with four dates at a time in tabs of one browser (see tab_pool.py). Per-date latency
+grows with the tabs; the throughput to compare is dates/min.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from mock_site import LAYOUTS, MockAttendanceSite, workdays_of_month
+from script_loader import load_gui_script, load_public_script
+
+try:
+    import psutil
+except ImportError:  # browser memory is only reported when psutil is installed
+    psutil = None
+
+TARGETS = {
+    # target -> (find method, submit method)
+    'public': ('find_and_click_date', 'submit_report'),
+    'gui': ('find_date_and_click', 'do_the_reporting'),
+}
+
+
+def browser_memory(driver):
+    """RSS in bytes of chromedriver and every process it started, or None without psutil"""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        return sum(p.memory_info().rss for p in [root] + root.children(recursive=True))
+    except (psutil.Error, AttributeError):
+        return None
+
+
+def instrument(bot, target, samples, memory):
+    """Wrap the bot's date selection and submit methods to time every date.
+
+    samples maps each date to the seconds from its first selection attempt to its last step,
+    so the in-session retries of a date add to its sample instead of adding samples.
+    """
+    find_name, submit_name = TARGETS[target]
+    find = getattr(bot, find_name)
+    submit = getattr(bot, submit_name)
+    started = {}
+
+    def timed_find(date):
+        if started.get('date') != date:
+            started.update(date=date, at=time.perf_counter())
+        selected = find(date)
+        if not selected:
+            samples[date] = time.perf_counter() - started['at']
+        return selected
+
+    def timed_submit():
+        submitted = submit()
+        samples[started['date']] = time.perf_counter() - started['at']
+        memory.append(browser_memory(bot.driver))
+        return submitted
+
+    setattr(bot, find_name, timed_find)
+    setattr(bot, submit_name, timed_submit)
+
+
+def instrument_tabs(bot, samples, memory):
+    """Time every date of a multi-tab run; the tabs report the time from start to finish of each date"""
+    finish = bot.finish_tab_date
+
+    def timed_finish(job, date, status, seconds, tab):
+        finish(job, date, status, seconds, tab)
+        samples[date] = seconds
+        memory.append(browser_memory(bot.driver))
+
+    bot.finish_tab_date = timed_finish
+
+
+def run_once(target, site, dates, tabs=1):
+    """One full run of target against the site. Returns the measurements"""
+    profile_dir = tempfile.mkdtemp(prefix='attendance-bench-')
+    samples, memory = {}, []
+    wall_started = time.perf_counter()
+    try:
+        if target == 'public':
+            # state and logs stay in the temporary directory, away from the real runs
+            bot = load_public_script().AttendanceReporter(user_data_dir=profile_dir, site_url=site.url + "/finish",
+                                                          tabs=tabs, state_dir=profile_dir)
+            if tabs > 1:
+                instrument_tabs(bot, samples, memory)
+            else:
+                instrument(bot, target, samples, memory)
+            bot.report_attendance(dates)
+        else:
+            bot = load_gui_script().myReportBot(headless=True, chrome_folder=profile_dir, site_url=site.url + "/finish")
+            instrument(bot, target, samples, memory)
+            bot.run_all(dates)
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    peaks = [m for m in memory if m is not None]
+    return {
+        'wall_seconds': time.perf_counter() - wall_started,
+        'date_seconds': list(samples.values()),
+        'peak_memory': max(peaks) if peaks else None,
+        'reported': len(site.reported),
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[int(fraction * 100) - 1]
+
+
+def summarize(target, runs, tabs=1):
+    samples = [s for run in runs for s in run['date_seconds']]
+    peaks = [run['peak_memory'] for run in runs if run['peak_memory'] is not None]
+    wall = sum(run['wall_seconds'] for run in runs)
+    return {
+        'target': target,
+        'tabs': tabs,
+        'runs': len(runs),
+        'dates': len(samples),
+        'reported': sum(run['reported'] for run in runs),
+        'p50': percentile(samples, 0.50),
+        'p90': percentile(samples, 0.90),
+        'p95': percentile(samples, 0.95),
+        'max': max(samples) if samples else None,
+        'wall_seconds': statistics.mean(run['wall_seconds'] for run in runs),
+        'dates_per_minute': len(samples) / wall * 60 if wall else None,
+        'peak_memory_mb': max(peaks) / 2 ** 20 if peaks else None,
+    }
+
+
+def print_summary(summaries):
+    def seconds(value):
+        return f"{value:.2f}" if value is not None else '-'
+
+    print(f"\n{'target':<8} {'tabs':>4} {'runs':>4} {'dates':>5} {'ok':>4} {'p50 s':>7} {'p90 s':>7} {'p95 s':>7} "
+          f"{'max s':>7} {'wall s':>7} {'dates/min':>9} {'mem MB':>7}")
+    for s in summaries:
+        memory = f"{s['peak_memory_mb']:.0f}" if s['peak_memory_mb'] is not None else '-'
+        rate = f"{s['dates_per_minute']:.1f}" if s['dates_per_minute'] is not None else '-'
+        print(f"{s['target']:<8} {s['tabs']:>4} {s['runs']:>4} {s['dates']:>5} {s['reported']:>4} {seconds(s['p50']):>7} "
+              f"{seconds(s['p90']):>7} {seconds(s['p95']):>7} {seconds(s['max']):>7} "
+              f"{seconds(s['wall_seconds']):>7} {rate:>9} {memory:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the reporting scripts against the local mock site")
+    parser.add_argument("--target", choices=['public', 'gui', 'both'], default='both')
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--days", type=int, default=5, help="workdays of the current month reported by each target")
+    parser.add_argument("--layout", choices=LAYOUTS, default='table')
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--step-delay", type=float, default=0.0, help="seconds before every flow step appears")
+    parser.add_argument("--step-failure-rate", type=float, default=0.0)
+    parser.add_argument("--submit-failure-rate", type=float, default=0.0)
+    parser.add_argument("--disabled", type=int, nargs='*', default=[], help="day numbers shown as disabled")
+    parser.add_argument("--tabs", type=int, nargs='+', default=[1],
+                        help="tab counts of the public script, e.g. --tabs 1 4 (the GUI script has no tabs)")
+    parser.add_argument("--output", help="also write the summaries to this JSON file")
+    args = parser.parse_args()
+
+    month = date.today().strftime('%Y-%m')
+    dates = workdays_of_month(month)[:args.days]
+    targets = ['public', 'gui'] if args.target == 'both' else [args.target]
+    summaries = []
+    for target in targets:
+        for tabs in (args.tabs if target == 'public' else [1]):
+            runs = []
+            for _ in range(args.runs):
+                site = MockAttendanceSite(
+                    disabled_days=[d for d in workdays_of_month(month) if d.day in args.disabled],
+                    latency=args.latency, layout=args.layout, step_delay=args.step_delay,
+                    step_failure_rate=args.step_failure_rate, submit_failure_rate=args.submit_failure_rate,
+                )
+                with site:
+                    runs.append(run_once(target, site, dates, tabs))
+            summaries.append(summarize(target, runs, tabs))
+
+    print_summary(summaries)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
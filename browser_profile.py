@@ -0,0 +1,108 @@
+"""A dedicated, minimal Chrome profile for the reporting scripts.
+
+Running on the everyday Chrome 'User Data' directory is slow (it can be gigabytes) and fails
+when Chrome is already open on it. The lean profile lives next to the scripts, is seeded once
+with the session cookies and storage of the everyday profile, and is pruned of caches after
+every run so only what the session needs persists.
+
+report_daemon.py keeps its browser open for days, so it runs on a profile of its own
+(chrome_profile_daemon/), seeded from the lean profile; Chrome refuses to start a second
+browser on a profile that is already in use.
+"""
+import os
+import shutil
+
+EVERYDAY_PROFILE_DIR = os.path.expanduser('~') + r'\AppData\Local\Google\Chrome\User Data'
+LEAN_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chrome_profile')
+DAEMON_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chrome_profile_daemon')
+
+# Part of Chrome's error when another browser holds the profile
+PROFILE_IN_USE = 'user data directory is already in use'
+
+# What the session needs. 'Local State' holds the key the cookies are encrypted with
+SESSION_FILES = [
+    'Local State',
+    os.path.join('Default', 'Network'),
+    os.path.join('Default', 'Cookies'),
+    os.path.join('Default', 'Local Storage'),
+    os.path.join('Default', 'Session Storage'),
+    os.path.join('Default', 'IndexedDB'),
+]
+
+# Regenerated by Chrome on demand, removed after every run
+CACHE_DIRS = [
+    os.path.join('Default', 'Cache'),
+    os.path.join('Default', 'Code Cache'),
+    os.path.join('Default', 'GPUCache'),
+    os.path.join('Default', 'Service Worker', 'CacheStorage'),
+    os.path.join('Default', 'DawnCache'),
+    'GrShaderCache',
+    'ShaderCache',
+    'GraphiteDawnCache',
+    'component_crx_cache',
+    'optimization_guide_model_store',
+    'Crashpad',
+]
+
+# Chrome subsystems the bot never uses
+LEAN_ARGUMENTS = [
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-extensions',
+    '--disable-sync',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-features=Translate,OptimizationHints,MediaRouter',
+    '--disk-cache-size=1',
+]
+
+
+def has_session(profile_dir):
+    """Whether the profile already holds a cookie store"""
+    return any(
+        os.path.exists(os.path.join(profile_dir, 'Default', *path))
+        for path in (('Network', 'Cookies'), ('Cookies',))
+    )
+
+
+def seed_profile(profile_dir, source_dir=EVERYDAY_PROFILE_DIR):
+    """Copy the session files of source_dir into profile_dir. Returns the number of copied entries"""
+    copied = 0
+    for relative in SESSION_FILES:
+        source = os.path.join(source_dir, relative)
+        target = os.path.join(profile_dir, relative)
+        if not os.path.exists(source):
+            continue
+        try:
+            if os.path.isdir(source):
+                shutil.copytree(source, target, dirs_exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+            copied += 1
+        except (OSError, shutil.Error) as e:
+            # Usually a file locked by a running Chrome
+            print(f"Could not copy {relative} from {source_dir}: {e}")
+    return copied
+
+
+def prepare_profile(profile_dir=LEAN_PROFILE_DIR, source_dir=None):
+    """Create the lean profile, seeding it on first use.
+
+    Without source_dir another profile than the lean one is seeded from the lean profile once
+    that holds a session, everything else from the everyday profile.
+    """
+    os.makedirs(os.path.join(profile_dir, 'Default'), exist_ok=True)
+    if source_dir is None:
+        from_lean = os.path.abspath(profile_dir) != LEAN_PROFILE_DIR and has_session(LEAN_PROFILE_DIR)
+        source_dir = LEAN_PROFILE_DIR if from_lean else EVERYDAY_PROFILE_DIR
+    if not has_session(profile_dir) and os.path.isdir(source_dir):
+        print(f"Seeded {profile_dir} with {seed_profile(profile_dir, source_dir)} session entries")
+    return profile_dir
+
+
+def prune_profile(profile_dir=LEAN_PROFILE_DIR):
+    """Remove the caches so only the session state persists"""
+    for relative in CACHE_DIRS:
+        shutil.rmtree(os.path.join(profile_dir, relative), ignore_errors=True)
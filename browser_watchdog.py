@@ -0,0 +1,329 @@
+"""Watch the browser of a long session and clean up browsers left behind by crashed runs.
+
+BrowserWatchdog samples the memory (RSS) and CPU of chromedriver and every process it
+started, and checks that the browser still answers. When a limit is crossed or the browser
+hangs, the reporter replaces it (see AttendanceReporter.recycle_browser) and the watchdog
+appends the event to watchdog_metrics.jsonl:
+
+    python browser_watchdog.py metrics     # recycles per reason, memory at recycle
+    python browser_watchdog.py reap        # kill browsers left on the lean profile
+
+A run that crashed or was killed can leave chromedriver and Chrome running with the profile
+locked, and the next run then fails to start Chrome. reap_orphans, called before every
+launch, kills the automated Chrome processes (started by chromedriver or the DevTools
+backend) using the profile that no live Python process owns anymore, with their
+chromedriver, and removes a stale profile lock. A Chrome the user opened is left alone.
+
+Sampling and reaping need psutil; without it only the responsiveness check is done.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from selenium.common.exceptions import UnexpectedAlertPresentException
+
+try:
+    import psutil
+except ImportError:  # resource limits and orphan reaping need psutil
+    psutil = None
+
+WATCHDOG_METRICS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watchdog_metrics.jsonl')
+
+DEFAULT_LIMITS = {
+    'max_rss_mb': 1500,        # whole process tree
+    'max_cpu_percent': 90,     # summed over the tree, see cpu_samples
+    'cpu_samples': 3,          # consecutive samples over max_cpu_percent before recycling
+    'response_timeout': 30,    # seconds a trivial script may take
+}
+
+QUIT_TIMEOUT = 10
+
+MB = 2 ** 20
+
+# Only Chrome started with these is reaped, never a browser the user opened on the profile
+AUTOMATION_FLAGS = {'--enable-automation', '--test-type=webdriver'}
+
+
+def driver_process(driver):
+    """psutil.Process of chromedriver, or None"""
+    if psutil is None:
+        return None
+    try:
+        return psutil.Process(driver.service.process.pid)
+    except (psutil.Error, AttributeError):
+        return None
+
+
+def process_tree(driver):
+    """chromedriver and every process it started"""
+    root = driver_process(driver)
+    if root is None:
+        return []
+    try:
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return [root]
+
+
+def responsive(driver, timeout):
+    """Whether the browser runs a trivial script within timeout seconds"""
+    answer = {}
+
+    def ping():
+        try:
+            driver.execute_script("return 1")
+            answer['ok'] = True
+        except UnexpectedAlertPresentException:
+            answer['ok'] = True
+        except Exception:
+            answer['ok'] = False
+
+    thread = threading.Thread(target=ping, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return answer.get('ok', False)
+
+
+def quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def profile_of(cmdline):
+    """The --user-data-dir of a Chrome command line, normalized, or None"""
+    for argument in cmdline or []:
+        match = re.match(r'(?:--)?user-data-dir=(.+)', argument)
+        if match:
+            return os.path.normcase(os.path.abspath(match.group(1).strip('"')))
+    return None
+
+
+def automated(cmdline):
+    """Whether a Chrome command line is one started by chromedriver or the DevTools backend"""
+    return any(argument in AUTOMATION_FLAGS or argument.startswith('--remote-debugging-port')
+               for argument in cmdline or [])
+
+
+def owned_by_python(process):
+    """Whether a live Python process (a reporter) is among the ancestors of process"""
+    try:
+        return any('python' in parent.name().lower() for parent in process.parents())
+    except psutil.Error:
+        return False
+
+
+def remove_stale_lock(profile_dir):
+    """Remove the profile lock (a symlink to "<host>-<pid>" on Linux/macOS) when the process it names is gone"""
+    lock = os.path.join(profile_dir, 'SingletonLock')
+    try:
+        target = os.readlink(lock)
+    except OSError:
+        return False
+    pid = target.rsplit('-', 1)[-1]
+    alive = psutil.pid_exists(int(pid)) if psutil is not None and pid.isdigit() else True
+    if alive:
+        return False
+    try:
+        os.remove(lock)
+    except OSError:
+        return False
+    print(f"Removed stale profile lock of process {pid}")
+    return True
+
+
+def reap_orphans(profile_dir):
+    """Kill the orphaned Chrome processes using profile_dir and their chromedriver. Returns the killed pids"""
+    if psutil is None or not profile_dir:
+        return []
+    profile = os.path.normcase(os.path.abspath(profile_dir))
+    victims = {}
+    for process in psutil.process_iter(['pid', 'name', 'cmdline']):
+        try:
+            cmdline = process.info['cmdline']
+            if profile_of(cmdline) != profile or not automated(cmdline) or owned_by_python(process):
+                continue
+            victims[process.pid] = process
+            # The chromedriver that started it is as orphaned as the browser
+            for parent in process.parents():
+                if 'chromedriver' in parent.name().lower():
+                    victims[parent.pid] = parent
+        except psutil.Error:
+            continue
+    for process in victims.values():
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+    psutil.wait_procs(list(victims.values()), timeout=5)
+    if victims:
+        print(f"Killed {len(victims)} leftover browser processes holding {profile_dir}")
+    remove_stale_lock(profile_dir)
+    return sorted(victims)
+
+
+class BrowserWatchdog:
+    def __init__(self, limits=None, metrics_path=WATCHDOG_METRICS, **context):
+        """limits override DEFAULT_LIMITS (None turns a limit off); context (e.g. account=...) is added to the metrics"""
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.metrics_path = metrics_path
+        self.context = context
+        self.processes = {}
+        self.hot_samples = 0
+        self.attached_at = time.monotonic()
+        self.last_sample = None
+        self.peak_rss = 0
+        self.recycles = Counter()
+
+    def attach(self, driver):
+        """Start watching a newly launched browser"""
+        self.processes = {}
+        self.hot_samples = 0
+        self.attached_at = time.monotonic()
+        self.last_sample = None
+        self.peak_rss = 0
+        self.sample(driver)
+
+    def sample(self, driver):
+        """{'rss', 'cpu', 'processes'} of the driver's process tree, or None without psutil"""
+        tree = process_tree(driver)
+        if not tree:
+            return None
+        rss = cpu = 0.0
+        for process in tree:
+            # cpu_percent needs the same Process object between calls
+            process = self.processes.setdefault(process.pid, process)
+            try:
+                rss += process.memory_info().rss
+                cpu += process.cpu_percent(None)
+            except psutil.Error:
+                continue
+        self.processes = {p.pid: self.processes[p.pid] for p in tree}
+        self.peak_rss = max(self.peak_rss, rss)
+        self.last_sample = {'rss': rss, 'cpu': round(cpu, 1), 'processes': len(tree)}
+        return self.last_sample
+
+    def check(self, driver):
+        """Why the browser should be recycled ('unresponsive', 'memory' or 'cpu'), or None when it is fine"""
+        timeout = self.limits['response_timeout']
+        if timeout and not responsive(driver, timeout):
+            return 'unresponsive'
+        usage = self.sample(driver)
+        if usage is None:
+            return None
+        max_rss = self.limits['max_rss_mb']
+        if max_rss and usage['rss'] > max_rss * MB:
+            print(f"Browser uses {usage['rss'] / MB:.0f} MB, over the {max_rss} MB limit")
+            return 'memory'
+        max_cpu = self.limits['max_cpu_percent']
+        self.hot_samples = self.hot_samples + 1 if max_cpu and usage['cpu'] > max_cpu else 0
+        if self.hot_samples >= self.limits['cpu_samples']:
+            print(f"Browser at {usage['cpu']:.0f}% CPU for {self.hot_samples} samples")
+            return 'cpu'
+        return None
+
+    def terminate(self, driver):
+        """Quit the browser; kill whatever of its process tree is left when quitting hangs or fails"""
+        tree = process_tree(driver)
+        quitter = threading.Thread(target=quit_quietly, args=(driver,), daemon=True)
+        quitter.start()
+        quitter.join(QUIT_TIMEOUT)
+        leftovers = []
+        for process in tree:
+            try:
+                if process.is_running():
+                    process.kill()
+                    leftovers.append(process)
+            except psutil.Error:
+                continue
+        if leftovers:
+            psutil.wait_procs(leftovers, timeout=5)
+            print(f"Killed {len(leftovers)} browser processes that outlived quit")
+        return len(leftovers)
+
+    def record_recycle(self, reason):
+        """Append a recycle event to the metrics file"""
+        self.recycles[reason] += 1
+        usage = self.last_sample or {}
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'event': 'recycle',
+            'reason': reason,
+            'session_seconds': round(time.monotonic() - self.attached_at, 1),
+            'rss_mb': round(usage['rss'] / MB, 1) if 'rss' in usage else None,
+            'peak_rss_mb': round(self.peak_rss / MB, 1) if self.peak_rss else None,
+            'cpu_percent': usage.get('cpu'),
+            'processes': usage.get('processes'),
+        }
+        entry.update(self.context)
+        try:
+            with open(self.metrics_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write watchdog metrics: {e}")
+        return entry
+
+    def status(self):
+        """Last sample and recycles of this process, e.g. for the daemon's status command"""
+        usage = self.last_sample or {}
+        return {
+            'rss_mb': round(usage['rss'] / MB, 1) if 'rss' in usage else None,
+            'cpu_percent': usage.get('cpu'),
+            'processes': usage.get('processes'),
+            'session_seconds': round(time.monotonic() - self.attached_at, 1),
+            'recycles': dict(self.recycles),
+        }
+
+
+def read_metrics(path=WATCHDOG_METRICS):
+    events = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return events
+
+
+def print_metrics(events):
+    by_reason = {}
+    for event in events:
+        by_reason.setdefault(event['reason'], []).append(event)
+    print(f"{'reason':<28} {'recycles':>8} {'avg MB':>8} {'avg session s':>14}")
+    for reason, group in sorted(by_reason.items(), key=lambda item: -len(item[1])):
+        memory = [e['rss_mb'] for e in group if e.get('rss_mb') is not None]
+        average_memory = f"{sum(memory) / len(memory):.0f}" if memory else '-'
+        average_session = sum(e['session_seconds'] for e in group) / len(group)
+        print(f"{reason[:28]:<28} {len(group):>8} {average_memory:>8} {average_session:>14.0f}")
+
+
+if __name__ == "__main__":
+    from browser_profile import LEAN_PROFILE_DIR
+
+    parser = argparse.ArgumentParser(description="Browser watchdog metrics and orphan reaping")
+    parser.add_argument("command", choices=['metrics', 'reap'])
+    parser.add_argument("--profile", default=LEAN_PROFILE_DIR, help="profile directory to reap (default: the lean profile)")
+    parser.add_argument("--metrics", default=WATCHDOG_METRICS)
+    args = parser.parse_args()
+
+    if args.command == 'metrics':
+        events = read_metrics(args.metrics)
+        if events:
+            print_metrics(events)
+        else:
+            print(f"No recycle events in {args.metrics}")
+    elif psutil is None:
+        print("Reaping needs psutil")
+    else:
+        killed = reap_orphans(args.profile)
+        print(f"Killed {killed}" if killed else "No leftover browser processes")
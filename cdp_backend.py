@@ -0,0 +1,505 @@
+"""Asynchronous reporting backend speaking the Chrome DevTools Protocol directly.
+
+Selenium blocks on a chromedriver HTTP round trip for every find/click/script. Here Chrome is
+started with a DevTools port and driven over one WebSocket from asyncio: waits come from DOM
+mutations (a MutationObserver inside the page) and from Page/Network events instead of polling,
+and several tabs or accounts can be driven concurrently from one event loop.
+
+CdpAttendanceReporter runs the same steps as AttendanceReporter (navigate, open future reports,
+select date, submit) and has the same report_attendance(dates=None) -> {date: status} entry
+point: the dates are a checkpointed job of the account, dates the ledger confirms are skipped
+and every outcome is recorded in both. Unlike AttendanceReporter it only reports the month the
+calendar opens on; dates of other months stay in the checkpoint as 'month not shown'.
+"""
+import asyncio
+import base64
+import json
+import os
+import shutil
+import struct
+import subprocess
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from browser_profile import LEAN_ARGUMENTS, LEAN_PROFILE_DIR, prepare_profile, prune_profile
+from checkpoint import CHECKPOINT_DIR, JobCheckpoint
+from date_planner import as_day, month_of, parse_month_title, plan_dates
+from ledger import LEDGER_FILE, Ledger
+from locators import SUBMIT_SEQUENCE
+from page_scripts import CALENDAR_JS, FIND_TEXT_JS, MONTH_TITLE_SCRIPT, SUBMIT_STEPS_JS
+
+SITE_URL = "https://one.prat.idf.il/finish"
+
+CHROME_CANDIDATES = [
+    os.path.join(os.environ.get('PROGRAMFILES', r'C:\Program Files'), r'Google\Chrome\Application\chrome.exe'),
+    os.path.join(os.environ.get('PROGRAMFILES(X86)', r'C:\Program Files (x86)'), r'Google\Chrome\Application\chrome.exe'),
+    os.path.join(os.environ.get('LOCALAPPDATA', ''), r'Google\Chrome\Application\chrome.exe'),
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser',
+]
+
+# Seconds a DevTools command may take before the browser counts as hung
+COMMAND_TIMEOUT = 30
+
+# Helpers defined in the page for every evaluated step (see page_scripts.py)
+PAGE_HELPERS = FIND_TEXT_JS + SUBMIT_STEPS_JS + CALENDAR_JS
+
+
+class CdpError(Exception):
+    """A DevTools command failed or the connection was lost"""
+
+
+def find_chrome():
+    """Path of the Chrome executable"""
+    for candidate in CHROME_CANDIDATES:
+        path = candidate if os.path.isabs(candidate) else shutil.which(candidate)
+        if path and os.path.exists(path):
+            return path
+    raise CdpError("Chrome executable not found")
+
+
+class WebSocket:
+    """Just enough of a WebSocket client (RFC 6455) for a local DevTools endpoint"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, url):
+        parsed = urlparse(url)
+        reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port or 80, limit=2 ** 24)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            f"GET {parsed.path} HTTP/1.1\r\n"
+            f"Host: {parsed.hostname}:{parsed.port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        status_line = (await reader.readuntil(b"\r\n\r\n")).split(b"\r\n", 1)[0]
+        if b" 101 " not in status_line:
+            writer.close()
+            raise CdpError(f"WebSocket handshake failed: {status_line!r}")
+        return cls(reader, writer)
+
+    async def send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack('!H', length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack('!Q', length)
+        mask = os.urandom(4)
+        header += mask
+        # Client frames must be masked
+        masked = (int.from_bytes(payload, 'big') ^ int.from_bytes((mask * (length // 4 + 1))[:length], 'big'))
+        self.writer.write(bytes(header) + masked.to_bytes(length, 'big'))
+        await self.writer.drain()
+
+    async def send(self, text):
+        await self.send_frame(0x1, text.encode('utf-8'))
+
+    async def recv(self):
+        message = b''
+        while True:
+            first, second = await self.reader.readexactly(2)
+            opcode = first & 0x0f
+            length = second & 0x7f
+            if length == 126:
+                length = struct.unpack('!H', await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', await self.reader.readexactly(8))[0]
+            mask = await self.reader.readexactly(4) if second & 0x80 else None
+            data = await self.reader.readexactly(length)
+            if mask:
+                data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+            if opcode == 0x8:
+                raise CdpError("WebSocket closed by Chrome")
+            if opcode == 0x9:
+                await self.send_frame(0xA, data)
+                continue
+            if opcode == 0xA:
+                continue
+            message += data
+            if first & 0x80:
+                return message.decode('utf-8')
+
+    def close(self):
+        self.writer.close()
+
+
+class CdpConnection:
+    """One DevTools WebSocket, multiplexing the browser and every attached tab session"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.next_id = 0
+        self.pending = {}
+        self.listeners = []
+        self.reader_task = asyncio.get_running_loop().create_task(self.read_loop())
+
+    async def read_loop(self):
+        try:
+            while True:
+                message = json.loads(await self.websocket.recv())
+                if 'id' in message:
+                    future = self.pending.pop(message['id'], None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        future.set_exception(CdpError(message['error'].get('message')))
+                    else:
+                        future.set_result(message.get('result', {}))
+                else:
+                    for listener in list(self.listeners):
+                        listener(message)
+        except (CdpError, asyncio.IncompleteReadError, ConnectionError) as e:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CdpError(f"connection lost: {e}"))
+            self.pending.clear()
+
+    async def send(self, method, params=None, session_id=None, timeout=COMMAND_TIMEOUT):
+        """Send a command and return its result. Raises CdpError when it fails, times out or the connection is lost"""
+        self.next_id += 1
+        command_id = self.next_id
+        message = {'id': command_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[command_id] = future
+        try:
+            await self.websocket.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        except ConnectionError as e:
+            raise CdpError(f"connection lost: {e}")
+        except asyncio.TimeoutError:
+            raise CdpError(f"{method} got no answer within {timeout}s")
+        finally:
+            self.pending.pop(command_id, None)
+
+    def event(self, method, session_id=None, predicate=None):
+        """Future resolved with the params of the next matching event"""
+        future = asyncio.get_running_loop().create_future()
+
+        def listener(message):
+            if message.get('method') != method or message.get('sessionId') != session_id:
+                return
+            if predicate is not None and not predicate(message.get('params', {})):
+                return
+            if not future.done():
+                future.set_result(message.get('params', {}))
+
+        self.listeners.append(listener)
+        future.add_done_callback(lambda _: self.listeners.remove(listener))
+        return future
+
+    async def close(self):
+        self.reader_task.cancel()
+        self.websocket.close()
+
+
+class CdpPage:
+    """A tab attached to the connection in flat session mode"""
+
+    def __init__(self, connection, session_id, step_timeout):
+        self.connection = connection
+        self.session_id = session_id
+        self.step_timeout = step_timeout
+        self.inflight = set()
+        self.network_activity = asyncio.Event()
+        connection.listeners.append(self.track_network)
+
+    def track_network(self, message):
+        if message.get('sessionId') != self.session_id:
+            return
+        method = message.get('method', '')
+        request_id = message.get('params', {}).get('requestId')
+        if method == 'Network.requestWillBeSent':
+            self.inflight.add(request_id)
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            self.inflight.discard(request_id)
+        else:
+            return
+        self.network_activity.set()
+
+    async def send(self, method, params=None, timeout=COMMAND_TIMEOUT):
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def enable(self):
+        await asyncio.gather(self.send('Page.enable'), self.send('Runtime.enable'), self.send('Network.enable'))
+
+    async def network_idle(self, idle_seconds=0.5):
+        """Wait until no request is in flight and no network event came for idle_seconds"""
+        deadline = time.monotonic() + self.step_timeout
+        while time.monotonic() < deadline:
+            self.network_activity.clear()
+            try:
+                await asyncio.wait_for(self.network_activity.wait(), idle_seconds)
+            except asyncio.TimeoutError:
+                if not self.inflight:
+                    return True
+        return False
+
+    async def navigate(self, url):
+        loaded = self.connection.event('Page.loadEventFired', self.session_id)
+        await self.send('Page.navigate', {'url': url})
+        await asyncio.wait_for(loaded, self.step_timeout * 2)
+        await self.network_idle()
+
+    async def evaluate(self, body, *args):
+        """Run an async function body in the page with the helpers defined; args are JSON values"""
+        expression = "(async function() {" + PAGE_HELPERS + body + "}).apply(null, " + json.dumps(args) + ")"
+        # the page waits up to step_timeout for each submit step
+        result = await self.send('Runtime.evaluate', {
+            'expression': expression,
+            'awaitPromise': True,
+            'returnByValue': True,
+        }, timeout=self.step_timeout * (len(SUBMIT_SEQUENCE) + 1) + COMMAND_TIMEOUT)
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CdpError(details.get('exception', {}).get('description') or details.get('text'))
+        return result['result'].get('value')
+
+    async def click_text(self, text):
+        await self.evaluate(
+            "var el = await waitForText(arguments[0], arguments[1]); el.scrollIntoView({block: 'center'}); el.click();",
+            text, int(self.step_timeout * 1000),
+        )
+
+
+class CdpAttendanceReporter:
+    def __init__(self, user_data_dir=None, headless=True, step_timeout=10, url=SITE_URL, tabs=1,
+                 account=None, ledger_file=LEDGER_FILE, checkpoint_dir=CHECKPOINT_DIR):
+        """user_data_dir defaults to the lean profile; tabs > 1 spreads the dates over several tabs.
+
+        account names the ledger and checkpoint entries, by default user_data_dir like AttendanceReporter.
+        """
+        self.user_data_dir = user_data_dir or LEAN_PROFILE_DIR
+        self.headless = headless
+        self.step_timeout = step_timeout
+        self.url = url
+        self.tabs = tabs
+        self.account = account or self.user_data_dir
+        self.ledger_file = ledger_file
+        self.checkpoint_dir = checkpoint_dir
+        self.ledger = None
+        self.job = None
+        self.process = None
+        self.connection = None
+
+    async def start(self):
+        """Launch Chrome with a DevTools port and connect to it"""
+        if self.user_data_dir == LEAN_PROFILE_DIR:
+            prepare_profile(self.user_data_dir)
+        port_file = os.path.join(self.user_data_dir, 'DevToolsActivePort')
+        if os.path.exists(port_file):
+            os.remove(port_file)
+        arguments = [find_chrome(), f'--user-data-dir={self.user_data_dir}', '--remote-debugging-port=0']
+        arguments += LEAN_ARGUMENTS
+        if self.headless:
+            arguments += ['--headless=new', '--disable-gpu', '--no-sandbox']
+        arguments.append('about:blank')
+        self.process = subprocess.Popen(arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + 30
+        while not os.path.exists(port_file):
+            if time.monotonic() > deadline or self.process.poll() is not None:
+                raise CdpError("Chrome did not open its DevTools port")
+            await asyncio.sleep(0.05)
+        with open(port_file) as f:
+            port = int(f.readline().strip())
+        version = await asyncio.to_thread(lambda: json.load(urlopen(f"http://127.0.0.1:{port}/json/version")))
+        self.connection = CdpConnection(await WebSocket.connect(version['webSocketDebuggerUrl']))
+        print(f"Chrome {version.get('Browser')} connected over DevTools")
+
+    async def new_page(self):
+        target = await self.connection.send('Target.createTarget', {'url': 'about:blank'})
+        attached = await self.connection.send('Target.attachToTarget', {'targetId': target['targetId'], 'flatten': True})
+        page = CdpPage(self.connection, attached['sessionId'], self.step_timeout)
+        await page.enable()
+        return page
+
+    async def navigate_to_site(self, page):
+        """Navigate to the reporting site"""
+        try:
+            await page.navigate(self.url)
+            print("Successfully navigated to site")
+            return True
+        except (CdpError, asyncio.TimeoutError) as e:
+            print(f"Error navigating to site: {e}")
+            return False
+
+    async def access_future_reports(self, page):
+        """Access the future reports section"""
+        try:
+            await page.click_text('דיווחים עתידיים')
+            await page.network_idle()
+            print("Accessed future reports successfully")
+            return True
+        except CdpError as e:
+            print(f"Error accessing future reports: {e}")
+            return False
+
+    async def shown_month(self, page):
+        """(year, month) of the calendar title, the current month when no title could be read"""
+        try:
+            texts = await page.evaluate(MONTH_TITLE_SCRIPT)
+        except CdpError as e:
+            print(f"Could not read the calendar month: {e}")
+            texts = []
+        for text in texts or []:
+            month = parse_month_title(text)
+            if month:
+                return month
+        return month_of(datetime.now())
+
+    async def find_and_click_date(self, page, date):
+        """Click a date number in the calendar and wait for the report form.
+
+        Returns 'clicked', or why not: 'missing', 'disabled', 'reported' or 'no form'.
+        """
+        state = await page.evaluate("""
+            var cell = findDay(arguments[0]);
+            if (!cell) return 'missing';
+            if (cell.disabled) return 'disabled';
+            if (cell.reported) return 'reported';
+            cell.element.scrollIntoView({block: 'center'});
+            cell.element.click();
+            try { await waitForText('נמצא/ת ביחידה', arguments[1]); } catch (e) { return 'no form'; }
+            return 'clicked';
+        """, date.day, int(self.step_timeout * 1000))
+        if state != 'clicked':
+            print(f"Could not select date {date.day}: {state}")
+        return state
+
+    async def submit_report(self, page):
+        """Submit the attendance report through the sequence of buttons"""
+        result = (await page.evaluate(
+            "return await clickSteps(arguments[0], arguments[1]);",
+            [list(step) for step in SUBMIT_SEQUENCE], int(self.step_timeout * 1000),
+        ))['results']
+        for step in result:
+            print(f"Step {step['step']}: {'ok' if step['ok'] else step.get('error')} in {step['ms']:.0f}ms")
+        if result and result[-1]['ok'] and len(result) == len(SUBMIT_SEQUENCE):
+            await page.network_idle()
+            return True
+        return False
+
+    def finish_date(self, date, status, results):
+        """Record the status of a date in the results, the ledger and the checkpoint"""
+        results[date] = status
+        self.ledger.record(self.account, date, status)
+        self.job.mark(date, status)
+
+    async def report_in_page(self, page, dates, results):
+        """Process dates one after another in one tab"""
+        if not await self.navigate_to_site(page) or not await self.access_future_reports(page):
+            return
+        # Cells are matched by day number, so only the month on screen can be reported here
+        month = await self.shown_month(page)
+        for date in dates:
+            print(f"\nProcessing date: {date.strftime('%d/%m/%Y')}")
+            if month_of(date) != month:
+                print(f"Skipping date {date.strftime('%d/%m/%Y')} - the calendar shows {month[1]:02d}/{month[0]}")
+                self.finish_date(date, 'month not shown', results)
+                continue
+            try:
+                state = await self.find_and_click_date(page, date)
+                if state == 'reported':
+                    # the calendar shows it reported, e.g. by an interrupted run whose submit went through
+                    self.finish_date(date, 'calendar reported', results)
+                elif state != 'clicked':
+                    self.finish_date(date, 'not selectable', results)
+                else:
+                    self.ledger.record(self.account, date, 'submitting')
+                    self.finish_date(date, 'reported' if await self.submit_report(page) else 'submit failed', results)
+            except (CdpError, asyncio.TimeoutError) as e:
+                # e.g. a click navigated and destroyed the execution context; the other tabs go on
+                print(f"Date {date.strftime('%d/%m/%Y')} failed in the DevTools session: {e}")
+                self.finish_date(date, 'failed', results)
+                # leave whatever page the failure left for the next date
+                if not await self.navigate_to_site(page) or not await self.access_future_reports(page):
+                    break
+
+    async def run(self, dates):
+        """Start Chrome, report dates (spread over the tabs) and close. Returns {date: status}
+
+        The dates are resumed as the account's checkpointed job; the ones the ledger confirms are skipped.
+        """
+        results = {}
+        self.ledger = Ledger(self.ledger_file)
+        self.job = JobCheckpoint.resume(self.account, [as_day(d) for d in dates], self.checkpoint_dir)
+        pending = self.ledger.pending(self.account, self.job.remaining())
+        for confirmed_date in self.job.remaining():
+            if confirmed_date not in pending:
+                results[confirmed_date] = 'already confirmed'
+                self.job.mark(confirmed_date, 'already confirmed')
+        dates = pending
+        if not dates:
+            print("All dates are already confirmed in the ledger")
+            self.close_bookkeeping()
+            return results
+        try:
+            await self.start()
+            tab_count = max(1, min(self.tabs, len(dates)))
+            pages = await asyncio.gather(*(self.new_page() for _ in range(tab_count)))
+            await asyncio.gather(*(
+                self.report_in_page(page, dates[index::tab_count], results) for index, page in enumerate(pages)
+            ))
+        except CdpError as e:
+            print(f"\nAn error occurred in the DevTools session: {e}")
+        finally:
+            await self.close()
+            self.close_bookkeeping()
+        return results
+
+    def close_bookkeeping(self):
+        """Keep the checkpoint while dates are left and close the ledger"""
+        if not self.job.finish():
+            print(f"Checkpoint kept, {len(self.job.remaining())} dates left for the next run")
+        self.ledger.close()
+
+    async def close(self):
+        if self.connection is not None:
+            try:
+                await asyncio.wait_for(self.connection.send('Browser.close'), 5)
+            except (CdpError, asyncio.TimeoutError):
+                pass
+            await self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            try:
+                await asyncio.to_thread(self.process.wait, 10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.user_data_dir == LEAN_PROFILE_DIR:
+            prune_profile(self.user_data_dir)
+
+    def report_attendance(self, dates=None):
+        """Report dates (by default the workdays from today until next Thursday) from a fresh event loop.
+
+        Returns {date: status}.
+        """
+        print("\n=== Starting DevTools attendance reporting ===")
+        return asyncio.run(self.run(plan_dates() if dates is None else list(dates)))
+
+
+async def report_accounts(accounts):
+    """Drive several accounts concurrently from one event loop.
+
+    accounts is a list of (user_data_dir, dates). Returns one {date: status} per account.
+    """
+    return await asyncio.gather(*(
+        CdpAttendanceReporter(user_data_dir).run(list(dates)) for user_data_dir, dates in accounts
+    ))
@@ -0,0 +1,127 @@
+"""Persisted checkpoint of a reporting job, so an interrupted run resumes from its first incomplete date.
+
+A job is the list of dates of one account with the status of every date worked on so far.
+The checkpoint is rewritten after every date; a run that dies (crash, killed worker, dead
+browser) leaves it behind and the next run of the account picks up its remaining dates.
+A date that keeps failing is given up after MAX_DATE_ATTEMPTS runs, so a day the site
+never offers does not keep the job open forever.
+"""
+import hashlib
+import json
+import os
+import uuid
+from datetime import date, datetime
+
+from date_planner import as_day
+from ledger import DONE_STATUSES
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints')
+
+MAX_DATE_ATTEMPTS = 3
+
+
+def checkpoint_path(account, directory=CHECKPOINT_DIR):
+    # The account may be a profile path, so the file is named after its hash
+    return os.path.join(directory, hashlib.sha1(str(account).encode('utf-8')).hexdigest()[:12] + '.json')
+
+
+def parse_days(saved):
+    """{'YYYY-MM-DD': value} -> {date: value}"""
+    return {date.fromisoformat(day): value for day, value in saved.items()}
+
+
+class JobCheckpoint:
+    def __init__(self, account, dates, path=None, job_id=None, statuses=None, attempts=None, recycles=0):
+        self.account = account
+        self.dates = sorted(set(as_day(d) for d in dates))
+        self.path = path or checkpoint_path(account)
+        self.job_id = job_id or uuid.uuid4().hex[:8]
+        self.statuses = statuses or {}
+        self.attempts = attempts or {}
+        self.recycles = recycles
+
+    @classmethod
+    def resume(cls, account, dates, directory=CHECKPOINT_DIR):
+        """The unfinished job of the account extended with dates, or a new job of dates.
+
+        Saved dates before today are dropped unless dates asks for them again.
+        """
+        path = checkpoint_path(account, directory)
+        try:
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return cls(account, dates, path)
+        # Past days are no longer in the future reports calendar; only dates asked for again are kept
+        requested = set(as_day(d) for d in dates)
+        today = date.today()
+
+        def kept(day):
+            return day >= today or day in requested
+
+        saved_dates = [date.fromisoformat(d) for d in saved['dates']]
+        dropped = [d for d in saved_dates if not kept(d)]
+        if dropped:
+            print(f"Dropping {len(dropped)} past dates of job {saved['job_id']}")
+        job = cls(
+            account,
+            [d for d in saved_dates if kept(d)] + list(requested),
+            path,
+            saved['job_id'],
+            {day: status for day, status in parse_days(saved['statuses']).items() if kept(day)},
+            {day: count for day, count in parse_days(saved['attempts']).items() if kept(day)},
+            saved.get('recycles', 0),
+        )
+        if job.remaining():
+            print(f"Resuming job {job.job_id}: {len(job.remaining())} of {len(job.dates)} dates left")
+        return job
+
+    def is_done(self, day):
+        return (self.statuses.get(day) in DONE_STATUSES
+                or self.attempts.get(day, 0) >= MAX_DATE_ATTEMPTS)
+
+    def remaining(self):
+        """The dates still to work on, in order"""
+        return [d for d in self.dates if not self.is_done(d)]
+
+    def mark(self, day, status):
+        """Record the outcome of one attempt at day and save the checkpoint"""
+        day = as_day(day)
+        self.statuses[day] = status
+        if status not in DONE_STATUSES:
+            self.attempts[day] = self.attempts.get(day, 0) + 1
+            if self.attempts[day] >= MAX_DATE_ATTEMPTS:
+                print(f"Giving up on {day.strftime('%d/%m/%Y')} after {MAX_DATE_ATTEMPTS} attempts")
+        self.save()
+
+    def note_recycle(self):
+        self.recycles += 1
+        self.save()
+
+    def save(self):
+        """Write the checkpoint atomically"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {
+            'job_id': self.job_id,
+            'account': str(self.account),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'recycles': self.recycles,
+            'dates': [d.isoformat() for d in self.dates],
+            'statuses': {d.isoformat(): status for d, status in self.statuses.items()},
+            'attempts': {d.isoformat(): count for d, count in self.attempts.items()},
+        }
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def finish(self):
+        """Delete the checkpoint once no date is left, otherwise keep it for the next run"""
+        if self.remaining():
+            self.save()
+            return False
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        return True
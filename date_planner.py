@@ -0,0 +1,122 @@
+"""Which dates to report: workdays of a date range in the Israeli Sunday-Thursday week.
+
+Holidays and other exceptions come from a plain text file (holidays.txt by default), one
+date or date range per line, optionally followed by a description:
+
+    # חגים
+    2026-10-03..2026-10-04  ראש השנה
+    2026-10-12              יום כיפור
+    +2026-10-16             Friday reported as a workday
+
+A line starting with '+' turns the dates into workdays instead of days off.
+
+The planned dates are grouped by month, so AttendanceReporter moves the calendar to every
+month once and reports all its dates there.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'holidays.txt')
+
+# Python weekday numbers (Monday=0) of Sunday through Thursday
+WORKDAYS = (6, 0, 1, 2, 3)
+THURSDAY = 3
+
+HEBREW_MONTHS = ['ינואר', 'פברואר', 'מרץ', 'אפריל', 'מאי', 'יוני', 'יולי', 'אוגוסט',
+                 'ספטמבר', 'אוקטובר', 'נובמבר', 'דצמבר']
+ENGLISH_MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+                  'september', 'october', 'november', 'december']
+
+
+def parse_day(text):
+    """YYYY-MM-DD -> date"""
+    return datetime.strptime(text.strip(), '%Y-%m-%d').date()
+
+
+def as_day(value):
+    """datetime -> date, so dates from different sources compare equal"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def load_exceptions(path=HOLIDAYS_FILE):
+    """(days off, extra workdays) from the exceptions file; both empty when it does not exist"""
+    days_off, extra_workdays = set(), set()
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return days_off, extra_workdays
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        target = days_off
+        if line.startswith('+'):
+            target = extra_workdays
+            line = line[1:].strip()
+        first, _, last = line.split()[0].partition('..')
+        try:
+            start, end = parse_day(first), parse_day(last or first)
+        except ValueError:
+            raise ValueError(f"{path}:{number}: expected YYYY-MM-DD or YYYY-MM-DD..YYYY-MM-DD, got {line!r}")
+        target.update(days_between(start, end))
+    return days_off, extra_workdays
+
+
+def days_between(start, end):
+    """All dates from start through end"""
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def is_workday(day, exceptions=None):
+    """Sunday-Thursday, unless the exceptions (see load_exceptions) say otherwise"""
+    day = as_day(day)
+    days_off, extra_workdays = exceptions or (set(), set())
+    if day in extra_workdays:
+        return True
+    return day.weekday() in WORKDAYS and day not in days_off
+
+
+def default_range(today=None):
+    """Today until the coming Thursday"""
+    start = as_day(today or datetime.now())
+    return start, start + timedelta(days=(THURSDAY - start.weekday()) % 7)
+
+
+def plan_dates(start=None, end=None, holidays_file=HOLIDAYS_FILE):
+    """The workdays from start through end; start defaults to today, end to the Thursday on or after start"""
+    start = as_day(start) if start else default_range()[0]
+    end = as_day(end) if end else default_range(start)[1]
+    if end < start:
+        raise ValueError(f"Date range ends ({end}) before it starts ({start})")
+    exceptions = load_exceptions(holidays_file)
+    return [day for day in days_between(start, end) if is_workday(day, exceptions)]
+
+
+def month_of(day):
+    return day.year, day.month
+
+
+def group_by_month(dates):
+    """{(year, month): dates of that month}, months and dates in order"""
+    months = {}
+    for day in sorted(set(as_day(d) for d in dates)):
+        months.setdefault(month_of(day), []).append(day)
+    return months
+
+
+def parse_month_title(text):
+    """(year, month) from a calendar title like 'אוקטובר 2026' or 'October 2026', else None"""
+    year = re.search(r'\b(20\d\d)\b', text or '')
+    if not year:
+        return None
+    lowered = text.lower()
+    for names in (HEBREW_MONTHS, ENGLISH_MONTHS):
+        for number, name in enumerate(names, 1):
+            if name in lowered:
+                return int(year.group(1)), number
+    numeric = re.search(r'\b(\d{1,2})[/.](20\d\d)\b', text)
+    if numeric and 1 <= int(numeric.group(1)) <= 12:
+        return int(numeric.group(2)), int(numeric.group(1))
+    return None
@@ -0,0 +1,100 @@
+"""Compact DOM snapshots of the pages a run goes through, for checking locators offline.
+
+In record mode AttendanceReporter saves the page before each locator is used: the future
+reports button, the calendar of every month it reports and each submit step. A snapshot
+keeps only the elements, their text and the attributes the XPath strategies can look at;
+scripts and styles are dropped and elements the browser did not render are marked with
+data-snapshot-hidden, so the replay can tell what was clickable.
+
+Snapshots are JSON files in snapshots/<run id>/, replayed with snapshot_replay.py.
+"""
+import glob
+import json
+import os
+import re
+from datetime import datetime
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+
+HIDDEN_ATTRIBUTE = 'data-snapshot-hidden'
+
+# תמונת מצב מצומצמת של ה-DOM: תגיות, טקסט ומאפיינים רלוונטיים בלבד
+SNAPSHOT_SCRIPT = """
+var KEEP = /^(id|class|role|title|type|name|disabled|hidden|aria-.*|data-.*)$/;
+var SKIP = {SCRIPT: 1, STYLE: 1, NOSCRIPT: 1, TEMPLATE: 1, LINK: 1, META: 1, IFRAME: 1, svg: 1, SVG: 1};
+function escape(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+}
+function dump(el, hiddenAbove) {
+    if (SKIP[el.tagName]) return '';
+    var tag = el.tagName.toLowerCase();
+    var out = '<' + tag;
+    for (var i = 0; i < el.attributes.length; i++) {
+        var attribute = el.attributes[i];
+        if (KEEP.test(attribute.name)) out += ' ' + attribute.name + '="' + escape(attribute.value) + '"';
+    }
+    var hidden = hiddenAbove;
+    if (!hidden && el !== document.body && el.offsetParent === null && getComputedStyle(el).position !== 'fixed') {
+        hidden = true;
+        out += ' data-snapshot-hidden="1"';
+    }
+    out += '>';
+    for (var node = el.firstChild; node; node = node.nextSibling) {
+        if (node.nodeType === 3) {
+            var text = node.nodeValue.replace(/\\s+/g, ' ');
+            if (text.trim()) out += escape(text);
+        } else if (node.nodeType === 1) {
+            out += dump(node, hidden);
+        }
+    }
+    return out + '</' + tag + '>';
+}
+return dump(document.body, false);
+"""
+
+
+class SnapshotRecorder:
+    def __init__(self, run_id, directory=SNAPSHOT_DIR):
+        self.directory = os.path.join(directory, run_id)
+        self.taken = set()
+
+    def take(self, driver, name, **context):
+        """Save the current page as snapshot name, once per run. context tells the replay what to look for"""
+        if name in self.taken:
+            return None
+        self.taken.add(name)
+        try:
+            html = driver.execute_script(SNAPSHOT_SCRIPT)
+            url = driver.current_url
+        except Exception as e:
+            print(f"Could not take snapshot {name}: {e}")
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{len(self.taken):02d}-{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}.json")
+        snapshot = {
+            'name': name,
+            'url': url,
+            'taken_at': datetime.now().isoformat(timespec='seconds'),
+            'context': context,
+            'html': html,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        return path
+
+
+def load_snapshots(paths):
+    """Snapshots from files and directories (searched recursively), in path order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.json'), recursive=True)))
+        else:
+            files.append(path)
+    snapshots = []
+    for name in files:
+        with open(name, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        snapshot['path'] = name
+        snapshots.append(snapshot)
+    return snapshots
@@ -0,0 +1,75 @@
+"""Resolve the chromedriver path from a local cache instead of asking webdriver-manager every run.
+
+ChromeDriverManager().install() checks versions over the network. The resolved path is cached
+together with the installed Chrome version and only re-resolved when that version changes.
+When the network is down the cached driver is used as is.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'driver_cache.json')
+
+CHROME_BINARIES = [
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+]
+
+
+def chrome_version():
+    """Version of the installed Chrome, or None if it cannot be found without starting a browser"""
+    if sys.platform == 'win32':
+        import winreg
+        for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            try:
+                with winreg.OpenKey(hive, r'Software\Google\Chrome\BLBeacon') as key:
+                    return winreg.QueryValueEx(key, 'version')[0]
+            except OSError:
+                continue
+        return None
+    for binary in CHROME_BINARIES:
+        try:
+            output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r'\d+(\.\d+)+', output)
+        if match:
+            return match.group(0)
+    return None
+
+
+def load_cache(cache_file=CACHE_FILE):
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_driver_path(cache_file=CACHE_FILE):
+    """Return a chromedriver path, re-resolving it only when Chrome's version changed"""
+    cache = load_cache(cache_file)
+    version = chrome_version()
+    cached_path = cache.get('driver_path')
+    cached_usable = bool(cached_path) and os.path.exists(cached_path)
+
+    if cached_usable and (version is None or version == cache.get('chrome_version')):
+        return cached_path
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        driver_path = ChromeDriverManager().install()
+    except Exception as e:
+        if cached_usable:
+            print(f"Driver re-validation failed ({e}), using cached driver")
+            return cached_path
+        raise
+
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'chrome_version': version, 'driver_path': driver_path}, f, indent=2)
+    except OSError as e:
+        print(f"Could not save driver cache: {e}")
+    return driver_path
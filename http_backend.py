@@ -0,0 +1,215 @@
+"""Attendance reporting over plain HTTP, reusing the session cookies of the browser profile.
+
+A browser is only opened to harvest (or refresh) the session cookies from the Chrome profile
+in user_data_dir. The calendar read and the per-date submissions are then plain requests over
+a pooled connection. When the site keeps rejecting the session the Selenium path is used instead.
+
+The endpoints and the JSON payload are the ones mock_site.py serves, not the real site's API,
+which has not been captured yet. So the backend only works against the mock (or a site
+serving the same API) and needs its base URL; the paths are configurable for when the real
+requests are known. An answer that is not JSON, or a 404, means the API is not there: the
+run falls back to the browser at once instead of harvesting cookies again.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+import urllib3
+
+from browser_profile import LEAN_ARGUMENTS, LEAN_PROFILE_DIR, prepare_profile
+from driver_cache import cached_driver_path
+
+DEFAULT_USER_DATA_DIR = LEAN_PROFILE_DIR
+COOKIE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'session_cookies.json')
+
+ENDPOINTS = {
+    'calendar': '/api/finish/future-reports',
+    'report': '/api/finish/report',
+}
+
+# Same choices as the 'נמצא/ת ביחידה' -> 'נוכח/ת' buttons of the web flow
+REPORT_STATUS = {
+    'mainStatus': "נמצא/ת ביחידה",
+    'secondaryStatus': "נוכח/ת",
+}
+
+
+class SessionRejected(Exception):
+    """The site did not accept the session cookies"""
+
+
+class RequestFailed(Exception):
+    """The site answered a request with an error status"""
+
+    def __init__(self, endpoint, status, answer):
+        detail = answer.get('error', answer) if isinstance(answer, dict) else answer
+        super().__init__(f"{endpoint} answered {status}: {detail}")
+        self.status = status
+        self.answer = answer
+
+
+def harvest_cookies(url, user_data_dir=DEFAULT_USER_DATA_DIR, cookie_file=COOKIE_FILE):
+    """Open the browser profile once, load the site and save its session cookies"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    options = Options()
+    if user_data_dir == LEAN_PROFILE_DIR:
+        prepare_profile(user_data_dir)
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+    options.add_argument(f'user-data-dir={user_data_dir}')
+    options.add_argument('--profile-directory=Default')
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(service=ChromeService(cached_driver_path()), options=options)
+    try:
+        driver.get(url)
+        WebDriverWait(driver, 20).until(lambda d: d.execute_script("return document.readyState") == 'complete')
+        cookies = driver.get_cookies()
+    finally:
+        driver.quit()
+
+    with open(cookie_file, 'w', encoding='utf-8') as f:
+        json.dump({'harvested_at': time.time(), 'cookies': cookies}, f, indent=2)
+    print(f"Harvested {len(cookies)} session cookies")
+    return cookies
+
+
+def load_cookies(cookie_file=COOKIE_FILE):
+    """Return the saved cookies that did not expire yet, or None if there are none"""
+    try:
+        with open(cookie_file, encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    cookies = [c for c in saved.get('cookies', []) if c.get('expiry') is None or c['expiry'] > now]
+    return cookies or None
+
+
+class HttpAttendanceReporter:
+    def __init__(self, base_url, user_data_dir=DEFAULT_USER_DATA_DIR, cookie_file=COOKIE_FILE,
+                 endpoints=None, pool_size=4, timeout=10, fallback=None, cookies=None):
+        """base_url is the site serving the API, e.g. mock_site.py's http://127.0.0.1:8765.
+
+        fallback is called with the list of dates when the HTTP session is rejected.
+
+        cookies can be given directly (a list of {'name', 'value'} dicts) instead of harvesting them.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.user_data_dir = user_data_dir
+        self.cookie_file = cookie_file
+        self.endpoints = dict(ENDPOINTS, **(endpoints or {}))
+        self.fallback = fallback
+        self.cookies = cookies
+        self.http = urllib3.PoolManager(
+            maxsize=pool_size,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=2, redirect=False, backoff_factor=0.3),
+        )
+
+    def refresh_cookies(self):
+        """Harvest fresh cookies through the browser profile"""
+        self.cookies = harvest_cookies(self.base_url + "/finish", self.user_data_dir, self.cookie_file)
+
+    def ensure_cookies(self):
+        if self.cookies is None:
+            self.cookies = load_cookies(self.cookie_file)
+        if self.cookies is None:
+            self.refresh_cookies()
+
+    def request(self, method, endpoint, fields=None, payload=None):
+        """Send a request with the session cookies and return (status, decoded JSON answer).
+
+        Raises SessionRejected when sent to the login flow and RequestFailed on any other non-2xx
+        answer or one that is not JSON (the endpoint does not exist on this site).
+        """
+        headers = {
+            'Cookie': '; '.join(f"{c['name']}={c['value']}" for c in self.cookies),
+            'Accept': 'application/json',
+        }
+        body = None
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+        response = self.http.request(
+            method, self.base_url + self.endpoints[endpoint], fields=fields, body=body, headers=headers
+        )
+        content_type = response.headers.get('Content-Type', '')
+        # A redirect or an auth error means we were sent to the login flow
+        if response.status in (401, 403) or 300 <= response.status < 400:
+            raise SessionRejected(f"{endpoint} answered {response.status} ({content_type})")
+        if 'json' not in content_type:
+            raise RequestFailed(endpoint, response.status, f"not a JSON answer ({content_type or 'no content type'})")
+        answer = json.loads(response.data.decode('utf-8'))
+        if not 200 <= response.status < 300:
+            raise RequestFailed(endpoint, response.status, answer)
+        return response.status, answer
+
+    def read_calendar(self, dates):
+        """Read the calendar state of every month covering dates. Returns {date: {'disabled', 'reported'}}"""
+        states = {}
+        for month in sorted({d.strftime('%Y-%m') for d in dates}):
+            _, answer = self.request('GET', 'calendar', fields={'month': month})
+            for day in answer.get('days', []):
+                states[datetime.strptime(day['date'], '%Y-%m-%d').date()] = day
+        return states
+
+    def submit_date(self, date):
+        """Submit the attendance of one date. Returns True when the site accepted it"""
+        try:
+            status, answer = self.request('POST', 'report', payload=dict(REPORT_STATUS, date=date.isoformat()))
+        except RequestFailed as e:
+            print(f"Report for {date.strftime('%d/%m/%Y')} refused: {e}")
+            return False
+        if not answer.get('ok'):
+            print(f"Report for {date.strftime('%d/%m/%Y')} refused: {answer.get('error', status)}")
+            return False
+        return True
+
+    def report_dates(self, dates):
+        """Report every date that is open in the calendar. Returns {date: status}"""
+        results = {}
+        calendar = self.read_calendar(dates)
+        for date in dates:
+            state = calendar.get(date)
+            if state is None:
+                # not in the calendar's answer, so nothing is known about it
+                results[date] = 'unknown'
+            elif state.get('disabled'):
+                results[date] = 'disabled'
+            elif state.get('reported'):
+                results[date] = 'already reported'
+            else:
+                results[date] = 'reported' if self.submit_date(date) else 'failed'
+            print(f"{date.strftime('%d/%m/%Y')}: {results[date]}")
+        return results
+
+    def report_attendance(self, dates):
+        """Report the given dates over HTTP, refreshing the session once and then falling back.
+
+        A calendar request failing with any other error status also falls back to the browser.
+        """
+        dates = [d.date() if isinstance(d, datetime) else d for d in dates]
+        print("\n=== Starting HTTP attendance reporting ===")
+        try:
+            self.ensure_cookies()
+            try:
+                return self.report_dates(dates)
+            except SessionRejected as e:
+                print(f"Session rejected ({e}), refreshing cookies")
+                self.refresh_cookies()
+                return self.report_dates(dates)
+        except (SessionRejected, RequestFailed) as e:
+            print(f"Session still rejected ({e})" if isinstance(e, SessionRejected) else f"HTTP reporting failed ({e})")
+            if self.fallback is None:
+                raise
+            print("Falling back to the browser")
+            return self.fallback(dates)
+        finally:
+            self.http.clear()
@@ -0,0 +1,92 @@
+"""Local SQLite ledger of the submitted dates, so reruns skip the days already reported.
+
+Every date a run touches is recorded as (account, date, status, timestamp). A date counts as
+confirmed once it was reported by the bot or seen as reported in the site's calendar;
+only the other dates are worked on again.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+LEDGER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'attendance_ledger.sqlite3')
+
+CONFIRMED_STATUSES = ('reported', 'calendar reported')
+
+# Date statuses that need no further work: confirmed now or by the ledger before the run
+DONE_STATUSES = CONFIRMED_STATUSES + ('already confirmed',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    account TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (account, date)
+);
+CREATE TABLE IF NOT EXISTS submission_log (
+    account TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    logged_at TEXT NOT NULL
+);
+"""
+
+
+def day_key(date):
+    return date.strftime('%Y-%m-%d')
+
+
+class Ledger:
+    def __init__(self, path=LEDGER_FILE):
+        # Batch workers share the file, so wait on locks instead of failing
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def record(self, account, date, status):
+        """Set the current status of a date and append it to the submission log"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO submissions (account, date, status, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (account, date) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (account, day_key(date), status, now),
+            )
+            self.connection.execute(
+                "INSERT INTO submission_log (account, date, status, logged_at) VALUES (?, ?, ?, ?)",
+                (account, day_key(date), status, now),
+            )
+
+    def status(self, account, date):
+        row = self.connection.execute(
+            "SELECT status FROM submissions WHERE account = ? AND date = ?", (account, day_key(date))
+        ).fetchone()
+        return row[0] if row else None
+
+    def confirmed(self, account, dates):
+        """The subset of dates already confirmed for the account"""
+        keys = {day_key(date): date for date in dates}
+        if not keys:
+            return set()
+        placeholders = ', '.join('?' for _ in keys)
+        rows = self.connection.execute(
+            f"SELECT date FROM submissions WHERE account = ? AND date IN ({placeholders}) "
+            f"AND status IN ({', '.join('?' for _ in CONFIRMED_STATUSES)})",
+            (account, *keys, *CONFIRMED_STATUSES),
+        ).fetchall()
+        return {keys[row[0]] for row in rows}
+
+    def pending(self, account, dates):
+        """dates without the confirmed ones, in their original order"""
+        done = self.confirmed(account, dates)
+        return [date for date in dates if date not in done]
+
+    def reconcile(self, account, reported_dates):
+        """Mark the dates the calendar shows as reported. Returns the newly confirmed dates"""
+        newly_confirmed = [date for date in reported_dates if date not in self.confirmed(account, [date])]
+        for date in newly_confirmed:
+            self.record(account, date, 'calendar reported')
+        return newly_confirmed
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,123 @@
+"""Success/failure/latency statistics for the locator strategies used by the reporting scripts.
+
+Every locator (a date cell, the 'דיווחים עתידיים' button, each submit button) has a few
+alternative XPath strategies. The registry records how each one performed, persists that to a
+local JSON file and ranks the strategies so the historically fastest working one is tried first.
+Older results decay on every new sample, so a site change re-ranks the strategies by itself.
+
+Run this file directly to print the collected stats.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+STATS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locator_stats.json')
+
+# Weight kept by the older samples every time a strategy gets a new one
+DECAY = 0.8
+# Below this (smoothed) success rate a strategy is tried only after the working ones
+WORKING_RATE = 0.5
+
+
+class LocatorRegistry:
+    def __init__(self, path=STATS_FILE, decay=DECAY):
+        """Load the saved stats (if any) from path"""
+        self.path = path
+        self.decay = decay
+        self.stats = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except (OSError, ValueError):
+            self.stats = {}
+
+    def entry(self, locator, strategy):
+        """Return the stats record of a strategy, creating an empty one if needed"""
+        strategies = self.stats.setdefault(locator, {})
+        return strategies.setdefault(strategy, {
+            'successes': 0.0,
+            'failures': 0.0,
+            'latency': None,
+            'last_latency': None,
+            'last_used': None,
+        })
+
+    def success_rate(self, record):
+        """Smoothed success rate - an unseen strategy starts at 0.5"""
+        return (record['successes'] + 1) / (record['successes'] + record['failures'] + 2)
+
+    def ranked(self, locator, strategies):
+        """Order (name, xpath) strategies: working ones first, fastest first, then the original order"""
+        known = self.stats.get(locator, {})
+
+        def sort_key(item):
+            position, (name, _) = item
+            record = known.get(name)
+            if record is None:
+                return (0, float('inf'), position)
+            working = 0 if self.success_rate(record) >= WORKING_RATE else 1
+            latency = record['latency'] if record['latency'] is not None else float('inf')
+            return (working, latency, position)
+
+        return [strategy for _, strategy in sorted(enumerate(strategies), key=sort_key)]
+
+    def record(self, locator, strategy, success, latency):
+        """Add one attempt result. Latency is in seconds"""
+        record = self.entry(locator, strategy)
+        record['successes'] = record['successes'] * self.decay + (1 if success else 0)
+        record['failures'] = record['failures'] * self.decay + (0 if success else 1)
+        record['last_latency'] = round(latency, 3)
+        record['last_used'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        if success:
+            if record['latency'] is None:
+                record['latency'] = round(latency, 3)
+            else:
+                record['latency'] = round(record['latency'] * self.decay + latency * (1 - self.decay), 3)
+
+    def save(self):
+        """Write the stats file atomically, through a temp file of its own (batch workers save at the same time)"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp',
+                                            dir=os.path.dirname(os.path.abspath(self.path)))
+        except OSError as e:
+            print(f"Could not save locator stats: {e}")
+            return
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save locator stats: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def summary(self):
+        """Rows of (locator, strategy, success rate, avg latency, last latency, last used)"""
+        rows = []
+        for locator, strategies in sorted(self.stats.items()):
+            for name, record in strategies.items():
+                rows.append((
+                    locator,
+                    name,
+                    self.success_rate(record),
+                    record['latency'],
+                    record['last_latency'],
+                    record['last_used'],
+                ))
+        return rows
+
+    def print_summary(self):
+        """Print the stats table, one line per strategy"""
+        print(f"{'locator':<18} {'strategy':<16} {'success':>8} {'avg s':>8} {'last s':>8}  last used")
+        for locator, name, rate, latency, last_latency, last_used in self.summary():
+            avg = f"{latency:.3f}" if latency is not None else '-'
+            last = f"{last_latency:.3f}" if last_latency is not None else '-'
+            print(f"{locator:<18} {name:<16} {rate:>8.0%} {avg:>8} {last:>8}  {last_used or '-'}")
+
+
+if __name__ == "__main__":
+    LocatorRegistry(sys.argv[1] if len(sys.argv) > 1 else STATS_FILE).print_summary()
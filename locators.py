@@ -0,0 +1,52 @@
+"""XPath strategies of AttendanceReporter, kept apart from Selenium so they can be checked offline.
+
+Every locator has several alternative (name, xpath) strategies; the reporter tries them in
+the order ranked by locator_stats.py and snapshot_replay.py evaluates them against recorded
+DOM snapshots without a browser.
+"""
+
+# Buttons pressed in order to submit the report of a selected date
+SUBMIT_SEQUENCE = [
+    ("נמצא/ת ביחידה", "Unit presence"),
+    ("נוכח/ת", "Presence"),
+    ("שליחת דיווח", "Submit report"),
+    ("אישור וסיום", "Confirm")
+]
+
+FUTURE_REPORTS_TEXT = 'דיווחים עתידיים'
+
+
+def month_button_strategies(direction):
+    """Alternative (name, xpath) strategies for the calendar's next (1) or previous (-1) month button"""
+    hebrew, english = ('הבא', 'next') if direction > 0 else ('קודם', 'prev')
+    return [
+        ("aria_label", f"//*[@aria-label[contains(., '{hebrew}') or contains(translate(., 'NEXTPRV', 'nextprv'), '{english}')]]"),
+        ("title", f"//*[@title[contains(., '{hebrew}') or contains(translate(., 'NEXTPRV', 'nextprv'), '{english}')]]"),
+        ("class_name", f"//*[contains(@class, '{english}') and (self::button or self::a or @role='button')]"),
+    ]
+
+
+def button_strategies(text):
+    """Alternative (name, xpath) strategies for a button identified by its text"""
+    return [
+        ("text_contains", f"//*[contains(text(), '{text}')]"),
+        ("button_element", f"//button[contains(normalize-space(.), '{text}')]"),
+        ("role_button", f"//*[@role='button'][contains(normalize-space(.), '{text}')]"),
+    ]
+
+
+def date_strategies(date_str):
+    """Alternative (name, xpath) strategies for a calendar day cell"""
+    return [
+        # Look for the number within a table cell
+        ("td_text", f"//td[normalize-space(.)='{date_str}' and not(contains(@class, 'disabled'))]"),
+
+        # Look for the number within any clickable element
+        ("any_text", f"//*[text()='{date_str}' and not(ancestor::*[contains(@class, 'disabled')])]"),
+
+        # Look specifically within the calendar table
+        ("calendar_table", f"//table[contains(@class, 'calendar')]//td[text()='{date_str}']"),
+
+        # Try finding by aria-label if available
+        ("aria_label", f"//*[@aria-label[contains(., '{date_str}')]]"),
+    ]
@@ -0,0 +1,343 @@
+"""Local stand-in for the attendance site, for developing, testing and benchmarking without the real one.
+
+Serves:
+    GET  /finish[?month=YYYY-MM]          - the Hebrew page: 'דיווחים עתידיים' button, calendar of
+                                            the month and the four-step submission flow
+    GET  /api/finish/future-reports?month=YYYY-MM - calendar state of a month (JSON)
+    POST /api/finish/report               - submit the attendance of one date (JSON)
+
+The calendar's previous/next buttons swap in the calendar of another month without leaving
+the page. Loading /finish sets the session cookie; API requests without it are answered with 401,
+like an expired session.
+
+The calendar can be rendered in several layouts, one per XPath strategy of the scripts:
+    table           <td>12</td>                          -> td_text
+    text            <span>12</span> in a div grid        -> any_text
+    calendar_table  <table class="calendar"><td>12</td>  -> calendar_table (and any_text)
+    aria            <button aria-label="יום 12">, the number drawn with CSS -> aria_label
+
+Latency is added to every response (latency) and before every step of the flow appears
+(step_delay). step_failure_rate makes a step button never appear and submit_failure_rate
+makes the final submission fail with a 500.
+
+Run this file directly to serve it on localhost.
+"""
+import argparse
+import calendar
+import html
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from date_planner import HEBREW_MONTHS
+
+SESSION_COOKIE = ('finish_session', 'mock-session')
+
+LAYOUTS = ['table', 'text', 'calendar_table', 'aria']
+
+HEBREW_DAYS = ['א', 'ב', 'ג', 'ד', 'ה', 'ו', 'ש']
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html dir="rtl" lang="he">
+<head>
+<meta charset="utf-8">
+<title>דיווח נוכחות</title>
+<style>
+.hidden {{ display: none; }}
+.disabled {{ color: #aaa; }}
+.reported {{ background: #cfc; }}
+.day-grid {{ display: grid; grid-template-columns: repeat(7, 3em); }}
+button[data-label]::before {{ content: attr(data-label); }}
+</style>
+</head>
+<body>
+<h1>דיווח נוכחות</h1>
+<button id="future">דיווחים עתידיים</button>
+<div id="calendar-view" class="hidden">
+<button class="prev-month" aria-label="החודש הקודם" data-month-step="-1">‹</button>
+<h2 class="month-title">{title}</h2>
+<button class="next-month" aria-label="החודש הבא" data-month-step="1">›</button>
+{calendar}
+</div>
+<div id="flow" class="hidden"></div>
+<script>
+var CONFIG = {config};
+var STEPS = ["נמצא/ת ביחידה", "נוכח/ת", "שליחת דיווח", "אישור וסיום"];
+var flow = document.getElementById('flow');
+var currentDay = null;
+
+function later(action) {{ setTimeout(action, CONFIG.step_delay_ms); }}
+
+document.getElementById('future').addEventListener('click', function() {{
+    later(function() {{ document.getElementById('calendar-view').classList.remove('hidden'); }});
+}});
+
+// delegated, so the handlers survive replacing the calendar of another month
+document.addEventListener('click', function(event) {{
+    var monthStep = event.target.closest('[data-month-step]');
+    if (monthStep) {{
+        showMonth(Number(monthStep.getAttribute('data-month-step')));
+        return;
+    }}
+    var cell = event.target.closest('[data-day]');
+    if (!cell || cell.classList.contains('disabled') || cell.classList.contains('reported')) return;
+    currentDay = cell;
+    showStep(0);
+}});
+
+function showMonth(offset) {{
+    var parts = CONFIG.month.split('-');
+    var first = new Date(Number(parts[0]), Number(parts[1]) - 1 + offset, 1);
+    var month = first.getFullYear() + '-' + String(first.getMonth() + 1).padStart(2, '0');
+    fetch('/finish?month=' + month, {{credentials: 'same-origin'}}).then(function(response) {{
+        return response.text();
+    }}).then(function(text) {{
+        var page = new DOMParser().parseFromString(text, 'text/html');
+        later(function() {{
+            document.getElementById('calendar-view').innerHTML = page.getElementById('calendar-view').innerHTML;
+            CONFIG.month = month;
+        }});
+    }});
+}}
+
+function showStep(index) {{
+    flow.innerHTML = '';
+    later(function() {{
+        // injected failure: the button never shows up
+        if (Math.random() < CONFIG.step_failure_rate) return;
+        var button = document.createElement('button');
+        button.textContent = STEPS[index];
+        button.addEventListener('click', function() {{
+            if (index === STEPS.length - 1) submit(); else showStep(index + 1);
+        }});
+        flow.appendChild(button);
+        flow.classList.remove('hidden');
+    }});
+}}
+
+function submit() {{
+    var day = currentDay;
+    fetch('/api/finish/report', {{
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: {{'Content-Type': 'application/json'}},
+        body: JSON.stringify({{date: day.getAttribute('data-date'), mainStatus: STEPS[0], secondaryStatus: STEPS[1]}})
+    }}).then(function(response) {{
+        flow.innerHTML = '';
+        flow.classList.add('hidden');
+        if (response.ok) day.classList.add('reported');
+    }});
+}}
+</script>
+</body>
+</html>
+"""
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    server_version = "MockFinish/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.site.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, 'application/json; charset=utf-8', json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+    def has_session(self):
+        name, value = self.server.site.session_cookie
+        cookies = self.headers.get('Cookie', '')
+        return any(part.strip() == f"{name}={value}" for part in cookies.split(';'))
+
+    def requested_month(self, url):
+        return parse_qs(url.query).get('month', [date.today().strftime('%Y-%m')])[0]
+
+    def do_GET(self):
+        site = self.server.site
+        site.delay()
+        url = urlparse(self.path)
+        if url.path == '/finish':
+            name, value = site.session_cookie
+            self.send_body(200, 'text/html; charset=utf-8', site.page(self.requested_month(url)).encode('utf-8'),
+                           [('Set-Cookie', f"{name}={value}; Path=/; HttpOnly")])
+        elif url.path == '/api/finish/future-reports':
+            if not self.has_session():
+                self.send_json(401, {'error': 'session expired'})
+                return
+            month = self.requested_month(url)
+            self.send_json(200, {'month': month, 'days': site.month_days(month)})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        site = self.server.site
+        site.delay()
+        url = urlparse(self.path)
+        if url.path != '/api/finish/report':
+            self.send_json(404, {'error': 'not found'})
+            return
+        if not self.has_session():
+            self.send_json(401, {'error': 'session expired'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            day = date.fromisoformat(payload['date'])
+        except (ValueError, KeyError):
+            self.send_json(400, {'error': 'bad request'})
+            return
+        status, result = site.submit(day, payload)
+        self.send_json(status, result)
+
+
+class MockAttendanceSite:
+    def __init__(self, port=0, session_cookie=SESSION_COOKIE, disabled_days=(), latency=0.0, verbose=False,
+                 layout='table', step_delay=0.0, step_failure_rate=0.0, submit_failure_rate=0.0, seed=None):
+        """disabled_days are date objects that cannot be reported; latency/step_delay are in seconds"""
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout}, expected one of {LAYOUTS}")
+        self.session_cookie = session_cookie
+        self.disabled_days = set(disabled_days)
+        self.latency = latency
+        self.verbose = verbose
+        self.layout = layout
+        self.step_delay = step_delay
+        self.step_failure_rate = step_failure_rate
+        self.submit_failure_rate = submit_failure_rate
+        self.random = random.Random(seed)
+        self.reported = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), MockSiteHandler)
+        self.server.site = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def day_state(self, day):
+        return {
+            'date': day.isoformat(),
+            'disabled': day in self.disabled_days,
+            'reported': day in self.reported,
+        }
+
+    def month_days(self, month):
+        year, month_number = (int(part) for part in month.split('-'))
+        day = date(year, month_number, 1)
+        days = []
+        with self.lock:
+            while day.month == month_number:
+                days.append(self.day_state(day))
+                day += timedelta(days=1)
+        return days
+
+    def render_day(self, state):
+        day = date.fromisoformat(state['date'])
+        classes = 'day' + (' disabled' if state['disabled'] else '') + (' reported' if state['reported'] else '')
+        attributes = f'class="{classes}" data-day="{day.day}" data-date="{day.isoformat()}"'
+        if self.layout in ('table', 'calendar_table'):
+            return f'<td {attributes}>{day.day}</td>'
+        if self.layout == 'text':
+            return f'<span {attributes}>{day.day}</span>'
+        return f'<button {attributes} aria-label="יום {day.day}" data-label="{day.day}"></button>'
+
+    def render_calendar(self, month):
+        days = self.month_days(month)
+        # Sunday first, like the Israeli calendar
+        leading = (date.fromisoformat(days[0]['date']).weekday() + 1) % 7
+        cells = [self.render_day(state) for state in days]
+        if self.layout in ('table', 'calendar_table'):
+            table_class = 'calendar' if self.layout == 'calendar_table' else 'grid'
+            header = ''.join(f'<th>{name}</th>' for name in HEBREW_DAYS)
+            padded = ['<td class="empty"></td>'] * leading + cells
+            rows = [''.join(padded[i:i + 7]) for i in range(0, len(padded), 7)]
+            body = ''.join(f'<tr>{row}</tr>' for row in rows)
+            return f'<table class="{table_class}"><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table>'
+        padding = '<span class="empty"></span>' * leading if self.layout == 'text' else '<i class="empty"></i>' * leading
+        role = ' role="grid"' if self.layout == 'aria' else ''
+        return f'<div class="day-grid"{role}>{padding}{"".join(cells)}</div>'
+
+    def page(self, month):
+        year, month_number = (int(part) for part in month.split('-'))
+        config = {
+            'month': month,
+            'step_delay_ms': int(self.step_delay * 1000),
+            'step_failure_rate': self.step_failure_rate,
+        }
+        return PAGE_TEMPLATE.format(
+            title=html.escape(f"{HEBREW_MONTHS[month_number - 1]} {year}"),
+            calendar=self.render_calendar(month),
+            config=json.dumps(config),
+        )
+
+    def submit(self, day, payload):
+        with self.lock:
+            if day in self.disabled_days:
+                return 409, {'ok': False, 'error': 'date is disabled'}
+            if self.random.random() < self.submit_failure_rate:
+                return 500, {'ok': False, 'error': 'injected failure'}
+            self.reported[day] = payload
+        return 200, {'ok': True, 'date': day.isoformat()}
+
+    def start(self):
+        """Serve in a background thread and return the base url"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def workdays_of_month(month):
+    """Sunday-Thursday dates of a YYYY-MM month"""
+    year, month_number = (int(part) for part in month.split('-'))
+    return [date(year, month_number, day) for day in range(1, calendar.monthrange(year, month_number)[1] + 1)
+            if date(year, month_number, day).weekday() in (6, 0, 1, 2, 3)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the attendance site")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--layout", choices=LAYOUTS, default='table')
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--step-delay", type=float, default=0.0, help="seconds before every flow step appears")
+    parser.add_argument("--step-failure-rate", type=float, default=0.0)
+    parser.add_argument("--submit-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    site = MockAttendanceSite(args.port, latency=args.latency, verbose=True, layout=args.layout,
+                              step_delay=args.step_delay, step_failure_rate=args.step_failure_rate,
+                              submit_failure_rate=args.submit_failure_rate)
+    print(f"Mock attendance site on {site.url}/finish ({args.layout} layout)")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        site.stop()
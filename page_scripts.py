@@ -0,0 +1,145 @@
+"""JavaScript helpers shared by everything that works inside the page.
+
+The reporters, the batched submit, the DevTools backend and the tab pool all look for the
+same things in the page: a visible element by its text, the moment it appears, and the day
+cells of the calendar. The functions are defined here once and prepended to their scripts.
+
+FIND_TEXT_JS
+    findText(text)                      first visible, enabled element containing text, or null
+    waitFor(check, what, timeoutMs)     promise of check()'s first truthy value, from a MutationObserver
+    waitForText(text, timeoutMs)        waitFor(findText(text))
+
+SUBMIT_STEPS_JS (needs FIND_TEXT_JS)
+    clickSteps(steps, timeoutMs, beforeClick)
+                                        promise of {results: [{step, ok, ms, error}], total_ms} after
+                                        waiting for and clicking each [text, step name] in turn;
+                                        beforeClick(i) runs before every click
+
+CALENDAR_JS
+    calendarRoot()                      the calendar element, or the body
+    calendarSignature(root)             changes whenever the calendar view changes
+    dayCells(byLabel)                   {day: {day, element, disabled, reported}} of the month shown
+    findDay(day, byLabel)               the cell of one day, or null
+    byLabel also matches cells whose number is only in their aria-label (drawn with CSS)
+
+MONTH_TITLE_SCRIPT returns the visible texts that may hold the calendar's month and year.
+"""
+
+FIND_TEXT_JS = """
+function findText(text) {
+    var found = document.evaluate("//*[contains(text(), '" + text + "')]", document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var i = 0; i < found.snapshotLength; i++) {
+        var el = found.snapshotItem(i);
+        if (el.offsetParent !== null && !el.closest("[disabled], [aria-disabled='true']")) return el;
+    }
+    return null;
+}
+function waitFor(check, what, timeoutMs) {
+    return new Promise(function(resolve, reject) {
+        var found = check();
+        if (found) return resolve(found);
+        var timer;
+        var observer = new MutationObserver(function() {
+            var found = check();
+            if (found) { observer.disconnect(); clearTimeout(timer); resolve(found); }
+        });
+        observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+        timer = setTimeout(function() {
+            observer.disconnect();
+            reject(new Error("timed out waiting for " + what));
+        }, timeoutMs);
+    });
+}
+function waitForText(text, timeoutMs) {
+    return waitFor(function() { return findText(text); }, "'" + text + "'", timeoutMs);
+}
+"""
+
+SUBMIT_STEPS_JS = """
+async function clickSteps(steps, timeoutMs, beforeClick) {
+    var results = [];
+    var started = performance.now();
+    for (var i = 0; i < steps.length; i++) {
+        var stepStarted = performance.now();
+        try {
+            var el = await waitForText(steps[i][0], timeoutMs);
+        } catch (e) {
+            results.push({step: steps[i][1], ok: false, ms: Math.round(performance.now() - stepStarted),
+                error: String(e && e.message || e)});
+            break;
+        }
+        results.push({step: steps[i][1], ok: true, ms: Math.round(performance.now() - stepStarted)});
+        el.scrollIntoView({block: 'center'});
+        if (beforeClick) beforeClick(i);
+        if (i === steps.length - 1) {
+            // the last click may unload the page, answer first
+            setTimeout(function() { el.click(); }, 0);
+        } else {
+            el.click();
+        }
+    }
+    return {results: results, total_ms: Math.round(performance.now() - started)};
+}
+"""
+
+# סריקה אחת של לוח השנה - תאי הימים עם מצב מושבת/דווח
+CALENDAR_JS = """
+function calendarRoot() {
+    return document.querySelector("table[class*='calendar'], [class*='calendar'], [role='grid']") || document.body;
+}
+function calendarSignature(root) {
+    var header = root.querySelector("caption, thead, [class*='header'], [class*='title'], [class*='month']");
+    var marked = root.querySelectorAll("[class*='disabled'], [class*='reported'], [class*='approved'], [aria-disabled='true']");
+    return [header ? header.textContent.trim() : '', root.querySelectorAll('td').length, marked.length].join('|');
+}
+function dayOf(el, byLabel) {
+    var text = (el.textContent || '').trim();
+    if (/^\\d{1,2}$/.test(text)) return parseInt(text, 10);
+    if (!byLabel) return null;
+    var number = (el.getAttribute('aria-label') || '').match(/\\b\\d{1,2}\\b/);
+    return number ? parseInt(number[0], 10) : null;
+}
+function dayCells(byLabel) {
+    var cells = calendarRoot().querySelectorAll("td, [role='gridcell'], button, [aria-label]");
+    var byDay = {};
+    for (var i = 0; i < cells.length; i++) {
+        var el = cells[i];
+        var day = dayOf(el, byLabel);
+        if (day === null || day < 1 || day > 31 || el.offsetParent === null) continue;
+        var cls = typeof el.className === 'string' ? el.className : (el.getAttribute('class') || '');
+        if (/(other|outside|adjacent|prev|next)[-_]?month/i.test(cls)) continue;
+        var label = el.getAttribute('aria-label') || '';
+        var disabled = !!el.closest("[class*='disabled'], [aria-disabled='true'], [disabled]");
+        var reported = /reported|approved|submitted/i.test(cls) || label.indexOf('דווח') !== -1;
+        var known = byDay[day];
+        // תא ראשון מנצח, אלא אם הוא מושבת ונמצא תא פעיל לאותו יום
+        if (known && !(known.disabled && !disabled)) continue;
+        byDay[day] = {day: day, element: el, disabled: disabled, reported: reported};
+    }
+    return byDay;
+}
+function findDay(day, byLabel) {
+    return dayCells(byLabel)[day] || null;
+}
+"""
+
+# {signature, cells: [{day, element, disabled, reported}]} of the calendar on screen
+CALENDAR_SCAN_SCRIPT = CALENDAR_JS + """
+var byDay = dayCells(false);
+var found = [];
+for (var key in byDay) found.push(byDay[key]);
+return {signature: calendarSignature(calendarRoot()), cells: found};
+"""
+
+CALENDAR_SIGNATURE_SCRIPT = CALENDAR_JS + "return calendarSignature(calendarRoot());"
+
+# טקסטים שעשויים להכיל את החודש המוצג בלוח
+MONTH_TITLE_SCRIPT = """
+var found = document.querySelectorAll("caption, [class*='month'], [class*='title'], [class*='header'], h1, h2, h3");
+var texts = [];
+for (var i = 0; i < found.length && texts.length < 50; i++) {
+    if (found[i].offsetParent !== null) texts.push(found[i].textContent.trim().slice(0, 100));
+}
+return texts;
+"""
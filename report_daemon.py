@@ -0,0 +1,256 @@
+"""Long-running reporter: one warm browser session, a built-in schedule and a local control socket.
+
+Instead of an external scheduler starting a cold Chrome every week, the daemon starts
+AttendanceReporter once and keeps its browser open. It
+
+- reports on a weekly schedule, every entry delayed by a random jitter
+- checks every few minutes that the browser still answers and stays within its memory and
+  CPU limits (see browser_watchdog.py), and replaces it when it does not
+- reloads the site every few hours, so the session cookies stay valid between runs
+- answers on a localhost TCP socket, one command per line:
+      run       report now (queued behind a running job)
+      status    state, next scheduled run, browser memory/CPU and restarts, session refresh times
+      results   the {date: status} results of the last run
+      stop      quit the browser and exit
+
+The browser runs on its own profile (chrome_profile_daemon/, seeded from the lean profile), so
+manual runs of the reporting scripts still start while the daemon is up.
+
+    python report_daemon.py --at "sun 07:30" --at "wed 18:00" --jitter 900
+    python report_daemon.py control status
+"""
+import argparse
+import json
+import queue
+import random
+import re
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+
+from browser_profile import DAEMON_PROFILE_DIR
+from run_log import Tracer, rotate_log
+from script_loader import load_public_script
+
+CONTROL_HOST = '127.0.0.1'
+CONTROL_PORT = 8766
+
+DEFAULT_SCHEDULE = ['sun 07:30']
+DEFAULT_JITTER = 15 * 60
+HEALTH_INTERVAL = 5 * 60
+REFRESH_INTERVAL = 4 * 60 * 60
+
+COMMANDS = ('run', 'status', 'results', 'stop')
+
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+def parse_days(spec):
+    """'sun', 'sun,wed', 'sun-thu' or '*' -> set of Python weekday numbers"""
+    if spec == '*':
+        return set(range(7))
+    days = set()
+    for part in spec.lower().split(','):
+        first, _, last = part.partition('-')
+        start = DAY_NAMES.index(first[:3])
+        end = DAY_NAMES.index(last[:3]) if last else start
+        days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return days
+
+
+class WeeklySchedule:
+    def __init__(self, entries, jitter=DEFAULT_JITTER):
+        """entries are '<days> HH:MM' strings, e.g. 'sun 07:30' or 'sun-thu 08:00'; jitter is in seconds"""
+        self.entries = []
+        for entry in entries:
+            match = re.fullmatch(r'\s*(\S+)\s+(\d{1,2}):(\d{2})\s*', entry)
+            if not match:
+                raise ValueError(f"Bad schedule entry {entry!r}, expected '<days> HH:MM'")
+            try:
+                days = parse_days(match.group(1))
+            except ValueError:
+                raise ValueError(f"Bad days in schedule entry {entry!r}")
+            self.entries.append((days, int(match.group(2)), int(match.group(3))))
+        self.jitter = jitter
+
+    def next_after(self, moment):
+        """The first scheduled time after moment, plus a random jitter"""
+        candidates = []
+        for days, hour, minute in self.entries:
+            for offset in range(8):
+                day = moment + timedelta(days=offset)
+                candidate = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if candidate.weekday() in days and candidate > moment:
+                    candidates.append(candidate)
+                    break
+        return min(candidates) + timedelta(seconds=random.uniform(0, self.jitter))
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        command = self.rfile.readline().decode('utf-8').strip().lower()
+        answer = self.server.report_daemon.control(command)
+        self.wfile.write((json.dumps(answer, ensure_ascii=False, default=str) + "\n").encode('utf-8'))
+
+
+class ReportDaemon:
+    def __init__(self, schedule, reporter_options=None, host=CONTROL_HOST, port=CONTROL_PORT,
+                 health_interval=HEALTH_INTERVAL, refresh_interval=REFRESH_INTERVAL):
+        """reporter_options are passed to AttendanceReporter, which runs on the daemon's own profile"""
+        self.schedule = schedule
+        self.reporter_options = dict({'lean_profile_dir': DAEMON_PROFILE_DIR}, **(reporter_options or {}),
+                                     persistent=True)
+        self.health_interval = health_interval
+        self.refresh_interval = refresh_interval
+        self.public = load_public_script()
+        self.reporter = None
+        self.commands = queue.Queue()
+        self.lock = threading.Lock()
+        self.state = {
+            'state': 'starting',
+            'started_at': datetime.now(),
+            'next_run': None,
+            'last_run': None,
+            'last_health_check': None,
+            'last_refresh': None,
+            'browser': None,
+            'browser_restarts': 0,
+        }
+        self.last_results = {}
+        self.server = socketserver.ThreadingTCPServer((host, port), ControlHandler)
+        self.server.daemon_threads = True
+        self.server.report_daemon = self
+
+    def update(self, **state):
+        with self.lock:
+            self.state.update(state)
+
+    def control(self, command):
+        """Answer one control command; runs on the socket server's threads"""
+        if command not in COMMANDS:
+            return {'error': f"unknown command {command!r}, expected one of {', '.join(COMMANDS)}"}
+        if command in ('run', 'stop'):
+            self.commands.put(command)
+            return {'ok': True, 'queued': command}
+        with self.lock:
+            if command == 'status':
+                return dict(self.state, queued=self.commands.qsize())
+            return {'last_run': self.state['last_run'],
+                    'results': {d.strftime('%Y-%m-%d'): status for d, status in self.last_results.items()}}
+
+    def run_job(self, trigger):
+        """Report the default date range with the warm browser"""
+        self.update(state='running')
+        started = datetime.now()
+        print(f"\n=== {trigger} run at {started.strftime('%d/%m/%Y %H:%M')} ===")
+        rotate_log(self.reporter.run_log)
+        # A fresh run id per job, so the run log tells the jobs apart
+        self.reporter.tracer = Tracer(self.reporter.run_log, account=self.reporter.account)
+        results = {}
+        try:
+            results = self.reporter.report_attendance(self.public.target_workdays())
+        except Exception as e:
+            print(f"Run failed: {e}")
+        with self.lock:
+            self.last_results = dict(results)
+            self.state['last_run'] = {
+                'trigger': trigger,
+                'started': started,
+                'seconds': round((datetime.now() - started).total_seconds(), 1),
+                'dates': len(results),
+                'reported': sum(1 for status in results.values() if status == 'reported'),
+            }
+            self.state['state'] = 'idle'
+
+    def health_check(self):
+        """Replace the browser when it stopped answering or crossed a watchdog limit"""
+        reason = self.reporter.watchdog.check(self.reporter.driver)
+        if reason:
+            self.reporter.recycle_browser(reason)
+        with self.lock:
+            self.state['last_health_check'] = datetime.now()
+            self.state['browser'] = self.reporter.watchdog.status()
+            if reason:
+                self.state['browser_restarts'] += 1
+        return reason is None
+
+    def refresh_session(self):
+        """Reload the site so the session cookies are renewed"""
+        self.update(state='refreshing')
+        self.health_check()
+        if not self.reporter.navigate_to_site():
+            print("Session refresh failed, will retry at the next refresh")
+        self.update(state='idle', last_refresh=datetime.now())
+
+    def serve_forever(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='control').start()
+        host, port = self.server.server_address[:2]
+        print(f"Control socket on {host}:{port}")
+        try:
+            self.reporter = self.public.AttendanceReporter(**self.reporter_options)
+            next_run = self.schedule.next_after(datetime.now())
+            next_health = time.monotonic() + self.health_interval
+            next_refresh = time.monotonic() + self.refresh_interval
+            self.update(state='idle', next_run=next_run)
+            print(f"Next run at {next_run.strftime('%d/%m/%Y %H:%M:%S')}")
+            while True:
+                wait = min((next_run - datetime.now()).total_seconds(),
+                           next_health - time.monotonic(), next_refresh - time.monotonic())
+                try:
+                    command = self.commands.get(timeout=max(wait, 0))
+                except queue.Empty:
+                    command = None
+                if command == 'stop':
+                    break
+                if command == 'run':
+                    self.run_job('manual')
+                elif datetime.now() >= next_run:
+                    self.run_job('scheduled')
+                    next_run = self.schedule.next_after(datetime.now())
+                    self.update(next_run=next_run)
+                    print(f"Next run at {next_run.strftime('%d/%m/%Y %H:%M:%S')}")
+                elif time.monotonic() >= next_refresh:
+                    self.refresh_session()
+                    next_refresh = time.monotonic() + self.refresh_interval
+                    next_health = time.monotonic() + self.health_interval
+                elif time.monotonic() >= next_health:
+                    self.health_check()
+                    next_health = time.monotonic() + self.health_interval
+        finally:
+            self.update(state='stopping')
+            self.server.shutdown()
+            self.server.server_close()
+            if self.reporter is not None:
+                self.reporter.close()
+
+
+def send_command(command, host=CONTROL_HOST, port=CONTROL_PORT, timeout=10):
+    """Send one command to a running daemon and return its answer"""
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.sendall((command + "\n").encode('utf-8'))
+        reply = connection.makefile('r', encoding='utf-8').readline()
+    return json.loads(reply)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep a warm attendance reporter running on a schedule")
+    parser.add_argument("command", nargs='*', help="'control <run|status|results|stop>' talks to a running daemon")
+    parser.add_argument("--at", action='append', help="schedule entry '<days> HH:MM', repeatable (default 'sun 07:30')")
+    parser.add_argument("--jitter", type=int, default=DEFAULT_JITTER, help="random delay in seconds added to each run")
+    parser.add_argument("--port", type=int, default=CONTROL_PORT)
+    parser.add_argument("--health-interval", type=int, default=HEALTH_INTERVAL, help="seconds between browser checks")
+    parser.add_argument("--refresh-interval", type=int, default=REFRESH_INTERVAL, help="seconds between session refreshes")
+    parser.add_argument("--lean", action='store_true', help="lean page load mode")
+    args = parser.parse_args()
+
+    if args.command:
+        if args.command[0] != 'control' or len(args.command) != 2:
+            parser.error("expected 'control <run|status|results|stop>'")
+        print(json.dumps(send_command(args.command[1], port=args.port), ensure_ascii=False, indent=2))
+    else:
+        daemon = ReportDaemon(WeeklySchedule(args.at or DEFAULT_SCHEDULE, args.jitter),
+                              {'lean_page_load': args.lean}, port=args.port,
+                              health_interval=args.health_interval, refresh_interval=args.refresh_interval)
+        daemon.serve_forever()
@@ -0,0 +1,194 @@
+"""Per-step timing spans appended to a JSON-lines run log (attendance_report.log).
+
+Every traced step of a run (navigation, opening future reports, each locator strategy
+attempt, each submit step) becomes one JSON line with its duration, outcome and the
+strategy used. The summary command aggregates the log into per-step p50/p95 and failure
+rates, to see which step is eating the run time:
+
+    python run_log.py summary [--last N] [--log attendance_report.log]
+
+Batch workers append to the same file from several processes, so the writers never rotate
+it; rotate_log does, from a single process (before a batch starts its workers and at the
+start of a run or daemon job). The summary command only reads.
+"""
+import argparse
+import functools
+import glob
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+RUN_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'attendance_report.log')
+MAX_LOG_BYTES = 2 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_loggers = {}
+
+
+def span_logger(path=RUN_LOG):
+    """The logger appending raw JSON lines to path"""
+    if path not in _loggers:
+        logger = logging.getLogger(f"attendance.spans.{path}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        _loggers[path] = logger
+    return _loggers[path]
+
+
+def rotate_log(path=RUN_LOG, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+    """Move path to path.1 (path.1 to path.2 and so on) once it is over max_bytes.
+
+    Only call it where no other process writes the log; a log still held open elsewhere
+    (Windows) is left for the next time. Returns whether the log was rotated.
+    """
+    try:
+        if os.path.getsize(path) <= max_bytes:
+            return False
+    except OSError:
+        return False
+    try:
+        for index in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        os.replace(path, path + '.1')
+    except OSError as e:
+        print(f"Could not rotate {path}: {e}")
+        return False
+    # this process's handler reopens the new file on its next line
+    for handler in _loggers[path].handlers if path in _loggers else []:
+        handler.close()
+    return True
+
+
+class Span:
+    """Times one step. The outcome is 'ok' unless fail() is called or an exception escapes"""
+
+    def __init__(self, tracer, step, fields):
+        self.tracer = tracer
+        self.step = step
+        self.fields = fields
+        self.outcome = None
+        self.started = None
+
+    def fail(self, reason=None):
+        self.outcome = 'failed'
+        if reason:
+            self.fields['reason'] = reason
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.outcome = 'error'
+            self.fields['error'] = str(exc)
+        self.tracer.record(self.step, time.monotonic() - self.started, self.outcome or 'ok', **self.fields)
+        return False
+
+
+class Tracer:
+    def __init__(self, path=RUN_LOG, run_id=None, **context):
+        """context (e.g. account=...) is added to every span of the run"""
+        self.logger = span_logger(path)
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        self.context = context
+
+    def span(self, step, **fields):
+        return Span(self, step, fields)
+
+    def record(self, step, seconds, outcome, **fields):
+        """Write one finished span"""
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'run': self.run_id,
+            'step': step,
+            'duration_ms': round(seconds * 1000, 1),
+            'outcome': outcome,
+        }
+        entry.update(self.context)
+        entry.update({key: value for key, value in fields.items() if value is not None})
+        self.logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def traced(step):
+    """Trace a method returning True/False; self.tracer must be a Tracer"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(step) as span:
+                result = method(self, *args, **kwargs)
+                if not result:
+                    span.fail()
+                return result
+        return wrapper
+    return decorator
+
+
+def read_spans(path=RUN_LOG):
+    """All spans of the log and its rotated backups, oldest first"""
+    backups = [name for name in glob.glob(path + '.*') if name.rsplit('.', 1)[1].isdigit()]
+    files = sorted(backups, key=lambda name: -int(name.rsplit('.', 1)[1])) + [path]
+    spans = []
+    for name in files:
+        try:
+            with open(name, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        spans.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return spans
+
+
+def summarize(spans, last_runs=None):
+    """{step key: (count, p50 ms, p95 ms, failure rate, total ms)}; the key includes locator, button and strategy"""
+    if last_runs:
+        runs = list(dict.fromkeys(span['run'] for span in spans))[-last_runs:]
+        spans = [span for span in spans if span['run'] in runs]
+    grouped = {}
+    for span in spans:
+        key = span['step'] + ''.join(f" {span[field]}" for field in ('locator', 'button') if span.get(field))
+        key += f" [{span['strategy']}]" if span.get('strategy') else ''
+        grouped.setdefault(key, []).append(span)
+    summary = {}
+    for key, group in grouped.items():
+        durations = sorted(span['duration_ms'] for span in group)
+        if len(durations) > 1:
+            cuts = statistics.quantiles(durations, n=100, method='inclusive')
+            p50, p95 = cuts[49], cuts[94]
+        else:
+            p50 = p95 = durations[0]
+        failures = sum(1 for span in group if span['outcome'] != 'ok')
+        summary[key] = (len(group), p50, p95, failures / len(group), sum(durations))
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'step':<44} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'fail':>6} {'total s':>9}")
+    for key, (count, p50, p95, failure_rate, total) in sorted(summary.items(), key=lambda item: -item[1][4]):
+        print(f"{key:<44} {count:>6} {p50:>9.0f} {p95:>9.0f} {failure_rate:>6.0%} {total / 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the attendance run log")
+    parser.add_argument("command", choices=['summary'])
+    parser.add_argument("--log", default=RUN_LOG)
+    parser.add_argument("--last", type=int, help="only the last N runs")
+    args = parser.parse_args()
+
+    spans = read_spans(args.log)
+    if not spans:
+        print(f"No spans in {args.log}")
+    else:
+        print(f"{len(set(span['run'] for span in spans))} runs, {len(spans)} spans")
+        print_summary(summarize(spans, args.last))
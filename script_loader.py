@@ -0,0 +1,32 @@
+"""Import the reporting scripts as modules.
+
+Their file names contain spaces, so the helper modules (batch runs, benchmarks...) load them by path.
+"""
+import importlib.util
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PUBLIC_SCRIPT = os.path.join(SCRIPT_DIR, "attendance_report - public.py")
+GUI_SCRIPT = os.path.join(SCRIPT_DIR, "attendanc_report - GUI.py")
+
+
+def load_script(path, module_name):
+    """Import the script at path once and return the module"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_public_script():
+    """The module of attendance_report - public.py (AttendanceReporter)"""
+    return load_script(PUBLIC_SCRIPT, "attendance_report_public")
+
+
+def load_gui_script():
+    """The module of attendanc_report - GUI.py (myReportBot)"""
+    return load_script(GUI_SCRIPT, "attendance_report_gui")
@@ -0,0 +1,569 @@
+"""Evaluate the reporter's XPath strategies against DOM snapshots, without a browser.
+
+Parses recorded snapshots (see dom_snapshot.py) with the standard library's HTML parser and
+evaluates every strategy of locators.py on them with a small XPath 1.0 evaluator that covers
+what the strategies use: location paths with the child, descendant, self, parent, ancestor
+and attribute axes, predicates, and/or/not, =, !=, contains, starts-with, normalize-space,
+translate, string, concat and count.
+
+Like Selenium, a strategy finds the first match in document order. A button strategy only
+works when that element was rendered and is not disabled; a date strategy works when the
+element was rendered, as find_and_click_date waits for a visible cell that stopped moving.
+
+    python snapshot_replay.py snapshots/               # every recorded run
+    python snapshot_replay.py --mock                   # every mock_site.py layout
+    python snapshot_replay.py snapshots/ --mock -v     # list every strategy of every snapshot
+
+Exits with 1 when a required locator has no working strategy in some snapshot.
+"""
+import argparse
+import re
+import sys
+from html.parser import HTMLParser
+
+from dom_snapshot import HIDDEN_ATTRIBUTE, load_snapshots
+from locators import FUTURE_REPORTS_TEXT, SUBMIT_SEQUENCE, button_strategies, date_strategies, month_button_strategies
+
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                 'param', 'source', 'track', 'wbr'}
+# Dropped like the recorder drops them, so their text does not match button texts
+SKIPPED_ELEMENTS = {'script', 'style', 'noscript', 'template'}
+
+
+class XPathError(ValueError):
+    pass
+
+
+# --- document model ---
+
+class Node:
+    order = 0
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.order = Node.order
+        Node.order += 1
+
+
+class Element(Node):
+    def __init__(self, tag, attributes, parent):
+        super().__init__(parent)
+        self.tag = tag
+        self.children = []
+        self.attributes = [Attribute(name, value or '', self) for name, value in attributes]
+
+    def attribute(self, name):
+        for attribute in self.attributes:
+            if attribute.name == name:
+                return attribute.value
+        return None
+
+    def string_value(self):
+        return ''.join(child.string_value() for child in self.children)
+
+    def __repr__(self):
+        attributes = ''.join(f' {a.name}="{a.value}"' for a in self.attributes if a.name != HIDDEN_ATTRIBUTE)
+        return f"<{self.tag}{attributes}>{self.string_value().strip()[:30]}"
+
+
+class Document(Element):
+    def __init__(self):
+        super().__init__('#document', [], None)
+
+
+class Text(Node):
+    def __init__(self, text, parent):
+        super().__init__(parent)
+        self.text = text
+
+    def string_value(self):
+        return self.text
+
+
+class Attribute:
+    def __init__(self, name, value, parent):
+        self.name = name
+        self.value = value
+        self.parent = parent
+        # Attributes sort right after their element
+        self.order = parent.order + 0.5
+
+    def string_value(self):
+        return self.value
+
+
+class TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.document = Document()
+        self.stack = [self.document]
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_ELEMENTS:
+            self.skipping += 1
+        if self.skipping:
+            return
+        element = Element(tag, attrs, self.stack[-1])
+        self.stack[-1].children.append(element)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skipping and tag not in SKIPPED_ELEMENTS:
+            self.stack[-1].children.append(Element(tag, attrs, self.stack[-1]))
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_ELEMENTS:
+            self.skipping = max(self.skipping - 1, 0)
+            return
+        if self.skipping:
+            return
+        # Close up to the matching open element; stray end tags are ignored
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        if not self.skipping and data:
+            self.stack[-1].children.append(Text(data, self.stack[-1]))
+
+
+def parse_html(html):
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.document
+
+
+def descendants(node):
+    for child in getattr(node, 'children', ()):
+        yield child
+        yield from descendants(child)
+
+
+def ancestors(node):
+    node = node.parent
+    while node is not None:
+        yield node
+        node = node.parent
+
+
+def rendered(element):
+    """False when the recorder saw the element or an ancestor unrendered"""
+    for node in [element] + list(ancestors(element)):
+        if isinstance(node, Element) and (node.attribute(HIDDEN_ATTRIBUTE) is not None
+                                          or node.attribute('hidden') is not None):
+            return False
+    return True
+
+
+def clickable(element):
+    return rendered(element) and element.attribute('disabled') is None
+
+
+# --- XPath ---
+
+TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<literal>"[^"]*"|'[^']*')
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<op>//|/|::|!=|\.\.|[\[\]()@,=.*|])
+    | (?P<name>[A-Za-z_][\w.-]*)
+    )""", re.VERBOSE)
+
+AXES = {'child', 'descendant', 'descendant-or-self', 'self', 'parent', 'ancestor', 'ancestor-or-self', 'attribute'}
+NODE_TYPES = {'text', 'node'}
+
+
+def tokenize(xpath):
+    tokens, position = [], 0
+    while position < len(xpath):
+        match = TOKEN.match(xpath, position)
+        if not match or match.end() == position:
+            if xpath[position:].strip():
+                raise XPathError(f"Cannot parse {xpath!r} at {xpath[position:]!r}")
+            break
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append((kind, value[1:-1] if kind == 'literal' else value))
+        position = match.end()
+    return tokens
+
+
+class XPathParser:
+    """Recursive descent parser producing nested tuples"""
+
+    def __init__(self, xpath):
+        self.xpath = xpath
+        self.tokens = tokenize(xpath)
+        self.position = 0
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if value is not None and token[1] != value:
+            raise XPathError(f"Expected {value!r} in {self.xpath!r}, got {token[1]!r}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        expression = self.or_expression()
+        if self.peek()[0] is not None:
+            raise XPathError(f"Unexpected {self.peek()[1]!r} in {self.xpath!r}")
+        return expression
+
+    def or_expression(self):
+        expression = self.and_expression()
+        while self.peek() == ('name', 'or'):
+            self.take()
+            expression = ('or', expression, self.and_expression())
+        return expression
+
+    def and_expression(self):
+        expression = self.equality()
+        while self.peek() == ('name', 'and'):
+            self.take()
+            expression = ('and', expression, self.equality())
+        return expression
+
+    def equality(self):
+        expression = self.union()
+        while self.peek()[1] in ('=', '!='):
+            operator = self.take()[1]
+            expression = (operator, expression, self.union())
+        return expression
+
+    def union(self):
+        expression = self.primary()
+        while self.peek()[1] == '|':
+            self.take()
+            expression = ('|', expression, self.primary())
+        return expression
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind == 'literal':
+            self.take()
+            return ('literal', value)
+        if kind == 'number':
+            self.take()
+            return ('number', float(value))
+        if value == '(':
+            self.take()
+            expression = self.or_expression()
+            self.take(')')
+            return expression
+        if kind == 'name' and self.peek(1)[1] == '(' and value not in NODE_TYPES:
+            self.take()
+            self.take('(')
+            arguments = []
+            while self.peek()[1] != ')':
+                arguments.append(self.or_expression())
+                if self.peek()[1] == ',':
+                    self.take()
+            self.take(')')
+            return ('call', value, arguments)
+        return self.location_path()
+
+    def location_path(self):
+        steps = []
+        absolute = False
+        if self.peek()[1] in ('/', '//'):
+            absolute = True
+            if self.take()[1] == '//':
+                steps.append(('descendant-or-self', 'node', []))
+        steps.append(self.step())
+        while self.peek()[1] in ('/', '//'):
+            if self.take()[1] == '//':
+                steps.append(('descendant-or-self', 'node', []))
+            steps.append(self.step())
+        return ('path', absolute, steps)
+
+    def step(self):
+        kind, value = self.peek()
+        if value == '.':
+            self.take()
+            return ('self', 'node', [])
+        if value == '..':
+            self.take()
+            return ('parent', 'node', [])
+        axis = 'child'
+        if value == '@':
+            self.take()
+            axis = 'attribute'
+        elif kind == 'name' and self.peek(1)[1] == '::':
+            axis = self.take()[1]
+            self.take('::')
+            if axis not in AXES:
+                raise XPathError(f"Unsupported axis {axis} in {self.xpath!r}")
+        kind, value = self.take()
+        if value == '*':
+            test = '*'
+        elif kind == 'name' and value in NODE_TYPES and self.peek()[1] == '(':
+            self.take('(')
+            self.take(')')
+            test = value
+        elif kind == 'name':
+            test = ('name', value.lower())
+        else:
+            raise XPathError(f"Expected a node test in {self.xpath!r}, got {value!r}")
+        predicates = []
+        while self.peek()[1] == '[':
+            self.take()
+            predicates.append(self.or_expression())
+            self.take(']')
+        return (axis, test, predicates)
+
+
+def axis_nodes(node, axis):
+    if axis == 'child':
+        return list(getattr(node, 'children', ()))
+    if axis == 'descendant':
+        return list(descendants(node))
+    if axis == 'descendant-or-self':
+        return [node] + list(descendants(node))
+    if axis == 'self':
+        return [node]
+    if axis == 'parent':
+        return [node.parent] if node.parent is not None else []
+    if axis == 'ancestor':
+        return list(ancestors(node))
+    if axis == 'ancestor-or-self':
+        return [node] + list(ancestors(node))
+    return list(getattr(node, 'attributes', ()))
+
+
+def matches_test(node, axis, test):
+    if test == 'node':
+        return True
+    if test == 'text':
+        return isinstance(node, Text)
+    if axis == 'attribute':
+        return test == '*' or node.name == test[1]
+    if not isinstance(node, Element) or isinstance(node, Document):
+        return False
+    return test == '*' or node.tag == test[1]
+
+
+def string_of(value):
+    if isinstance(value, list):
+        return value[0].string_value() if value else ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    return value
+
+
+def boolean_of(value):
+    # node-sets and strings are true when non-empty, numbers when non-zero
+    return bool(value)
+
+
+def compare(operator, left, right):
+    equal = (lambda a, b: a == b) if operator == '=' else (lambda a, b: a != b)
+    if isinstance(left, list) or isinstance(right, list):
+        if isinstance(left, bool) or isinstance(right, bool):
+            return equal(boolean_of(left), boolean_of(right))
+        lefts = [n.string_value() for n in left] if isinstance(left, list) else [string_of(left)]
+        rights = [n.string_value() for n in right] if isinstance(right, list) else [string_of(right)]
+        return any(equal(a, b) for a in lefts for b in rights)
+    if isinstance(left, bool) or isinstance(right, bool):
+        return equal(boolean_of(left), boolean_of(right))
+    return equal(string_of(left), string_of(right))
+
+
+def normalize_space(text):
+    return ' '.join(text.split())
+
+
+def call(name, arguments, node):
+    if name == 'not':
+        return not boolean_of(arguments[0])
+    if name == 'true':
+        return True
+    if name == 'false':
+        return False
+    if name == 'count':
+        return float(len(arguments[0]))
+    if name == 'string':
+        return string_of(arguments[0]) if arguments else node.string_value()
+    if name == 'normalize-space':
+        return normalize_space(string_of(arguments[0]) if arguments else node.string_value())
+    if name == 'contains':
+        return string_of(arguments[1]) in string_of(arguments[0])
+    if name == 'starts-with':
+        return string_of(arguments[0]).startswith(string_of(arguments[1]))
+    if name == 'concat':
+        return ''.join(string_of(argument) for argument in arguments)
+    if name == 'translate':
+        text, source, target = (string_of(argument) for argument in arguments)
+        table = {}
+        for index, character in enumerate(source):
+            table.setdefault(ord(character), target[index] if index < len(target) else None)
+        return text.translate(table)
+    raise XPathError(f"Unsupported function {name}()")
+
+
+def evaluate_expression(expression, node, root):
+    kind = expression[0]
+    if kind == 'literal':
+        return expression[1]
+    if kind == 'number':
+        return expression[1]
+    if kind == 'or':
+        return (boolean_of(evaluate_expression(expression[1], node, root))
+                or boolean_of(evaluate_expression(expression[2], node, root)))
+    if kind == 'and':
+        return (boolean_of(evaluate_expression(expression[1], node, root))
+                and boolean_of(evaluate_expression(expression[2], node, root)))
+    if kind in ('=', '!='):
+        return compare(kind, evaluate_expression(expression[1], node, root),
+                       evaluate_expression(expression[2], node, root))
+    if kind == '|':
+        nodes = evaluate_expression(expression[1], node, root) + evaluate_expression(expression[2], node, root)
+        return sorted(set(nodes), key=lambda n: n.order)
+    if kind == 'call':
+        return call(expression[1], [evaluate_expression(argument, node, root) for argument in expression[2]], node)
+    _, absolute, steps = expression
+    nodes = [root] if absolute else [node]
+    for axis, test, predicates in steps:
+        found = {}
+        for context in nodes:
+            selected = [n for n in axis_nodes(context, axis) if matches_test(n, axis, test)]
+            for predicate in predicates:
+                kept = []
+                for position, candidate in enumerate(selected, 1):
+                    value = evaluate_expression(predicate, candidate, root)
+                    if (value == position) if isinstance(value, float) else boolean_of(value):
+                        kept.append(candidate)
+                selected = kept
+            for selected_node in selected:
+                found[id(selected_node)] = selected_node
+        nodes = sorted(found.values(), key=lambda n: n.order)
+    return nodes
+
+
+_compiled = {}
+
+
+def select(xpath, document):
+    """Nodes matching xpath, in document order"""
+    if xpath not in _compiled:
+        _compiled[xpath] = XPathParser(xpath).parse()
+    result = evaluate_expression(_compiled[xpath], document, document)
+    if not isinstance(result, list):
+        raise XPathError(f"{xpath!r} does not select nodes")
+    return result
+
+
+# --- replay ---
+
+def snapshot_checks(snapshot):
+    """(locator, strategies, mode, required, expected day) of everything to check in a snapshot"""
+    context = snapshot.get('context', {})
+    if context.get('kind') == 'calendar':
+        checks = [(f"date_cell {day}", date_strategies(str(day)), 'rendered', True, day)
+                  for day in context.get('days', [])]
+        checks += [("month/next", month_button_strategies(1), 'clickable', False, None),
+                   ("month/previous", month_button_strategies(-1), 'clickable', False, None)]
+        return checks
+    if context.get('kind') == 'button':
+        return [(context['locator'], button_strategies(context['text']), 'clickable', True, None)]
+    return []
+
+
+def try_strategy(document, xpath, mode, day=None):
+    """(worked, number of matches, first match or error)"""
+    try:
+        found = select(xpath, document)
+    except XPathError as e:
+        return False, 0, str(e)
+    if not found:
+        return False, 0, None
+    first = found[0]
+    element = first if isinstance(first, Element) else first.parent
+    worked = clickable(element) if mode == 'clickable' else rendered(element)
+    # The mock site and some calendars name the date of a cell; a wrong day is a miss
+    cell = next((n for n in [element] + list(ancestors(element))
+                 if isinstance(n, Element) and n.attribute('data-day') is not None), None)
+    if day is not None and cell is not None and cell.attribute('data-day') != str(day):
+        worked = False
+    return worked, len(found), element
+
+
+def replay(snapshot):
+    """{locator: (required, [(strategy, worked, matches, first match)])} for one snapshot"""
+    document = parse_html(snapshot['html'])
+    results = {}
+    for locator, strategies, mode, required, day in snapshot_checks(snapshot):
+        results[locator] = (required, [(name,) + try_strategy(document, xpath, mode, day) for name, xpath in strategies])
+    return results
+
+
+def mock_snapshots(month=None):
+    """Calendar and button snapshots of every mock_site.py layout, built without a server or browser"""
+    from datetime import date
+    from mock_site import LAYOUTS, MockAttendanceSite, workdays_of_month
+
+    month = month or date.today().strftime('%Y-%m')
+    days = [day.day for day in workdays_of_month(month)]
+    snapshots = []
+    for layout in LAYOUTS:
+        site = MockAttendanceSite(layout=layout)
+        site.server.server_close()
+        page = site.page(month)
+        shown = page.replace('id="calendar-view" class="hidden"', 'id="calendar-view"')
+        snapshots.append({'name': f"mock {layout} future_reports", 'html': page,
+                          'context': {'kind': 'button', 'locator': 'future_reports', 'text': FUTURE_REPORTS_TEXT}})
+        snapshots.append({'name': f"mock {layout} calendar", 'html': shown,
+                          'context': {'kind': 'calendar', 'month': month, 'days': days}})
+        for text, step_name in SUBMIT_SEQUENCE:
+            flow = shown.replace('<div id="flow" class="hidden"></div>', f'<div id="flow"><button>{text}</button></div>')
+            snapshots.append({'name': f"mock {layout} submit/{step_name}", 'html': flow,
+                              'context': {'kind': 'button', 'locator': f"submit/{step_name}", 'text': text}})
+    return snapshots
+
+
+def print_report(snapshot, results, verbose=False):
+    """Print the outcome of one snapshot. Returns the required locators without a working strategy"""
+    broken = [locator for locator, (required, tries) in results.items()
+              if required and not any(worked for _, worked, _, _ in tries)]
+    status = "BROKEN " + ", ".join(broken) if broken else "ok"
+    print(f"{snapshot.get('path', snapshot['name'])}: {status}")
+    for locator, (required, tries) in results.items():
+        working = [name for name, worked, _, _ in tries if worked]
+        if not verbose and (working or not required):
+            continue
+        print(f"    {locator}: {', '.join(working) if working else 'no working strategy'}")
+        if verbose:
+            for name, worked, matches, first in tries:
+                print(f"        {'+' if worked else '-'} {name:<16} {matches:>3} matches  {first if first is not None else ''}")
+    return broken
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the locator strategies against DOM snapshots offline")
+    parser.add_argument("paths", nargs='*', help="snapshot files or directories")
+    parser.add_argument("--mock", action='store_true', help="also check every mock_site.py layout")
+    parser.add_argument("--month", help="YYYY-MM of the mock calendars (default: this month)")
+    parser.add_argument("-v", "--verbose", action='store_true', help="show every strategy")
+    args = parser.parse_args()
+
+    snapshots = load_snapshots(args.paths)
+    if args.mock:
+        snapshots += mock_snapshots(args.month)
+    if not snapshots:
+        parser.error("no snapshots given; record some with --record or use --mock")
+
+    broken_snapshots = 0
+    for snapshot in snapshots:
+        if print_report(snapshot, replay(snapshot), args.verbose):
+            broken_snapshots += 1
+    print(f"\n{len(snapshots)} snapshots, {broken_snapshots} with broken locators")
+    sys.exit(1 if broken_snapshots else 0)
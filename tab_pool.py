@@ -0,0 +1,257 @@
+"""Report several dates at once in tabs of one Selenium session.
+
+Most of a date's flow is waiting for the server: the report form, then every submit step.
+The tabs share the browser's cookies and its startup, but one WebDriver drives one window at
+a time and every Selenium wait blocks it, so the tabs cannot each run find_and_click_date and
+submit_report on a thread. Instead every tab runs the whole flow of its date inside the page
+(TAB_FLOW_SCRIPT, built on the helpers of page_scripts.py: select the day, wait for each step
+with a MutationObserver and click it) and keeps its progress in sessionStorage, which is per tab. TabPool switches between the tabs
+round-robin, starting a date in every idle tab and polling the busy ones, so the server waits
+of all tabs overlap.
+
+A date the in-page flow cannot finish (day not found, form or step did not appear) goes on
+through the reporter's Selenium methods in its tab, from the step the page reached, like
+batch_submit.py does. The step timings of the in-page flow go to the run log as submit_step
+spans; the locator stats and DOM snapshots only see the dates that fell back to Selenium.
+"""
+import json
+import time
+from collections import deque
+
+from selenium.common.exceptions import WebDriverException
+
+from locators import SUBMIT_SEQUENCE
+from page_scripts import CALENDAR_JS, FIND_TEXT_JS
+
+PROGRESS_KEY = 'attendanceTabFlow'
+
+# Seconds between polling rounds when no tab had news
+POLL_INTERVAL = 0.05
+
+TAB_FLOW_SCRIPT = FIND_TEXT_JS + CALENDAR_JS + """
+var day = arguments[0];
+var steps = arguments[1];
+var timeoutMs = arguments[2];
+var progressKey = arguments[3];
+var token = arguments[4];
+var started = performance.now();
+var results = [];
+
+function save(state, step, error) {
+    sessionStorage.setItem(progressKey, JSON.stringify({token: token, state: state, step: step, results: results,
+        error: error || null, ms: Math.round(performance.now() - started)}));
+}
+
+save('running', 0);
+(async function() {
+    var cell = findDay(day, true);
+    if (!cell) return save('missing', 0);
+    if (cell.disabled) return save('disabled', 0);
+    if (cell.reported) return save('reported', 0);
+    cell.element.scrollIntoView({block: 'center'});
+    cell.element.click();
+    // the first step's button is the report form
+    for (var i = 0; i < steps.length; i++) {
+        var stepStarted = performance.now();
+        try {
+            var el = await waitForText(steps[i][0], timeoutMs);
+        } catch (e) {
+            results.push({step: steps[i][1], ok: false, ms: Math.round(performance.now() - stepStarted)});
+            return save('failed', i, String(e && e.message || e));
+        }
+        results.push({step: steps[i][1], ok: true, ms: Math.round(performance.now() - stepStarted)});
+        save('running', i + 1);
+        el.scrollIntoView({block: 'center'});
+        el.click();
+    }
+    // the last click sends the report; done once its button is gone
+    try {
+        await waitFor(function() { return !el.isConnected || el.offsetParent === null; }, "the submit to finish", timeoutMs);
+    } catch (e) {
+        return save('failed', steps.length, String(e && e.message || e));
+    }
+    save('done', steps.length);
+})();
+return true;
+"""
+
+PROGRESS_SCRIPT = "return sessionStorage.getItem(arguments[0]);"
+
+
+class Tab:
+    """One browser tab of the pool and the reporter's calendar state in it"""
+
+    def __init__(self, index, handle):
+        self.index = index
+        self.handle = handle
+        self.shown_month = None
+        self.calendar_index = None
+        self.calendar_signature = None
+        self.date = None
+        self.token = None
+        self.started = None
+        self.deadline = None
+
+
+class TabPool:
+    def __init__(self, reporter, tab_count):
+        """reporter is an AttendanceReporter whose current window already shows the calendar"""
+        self.reporter = reporter
+        self.driver = reporter.driver
+        self.tab_count = tab_count
+        self.step_timeout = reporter.waits.step_waits['submit_step']['timeout']
+        first = Tab(0, self.driver.current_window_handle)
+        self.tabs = [first]
+        self.current = first
+        self.save_state(first)
+
+    def save_state(self, tab):
+        tab.shown_month = self.reporter.shown_month
+        tab.calendar_index = self.reporter.calendar_index
+        tab.calendar_signature = self.reporter.calendar_signature
+
+    def load_state(self, tab):
+        """Switch the driver to tab and give the reporter that tab's calendar state"""
+        self.driver.switch_to.window(tab.handle)
+        self.current = tab
+        self.reporter.shown_month = tab.shown_month
+        self.reporter.calendar_index = tab.calendar_index
+        self.reporter.calendar_signature = tab.calendar_signature
+
+    def use(self, tab):
+        """Switch to tab unless the driver is on it already"""
+        if tab is not self.current:
+            self.save_state(self.current)
+            self.load_state(tab)
+
+    def open_tabs(self, wanted):
+        """Open tabs up to wanted (at most tab_count), each on the calendar. Returns how many are open"""
+        wanted = min(wanted, self.tab_count)
+        while len(self.tabs) < wanted:
+            self.save_state(self.current)
+            self.driver.switch_to.new_window('tab')
+            tab = Tab(len(self.tabs), self.driver.current_window_handle)
+            self.current = tab
+            self.reporter.shown_month = self.reporter.calendar_index = self.reporter.calendar_signature = None
+            if not self.reporter.open_calendar():
+                print(f"Tab {tab.index} could not open the calendar, going on with {len(self.tabs)} tabs")
+                self.driver.close()
+                self.load_state(self.tabs[0])
+                break
+            self.tabs.append(tab)
+            print(f"Tab {tab.index} opened the calendar")
+        return len(self.tabs)
+
+    def show_month(self, tab, month):
+        """Move tab's calendar to month"""
+        self.use(tab)
+        if self.reporter.shown_month == month:
+            return True
+        return self.reporter.retry_step('show_month', self.reporter.show_month, month)
+
+    def start(self, tab, date):
+        """Start the in-page flow of date in tab"""
+        self.use(tab)
+        tab.date = date
+        tab.token = f"{date.isoformat()}@{time.monotonic():.3f}"
+        tab.started = time.monotonic()
+        # every step may take its timeout, plus the wait for the submit to finish
+        tab.deadline = tab.started + self.step_timeout * (len(SUBMIT_SEQUENCE) + 1) + 5
+        print(f"Tab {tab.index}: processing date {date.strftime('%d/%m/%Y')}")
+        self.driver.execute_script(TAB_FLOW_SCRIPT, date.day, [list(step) for step in SUBMIT_SEQUENCE],
+                                   int(self.step_timeout * 1000), PROGRESS_KEY, tab.token)
+
+    def progress(self, tab):
+        """The flow state of tab's date, or None when the page lost it (e.g. it navigated)"""
+        self.use(tab)
+        raw = self.driver.execute_script(PROGRESS_SCRIPT, PROGRESS_KEY)
+        state = json.loads(raw) if raw else None
+        return state if state and state.get('token') == tab.token else None
+
+    def finish(self, tab, state):
+        """The status of tab's date, going on in Selenium where the in-page flow stopped"""
+        reporter, date = self.reporter, tab.date
+        outcome = state['state'] if state else 'lost'
+        for step in (state or {}).get('results', []):
+            reporter.tracer.record('submit_step', step['ms'] / 1000, 'ok' if step['ok'] else 'failed',
+                                   button=step['step'], strategy='in_page', tab=tab.index, date=date)
+        if outcome == 'done':
+            # the calendar of this tab changed under the index
+            reporter.calendar_index = None
+            return 'reported'
+        if outcome in ('disabled', 'reported'):
+            print(f"Tab {tab.index}: date {date.day} is {outcome} in the calendar")
+            return 'not selectable'
+        step = state['step'] if state else 0
+        print(f"Tab {tab.index}: in-page flow of {date.strftime('%d/%m/%Y')} stopped ({outcome}"
+              f"{', ' + state['error'] if state and state.get('error') else ''}), going on step by step")
+        reporter.calendar_index = None
+        if step == 0:
+            if outcome == 'missing' and reporter.missing_from_calendar(date):
+                print(f"Tab {tab.index}: date {date.day} is not in the calendar")
+                return 'not in calendar'
+            if not reporter.retry_step('select_date', reporter.find_and_click_date, date,
+                                       give_up=lambda: reporter.day_is_final(date)):
+                return 'not selectable'
+        elif step >= len(SUBMIT_SEQUENCE):
+            # every button was clicked, only the wait for the submit to finish timed out
+            reporter.waits.settled('submit_step')
+            return 'reported'
+        if reporter.submit_report_steps(step):
+            return 'reported'
+        # leave the half-finished form for the next date
+        reporter.open_calendar()
+        return 'submit failed'
+
+    def report(self, month, dates, on_start, on_done, before_start=None):
+        """Report the dates of month spread over the tabs. Returns the dates no tab could start.
+
+        on_start(date) is called before a date starts, on_done(date, status, seconds, tab index)
+        after it finished, before_start() (e.g. a watchdog check) before every date.
+        """
+        waiting = deque(dates)
+        self.open_tabs(len(dates))
+        tabs = [tab for tab in self.tabs if self.show_month(tab, month)]
+        while tabs and (waiting or any(tab.date for tab in tabs)):
+            news = False
+            for tab in list(tabs):
+                if tab.date is None:
+                    if not waiting:
+                        continue
+                    if before_start:
+                        before_start()
+                    # a fallback may have reopened the calendar on the current month
+                    if not self.show_month(tab, month):
+                        tabs.remove(tab)
+                        continue
+                    date = waiting.popleft()
+                    on_start(date)
+                    self.start(tab, date)
+                    news = True
+                    continue
+                state = self.progress(tab)
+                if state and state['state'] == 'running' and time.monotonic() < tab.deadline:
+                    continue
+                date = tab.date
+                status = self.finish(tab, state)
+                on_done(date, status, time.monotonic() - tab.started, tab.index)
+                tab.date = None
+                news = True
+            if not news:
+                time.sleep(POLL_INTERVAL)
+        return list(waiting)
+
+    def close(self):
+        """Close every tab but the first and switch back to it"""
+        self.save_state(self.current)
+        for tab in self.tabs[1:]:
+            try:
+                self.driver.switch_to.window(tab.handle)
+                self.driver.close()
+            except WebDriverException:
+                continue
+        self.tabs = self.tabs[:1]
+        try:
+            self.load_state(self.tabs[0])
+        except WebDriverException:
+            pass
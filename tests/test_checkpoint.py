@@ -0,0 +1,67 @@
+"""Checkpointed reporting jobs."""
+import json
+import os
+from datetime import date, timedelta
+
+from checkpoint import MAX_DATE_ATTEMPTS, JobCheckpoint, checkpoint_path
+
+
+def test_checkpoint_resumes_remaining_dates(tmp_path):
+    tomorrow = date.today() + timedelta(days=1)
+    later = tomorrow + timedelta(days=1)
+    job = JobCheckpoint('user', [tomorrow, later], checkpoint_path('user', str(tmp_path)))
+    job.mark(tomorrow, 'reported')
+
+    resumed = JobCheckpoint.resume('user', [], str(tmp_path))
+
+    assert resumed.job_id == job.job_id
+    assert resumed.remaining() == [later]
+
+
+def test_checkpoint_drops_past_dates_unless_asked_again(tmp_path):
+    yesterday, last_week = date.today() - timedelta(days=1), date.today() - timedelta(days=7)
+    tomorrow = date.today() + timedelta(days=1)
+    path = checkpoint_path('user', str(tmp_path))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'job_id': 'old', 'dates': [d.isoformat() for d in (last_week, yesterday, tomorrow)],
+                   'statuses': {last_week.isoformat(): 'submit failed'},
+                   'attempts': {last_week.isoformat(): 1}}, f)
+
+    resumed = JobCheckpoint.resume('user', [yesterday], str(tmp_path))
+
+    assert resumed.dates == [yesterday, tomorrow]
+    assert resumed.statuses == {} and resumed.attempts == {}
+
+
+def test_checkpoint_gives_up_after_max_attempts(tmp_path):
+    day = date.today() + timedelta(days=1)
+    job = JobCheckpoint('user', [day], checkpoint_path('user', str(tmp_path)))
+    for _ in range(MAX_DATE_ATTEMPTS - 1):
+        job.mark(day, 'submit failed')
+    assert job.remaining() == [day]
+
+    job.mark(day, 'submit failed')
+
+    assert job.remaining() == []
+    assert job.finish()
+    assert not os.path.exists(job.path)
+
+
+def test_done_dates_stay_done(tmp_path):
+    day = date.today() + timedelta(days=1)
+    job = JobCheckpoint('user', [day], checkpoint_path('user', str(tmp_path)))
+    job.mark(day, 'submit failed')
+    job.mark(day, 'calendar reported')
+
+    assert job.remaining() == []
+    assert job.attempts == {day: 1}
+
+
+def test_unreadable_checkpoint_starts_a_new_job(tmp_path):
+    day = date.today() + timedelta(days=1)
+    with open(checkpoint_path('user', str(tmp_path)), 'w', encoding='utf-8') as f:
+        f.write('{')
+
+    job = JobCheckpoint.resume('user', [day], str(tmp_path))
+
+    assert job.remaining() == [day]
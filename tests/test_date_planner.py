@@ -0,0 +1,77 @@
+"""Which dates to report: workdays, holidays and month grouping."""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from date_planner import default_range, group_by_month, is_workday, load_exceptions, parse_month_title, plan_dates
+
+# Thursday 2026-10-01 through Sunday 2026-10-11
+SUNDAY = date(2026, 10, 4)
+FRIDAY = date(2026, 10, 9)
+
+
+@pytest.fixture
+def holidays(tmp_path):
+    path = tmp_path / 'holidays.txt'
+    path.write_text("# חגים\n"
+                    "2026-10-05..2026-10-06  סוכות\n"
+                    "+2026-10-09             Friday reported as a workday\n", encoding='utf-8')
+    return str(path)
+
+
+def test_plan_skips_weekend_and_holidays(holidays):
+    planned = plan_dates(date(2026, 10, 1), date(2026, 10, 11), holidays)
+
+    assert planned == [date(2026, 10, 1), SUNDAY, date(2026, 10, 7), date(2026, 10, 8), FRIDAY,
+                       date(2026, 10, 11)]
+
+
+def test_plan_without_exceptions_file(tmp_path):
+    planned = plan_dates(date(2026, 10, 1), date(2026, 10, 11), str(tmp_path / 'missing.txt'))
+
+    assert planned == [date(2026, 10, 1)] + [SUNDAY + timedelta(days=n) for n in range(5)] + [date(2026, 10, 11)]
+
+
+def test_plan_open_end_stops_on_thursday(tmp_path):
+    planned = plan_dates(SUNDAY, holidays_file=str(tmp_path / 'missing.txt'))
+
+    assert planned[0] == SUNDAY
+    assert planned[-1] == date(2026, 10, 8)
+    assert default_range(datetime(2026, 10, 8, 9, 30)) == (date(2026, 10, 8), date(2026, 10, 8))
+
+
+def test_plan_rejects_reversed_range(tmp_path):
+    with pytest.raises(ValueError):
+        plan_dates(date(2026, 10, 8), SUNDAY, str(tmp_path / 'missing.txt'))
+
+
+def test_bad_exceptions_line_names_the_line(tmp_path):
+    path = tmp_path / 'holidays.txt'
+    path.write_text("2026-10-05\n05/10/2026\n", encoding='utf-8')
+
+    with pytest.raises(ValueError, match=':2:'):
+        load_exceptions(str(path))
+
+
+def test_group_by_month_sorts_and_dedupes():
+    groups = group_by_month([date(2026, 11, 1), datetime(2026, 10, 29, 8), date(2026, 10, 29)])
+
+    assert groups == {(2026, 10): [date(2026, 10, 29)], (2026, 11): [date(2026, 11, 1)]}
+
+
+@pytest.mark.parametrize('title, month', [
+    ('אוקטובר 2026', (2026, 10)),
+    ('October 2026', (2026, 10)),
+    ('10/2026', (2026, 10)),
+    ('13/2026', None),
+    ('דיווח נוכחות', None),
+])
+def test_parse_month_title(title, month):
+    assert parse_month_title(title) == month
+
+
+def test_extra_workday_beats_day_off():
+    exceptions = ({FRIDAY}, {FRIDAY})
+
+    assert is_workday(FRIDAY, exceptions)
+    assert not is_workday(datetime(2026, 10, 10, 8), exceptions)
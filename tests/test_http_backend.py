@@ -0,0 +1,110 @@
+"""HttpAttendanceReporter against mock_site.py, served on a free local port."""
+from datetime import date, timedelta
+
+import pytest
+
+from http_backend import HttpAttendanceReporter, RequestFailed
+from mock_site import SESSION_COOKIE, MockAttendanceSite, workdays_of_month
+
+GOOD_COOKIES = [{'name': SESSION_COOKIE[0], 'value': SESSION_COOKIE[1]}]
+
+
+def next_month_workdays():
+    first = (date.today().replace(day=1) + timedelta(days=32)).replace(day=1)
+    return workdays_of_month(first.strftime('%Y-%m'))
+
+
+@pytest.fixture
+def site():
+    with MockAttendanceSite() as site:
+        yield site
+
+
+def reporter_for(site, **options):
+    options.setdefault('cookies', GOOD_COOKIES)
+    return HttpAttendanceReporter(base_url=site.url, cookie_file=None, **options)
+
+
+def test_round_trip(site):
+    open_day, disabled_day, reported_day = next_month_workdays()[:3]
+    site.disabled_days.add(disabled_day)
+    site.reported[reported_day] = {}
+
+    results = reporter_for(site).report_attendance([open_day, disabled_day, reported_day])
+
+    assert results == {open_day: 'reported', disabled_day: 'disabled', reported_day: 'already reported'}
+    assert site.reported[open_day]['date'] == open_day.isoformat()
+
+
+def test_refused_submit_fails_the_date(site):
+    site.submit_failure_rate = 1.0
+    day = next_month_workdays()[0]
+
+    assert reporter_for(site).report_attendance([day]) == {day: 'failed'}
+    assert day not in site.reported
+
+
+def test_disabled_day_is_refused(site):
+    day = next_month_workdays()[0]
+    site.disabled_days.add(day)
+
+    assert reporter_for(site).submit_date(day) is False
+
+
+def test_date_missing_from_calendar_is_unknown(site, monkeypatch):
+    kept, missing = next_month_workdays()[:2]
+    month_days = site.month_days
+    monkeypatch.setattr(site, 'month_days',
+                        lambda month: [d for d in month_days(month) if d['date'] != missing.isoformat()])
+
+    results = reporter_for(site).report_attendance([kept, missing])
+
+    assert results == {kept: 'reported', missing: 'unknown'}
+    assert missing not in site.reported
+
+
+def test_error_status_falls_back(site):
+    days = next_month_workdays()[:2]
+    reporter = reporter_for(site, endpoints={'calendar': '/api/missing'}, fallback=lambda dates: {'fallback': dates})
+
+    assert reporter.report_attendance(days) == {'fallback': days}
+
+
+def test_html_answer_falls_back_without_new_cookies(site, monkeypatch):
+    days = next_month_workdays()[:1]
+    # the page instead of the API, like the real site answers the mock's endpoints
+    reporter = reporter_for(site, endpoints={'calendar': '/finish'}, fallback=lambda dates: {'fallback': dates})
+    monkeypatch.setattr(reporter, 'refresh_cookies', lambda: pytest.fail("cookies harvested again"))
+
+    assert reporter.report_attendance(days) == {'fallback': days}
+
+
+def test_error_status_without_fallback_raises(site):
+    reporter = reporter_for(site, endpoints={'calendar': '/api/missing'})
+
+    with pytest.raises(RequestFailed) as failure:
+        reporter.report_attendance(next_month_workdays()[:1])
+    assert failure.value.status == 404
+
+
+def test_rejected_session_is_refreshed_once(site, monkeypatch):
+    day = next_month_workdays()[0]
+    reporter = reporter_for(site, cookies=[{'name': SESSION_COOKIE[0], 'value': 'expired'}])
+    refreshed = []
+
+    def refresh_cookies():
+        refreshed.append(True)
+        reporter.cookies = GOOD_COOKIES
+    monkeypatch.setattr(reporter, 'refresh_cookies', refresh_cookies)
+
+    assert reporter.report_attendance([day]) == {day: 'reported'}
+    assert refreshed == [True]
+
+
+def test_rejected_session_falls_back(site, monkeypatch):
+    day = next_month_workdays()[0]
+    reporter = reporter_for(site, cookies=[{'name': SESSION_COOKIE[0], 'value': 'expired'}],
+                            fallback=lambda dates: {d: 'browser' for d in dates})
+    monkeypatch.setattr(reporter, 'refresh_cookies', lambda: None)
+
+    assert reporter.report_attendance([day]) == {day: 'browser'}
@@ -0,0 +1,37 @@
+"""The SQLite ledger of submitted dates."""
+from datetime import date, timedelta
+
+from ledger import Ledger
+
+SUNDAY = date(2026, 10, 4)
+
+
+def test_ledger_confirms_reported_dates(tmp_path):
+    ledger = Ledger(str(tmp_path / 'ledger.sqlite3'))
+    try:
+        first, second, third = SUNDAY, SUNDAY + timedelta(days=1), SUNDAY + timedelta(days=2)
+        ledger.record('user', first, 'submit failed')
+        ledger.record('user', first, 'reported')
+        ledger.record('user', second, 'submit failed')
+        ledger.record('other', third, 'reported')
+
+        assert ledger.status('user', first) == 'reported'
+        assert ledger.pending('user', [third, second, first]) == [third, second]
+        assert ledger.reconcile('user', [first, second]) == [second]
+        assert ledger.status('user', second) == 'calendar reported'
+        assert ledger.confirmed('user', []) == set()
+    finally:
+        ledger.close()
+
+
+def test_ledger_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / 'ledger.sqlite3')
+    writer, reader = Ledger(path), Ledger(path)
+    try:
+        writer.record('user', SUNDAY, 'reported')
+
+        assert reader.confirmed('user', [SUNDAY]) == {SUNDAY}
+        assert reader.connection.execute("SELECT COUNT(*) FROM submission_log").fetchone()[0] == 1
+    finally:
+        writer.close()
+        reader.close()
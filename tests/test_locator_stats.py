@@ -0,0 +1,84 @@
+"""Ranking and decay of the locator strategy stats."""
+import json
+
+import pytest
+
+from locator_stats import LocatorRegistry
+
+STRATEGIES = [('td_text', "//td[text()='12']"), ('aria_label', "//*[@aria-label[contains(., '12')]]")]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return LocatorRegistry(str(tmp_path / 'locator_stats.json'))
+
+
+def names(strategies):
+    return [name for name, _ in strategies]
+
+
+def test_unseen_strategies_keep_their_order(registry):
+    assert names(registry.ranked('date_cell', STRATEGIES)) == ['td_text', 'aria_label']
+
+
+def test_faster_working_strategy_goes_first(registry):
+    registry.record('date_cell', 'td_text', True, 0.9)
+    registry.record('date_cell', 'aria_label', True, 0.1)
+
+    assert names(registry.ranked('date_cell', STRATEGIES)) == ['aria_label', 'td_text']
+
+
+def test_layout_change_reranks(registry):
+    for _ in range(5):
+        registry.record('date_cell', 'td_text', True, 0.1)
+    assert names(registry.ranked('date_cell', STRATEGIES)) == ['td_text', 'aria_label']
+
+    # the cells lose their text, the former favourite keeps failing
+    for _ in range(3):
+        registry.record('date_cell', 'td_text', False, 2.0)
+    assert names(registry.ranked('date_cell', STRATEGIES)) == ['aria_label', 'td_text']
+
+    registry.record('date_cell', 'aria_label', True, 0.3)
+    assert names(registry.ranked('date_cell', STRATEGIES)) == ['aria_label', 'td_text']
+
+
+def test_old_successes_decay(tmp_path):
+    decaying = LocatorRegistry(str(tmp_path / 'decaying.json'))
+    lasting = LocatorRegistry(str(tmp_path / 'lasting.json'), decay=1.0)
+    for registry in (decaying, lasting):
+        for _ in range(5):
+            registry.record('date_cell', 'td_text', True, 0.1)
+        for _ in range(3):
+            registry.record('date_cell', 'td_text', False, 2.0)
+
+    # without decay five old successes still outweigh three recent failures
+    assert lasting.success_rate(lasting.entry('date_cell', 'td_text')) == pytest.approx(0.6)
+    assert decaying.success_rate(decaying.entry('date_cell', 'td_text')) < 0.5
+
+
+def test_latency_follows_recent_samples(registry):
+    registry.record('date_cell', 'td_text', True, 1.0)
+    for _ in range(10):
+        registry.record('date_cell', 'td_text', True, 0.1)
+
+    record = registry.entry('date_cell', 'td_text')
+    assert record['latency'] < 0.2
+    assert record['last_latency'] == 0.1
+
+
+def test_stats_survive_a_restart(registry):
+    registry.record('date_cell', 'aria_label', True, 0.1)
+    registry.save()
+
+    reloaded = LocatorRegistry(registry.path)
+
+    assert names(reloaded.ranked('date_cell', STRATEGIES)) == ['aria_label', 'td_text']
+    with open(registry.path, encoding='utf-8') as f:
+        assert json.load(f) == registry.stats
+
+
+def test_corrupt_stats_file_starts_empty(tmp_path):
+    path = tmp_path / 'locator_stats.json'
+    path.write_text('{not json', encoding='utf-8')
+
+    assert LocatorRegistry(str(path)).stats == {}
@@ -0,0 +1,33 @@
+"""Lean page-load options and blocked URL patterns."""
+from selenium.webdriver.chrome.options import Options
+
+from page_load import DEFAULT_BLOCKED_URLS, apply_lean_options, blocked_patterns
+
+
+def lean_options(**options):
+    chrome_options = Options()
+    apply_lean_options(chrome_options, **options)
+    return chrome_options
+
+
+def test_images_off_when_blocked():
+    options = lean_options(resource_types=['image', 'font'])
+
+    assert '--blink-settings=imagesEnabled=false' in options.arguments
+    assert options.experimental_options['prefs']['profile.managed_default_content_settings.images'] == 2
+
+
+def test_images_on_when_not_blocked():
+    options = lean_options(page_load_strategy='none', resource_types=['font'])
+
+    assert options.page_load_strategy == 'none'
+    assert not any('imagesEnabled' in argument for argument in options.arguments)
+    assert 'profile.managed_default_content_settings.images' not in options.experimental_options['prefs']
+
+
+def test_blocked_patterns():
+    patterns = blocked_patterns(['font'], ['*ads.example*'])
+
+    assert '*.woff2' in patterns and '*ads.example*' in patterns
+    assert '*.png' not in patterns
+    assert blocked_patterns([], DEFAULT_BLOCKED_URLS) == DEFAULT_BLOCKED_URLS
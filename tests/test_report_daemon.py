@@ -0,0 +1,70 @@
+"""The report daemon: its weekly schedule, its profile and a failed start."""
+from datetime import datetime
+
+import pytest
+
+import browser_profile
+from browser_profile import DAEMON_PROFILE_DIR, has_session, prepare_profile
+from report_daemon import ReportDaemon, WeeklySchedule, parse_days
+
+
+def test_parse_days():
+    assert parse_days('sun-thu') == {6, 0, 1, 2, 3}
+    assert parse_days('fri-sun') == {4, 5, 6}
+    assert parse_days('sun,wed') == {6, 2}
+    assert parse_days('*') == set(range(7))
+
+
+def test_schedule_next_after():
+    schedule = WeeklySchedule(['sun-thu 08:00', 'fri 10:15'], jitter=0)
+
+    # Thursday evening -> Friday morning, Friday after 10:15 -> Sunday
+    assert schedule.next_after(datetime(2026, 10, 8, 18, 0)) == datetime(2026, 10, 9, 10, 15)
+    assert schedule.next_after(datetime(2026, 10, 9, 10, 15)) == datetime(2026, 10, 11, 8, 0)
+    assert schedule.next_after(datetime(2026, 10, 11, 7, 59)) == datetime(2026, 10, 11, 8, 0)
+
+
+def test_schedule_rejects_bad_entries():
+    with pytest.raises(ValueError):
+        WeeklySchedule(['sunday at 8'])
+    with pytest.raises(ValueError):
+        WeeklySchedule(['someday 08:00'])
+
+
+def test_daemon_profile_is_seeded_from_the_lean_profile(tmp_path, monkeypatch):
+    lean, everyday = tmp_path / 'chrome_profile', tmp_path / 'User Data'
+    (lean / 'Default' / 'Network').mkdir(parents=True)
+    (lean / 'Default' / 'Network' / 'Cookies').write_text('lean session')
+    (everyday / 'Default').mkdir(parents=True)
+    (everyday / 'Default' / 'Cookies').write_text('everyday session')
+    monkeypatch.setattr(browser_profile, 'LEAN_PROFILE_DIR', str(lean))
+    monkeypatch.setattr(browser_profile, 'EVERYDAY_PROFILE_DIR', str(everyday))
+
+    profile = prepare_profile(str(tmp_path / 'chrome_profile_daemon'))
+
+    assert has_session(profile)
+    assert (tmp_path / 'chrome_profile_daemon' / 'Default' / 'Network' / 'Cookies').read_text() == 'lean session'
+    assert not (tmp_path / 'chrome_profile_daemon' / 'Default' / 'Cookies').exists()
+
+
+@pytest.fixture
+def daemon():
+    daemon = ReportDaemon(WeeklySchedule(['sun 07:30'], jitter=0), {'lean_page_load': True}, port=0)
+    yield daemon
+    daemon.server.server_close()
+
+
+def test_daemon_runs_on_its_own_profile(daemon):
+    assert daemon.reporter_options == {'lean_profile_dir': DAEMON_PROFILE_DIR, 'lean_page_load': True,
+                                       'persistent': True}
+
+
+def test_failed_start_is_not_hidden(daemon, monkeypatch):
+    class BrokenReporter:
+        def __init__(self, **options):
+            raise RuntimeError('user data directory is already in use')
+    monkeypatch.setattr(daemon.public, 'AttendanceReporter', BrokenReporter)
+
+    with pytest.raises(RuntimeError, match='already in use'):
+        daemon.serve_forever()
+    assert daemon.state['state'] == 'stopping'
@@ -0,0 +1,68 @@
+"""AttendanceReporter.report_date for days the calendar does not show, with a fake driver."""
+from datetime import date
+
+import pytest
+
+from ledger import Ledger
+from page_scripts import CALENDAR_SCAN_SCRIPT, CALENDAR_SIGNATURE_SCRIPT
+from script_loader import load_public_script
+
+OCTOBER = (2026, 10)
+
+
+class FakeDriver:
+    """Answers the calendar scripts with the given day numbers"""
+
+    def __init__(self, days):
+        self.days = days
+        self.scans = 0
+
+    def execute_script(self, script, *args):
+        if script == CALENDAR_SCAN_SCRIPT:
+            self.scans += 1
+            return {'signature': 'october', 'cells': [{'day': day, 'element': None, 'disabled': False,
+                                                        'reported': False} for day in self.days]}
+        if script == CALENDAR_SIGNATURE_SCRIPT:
+            return 'october'
+        raise AssertionError(f"unexpected script {script[:40]!r}")
+
+
+@pytest.fixture
+def reporter(tmp_path):
+    """An AttendanceReporter without a browser, on the calendar of October 2026"""
+    reporter = object.__new__(load_public_script().AttendanceReporter)
+    reporter.driver = FakeDriver([1, 4, 5, 6, 7, 8])
+    reporter.shown_month = OCTOBER
+    reporter.calendar_index = None
+    reporter.calendar_signature = None
+    reporter.account = 'user'
+    reporter.results = {}
+    reporter.ledger = Ledger(str(tmp_path / 'ledger.sqlite3'))
+    reporter.find_and_click_date = lambda day: pytest.fail("the XPath strategies were tried")
+    yield reporter
+    reporter.ledger.close()
+
+
+def test_missing_day_is_not_retried(reporter):
+    assert reporter.report_date(date(2026, 10, 9)) == 'not in calendar'
+    assert reporter.ledger.status('user', date(2026, 10, 9)) == 'not in calendar'
+
+
+def test_missing_day_is_checked_on_a_fresh_scan(reporter):
+    reporter.build_calendar_index()
+    # the calendar showed the day after the first scan
+    reporter.driver.days.append(9)
+
+    assert not reporter.missing_from_calendar(date(2026, 10, 9))
+    assert reporter.driver.scans == 2
+
+
+def test_scan_without_cells_proves_nothing(reporter):
+    reporter.driver.days = []
+
+    assert not reporter.missing_from_calendar(date(2026, 10, 9))
+
+
+def test_other_month_is_not_judged(reporter):
+    assert not reporter.missing_from_calendar(date(2026, 11, 9))
+    assert reporter.driver.scans == 0
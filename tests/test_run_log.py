@@ -0,0 +1,85 @@
+"""Run log spans: writing, rotation, reading back and the per-step summary."""
+import json
+
+import pytest
+
+from run_log import Tracer, read_spans, rotate_log, summarize, traced
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'attendance_report.log')
+
+
+def span(step, ms, outcome='ok', run='run-1', **fields):
+    return dict(step=step, duration_ms=ms, outcome=outcome, run=run, **fields)
+
+
+def test_tracer_writes_context_and_outcomes(log_path):
+    class Bot:
+        tracer = Tracer(log_path, run_id='run-1', account='user')
+
+        @traced('navigate')
+        def navigate(self, works):
+            return works
+
+    Bot().navigate(True)
+    Bot().navigate(False)
+    with pytest.raises(RuntimeError):
+        with Bot.tracer.span('submit_step', button='Confirm', date=None):
+            raise RuntimeError('gone')
+
+    spans = read_spans(log_path)
+    assert [(s['step'], s['outcome']) for s in spans] == [('navigate', 'ok'), ('navigate', 'failed'),
+                                                          ('submit_step', 'error')]
+    assert all(s['run'] == 'run-1' and s['account'] == 'user' for s in spans)
+    assert spans[2]['error'] == 'gone' and spans[2]['button'] == 'Confirm' and 'date' not in spans[2]
+
+
+def test_summary_groups_by_step_locator_and_strategy():
+    spans = [span('locate', ms, locator='date_cell', strategy='td_text') for ms in (10, 20, 30, 40, 50)]
+    spans += [span('locate', 900, 'failed', locator='date_cell', strategy='aria_label')]
+    spans += [span('submit_step', 100, button='Confirm'), span('submit_step', 300, 'error', button='Confirm')]
+
+    summary = summarize(spans)
+
+    assert set(summary) == {'locate date_cell [td_text]', 'locate date_cell [aria_label]', 'submit_step Confirm'}
+    count, p50, p95, failure_rate, total = summary['locate date_cell [td_text]']
+    assert (count, p50, failure_rate, total) == (5, 30, 0, 150)
+    assert p95 == pytest.approx(48)
+    assert summary['locate date_cell [aria_label]'] == (1, 900, 900, 1.0, 900)
+    assert summary['submit_step Confirm'][3] == 0.5
+
+
+def test_summary_of_the_last_runs():
+    spans = [span('navigate', 100, run='old'), span('navigate', 200, run='middle'), span('navigate', 300, run='new')]
+
+    assert summarize(spans, last_runs=2)['navigate'][0] == 2
+    assert summarize(spans, last_runs=2)['navigate'][4] == 500
+
+
+def test_reads_across_rotated_files_oldest_first(log_path):
+    tracer = Tracer(log_path, run_id='run-1')
+    for batch in range(3):
+        for index in range(20):
+            tracer.record('navigate', 0.1, 'ok', batch=batch, index=index)
+        assert rotate_log(log_path, max_bytes=100, backups=5)
+    tracer.record('navigate', 0.1, 'ok', batch=3, index=0)
+    with open(log_path + '.1', 'a', encoding='utf-8') as f:
+        f.write('not json\n')
+    with open(log_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(span('stray', 1)) + '\n')
+
+    spans = read_spans(log_path)
+
+    assert [(s['batch'], s['index']) for s in spans] == [(b, i) for b in range(3) for i in range(20)] + [(3, 0)]
+
+
+def test_rotation_keeps_the_newest_backups(log_path):
+    tracer = Tracer(log_path, run_id='run-1')
+    for batch in range(4):
+        tracer.record('navigate', 0.1, 'ok', batch=batch)
+        rotate_log(log_path, max_bytes=10, backups=2)
+
+    assert [s['batch'] for s in read_spans(log_path)] == [2, 3]
+    assert not rotate_log(log_path, max_bytes=10, backups=2)
@@ -0,0 +1,94 @@
+"""DOM snapshots: recording and loading them, the XPath evaluator of snapshot_replay.py and the replay."""
+import pytest
+
+from dom_snapshot import HIDDEN_ATTRIBUTE, SnapshotRecorder, load_snapshots
+from snapshot_replay import XPathError, mock_snapshots, parse_html, replay, select, try_strategy
+
+PAGE = f"""
+<div class="calendar">
+  <table>
+    <tr><td class="day disabled">1</td><td class="day">  2 </td><td class="day" {HIDDEN_ATTRIBUTE}>3</td></tr>
+  </table>
+  <button aria-label="יום 12" data-day="12"></button>
+</div>
+<div id="flow"><button disabled>שליחת דיווח</button><button>אישור וסיום</button></div>
+"""
+
+
+@pytest.fixture
+def document():
+    return parse_html(PAGE)
+
+
+def texts(nodes):
+    return [node.string_value().strip() for node in nodes]
+
+
+@pytest.mark.parametrize('xpath, expected', [
+    ("//td", ['1', '2', '3']),
+    ("//td[normalize-space(.)='2']", ['2']),
+    ("//td[not(contains(@class, 'disabled'))]", ['2', '3']),
+    ("//td[2]", ['2']),
+    ("//*[contains(@class, 'calendar')]//td[starts-with(normalize-space(text()), '1')]", ['1']),
+    ("//button[contains(text(), 'אישור')]/..", ['שליחת דיווחאישור וסיום']),
+    ("//td[text()='1' and ancestor::*[contains(@class, 'calendar')]]", ['1']),
+    ("//td[text()='7'] | //button[@disabled]", ['שליחת דיווח']),
+])
+def test_select(document, xpath, expected):
+    assert texts(select(xpath, document)) == expected
+
+
+def test_select_attribute(document):
+    labels = select("//*[@aria-label[contains(., '12')]]/@aria-label", document)
+
+    assert [label.string_value() for label in labels] == ['יום 12']
+
+
+def test_select_needs_a_node_set(document):
+    with pytest.raises(XPathError):
+        select("count(//td)", document)
+
+
+def test_try_strategy(document):
+    # disabled and unrendered elements are found but do not count as clickable
+    assert try_strategy(document, "//button[text()='שליחת דיווח']", 'clickable')[:2] == (False, 1)
+    assert try_strategy(document, "//button[text()='אישור וסיום']", 'clickable')[:2] == (True, 1)
+    assert try_strategy(document, "//td[text()='3']", 'rendered')[:2] == (False, 1)
+    # a cell naming another day is a miss
+    assert try_strategy(document, "//*[@aria-label[contains(., '1')]]", 'rendered', day=1)[:2] == (False, 1)
+    assert try_strategy(document, "//td[text()='9']", 'rendered') == (False, 0, None)
+
+
+def test_mock_layouts_replay_cleanly():
+    for snapshot in mock_snapshots('2026-10'):
+        for locator, (required, tries) in replay(snapshot).items():
+            if required:
+                assert any(worked for _, worked, _, _ in tries), f"{snapshot['name']}: {locator}"
+
+
+class FakeDriver:
+    current_url = 'https://example.test/finish'
+
+    def execute_script(self, script):
+        return PAGE
+
+
+def test_recorded_snapshots_load_back(tmp_path):
+    recorder = SnapshotRecorder('run-1', directory=str(tmp_path))
+
+    first = recorder.take(FakeDriver(), 'submit/confirm', kind='button', locator='submit/confirm', text='אישור וסיום')
+    assert recorder.take(FakeDriver(), 'submit/confirm') is None
+    recorder.take(FakeDriver(), 'calendar 2026-10', kind='calendar', days=[2])
+
+    snapshots = load_snapshots([str(tmp_path)])
+    assert [snapshot['name'] for snapshot in snapshots] == ['submit/confirm', 'calendar 2026-10']
+    assert snapshots[0]['path'] == first and snapshots[0]['html'] == PAGE
+
+
+def test_replay_reports_a_renamed_button():
+    snapshot = {'name': 'renamed', 'html': PAGE,
+                'context': {'kind': 'button', 'locator': 'submit/send', 'text': 'שלח דיווח'}}
+
+    required, tries = replay(snapshot)['submit/send']
+
+    assert required and not any(worked for _, worked, _, _ in tries)
@@ -0,0 +1,168 @@
+"""Condition-driven waits for the reporting scripts, built on WebDriverWait.
+
+Instead of fixed time.sleep calls every step waits for something concrete on the page:
+the document being ready, loading overlays gone, the network being idle, an element
+no longer moving or the next button being clickable. Timeouts and poll intervals are
+configured per step. Random human-like pauses are only added when humanize is enabled.
+"""
+import random
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# step name -> timeout and poll interval in seconds
+DEFAULT_STEP_WAITS = {
+    'navigate': {'timeout': 20, 'poll': 0.2},
+    'future_reports': {'timeout': 10, 'poll': 0.1},
+    'date_click': {'timeout': 10, 'poll': 0.1},
+    'submit_step': {'timeout': 10, 'poll': 0.1},
+    'month_change': {'timeout': 10, 'poll': 0.1},
+    'default': {'timeout': 10, 'poll': 0.2},
+}
+
+# How long the network must stay quiet to count as idle
+NETWORK_IDLE_SECONDS = 0.5
+
+# Range of the optional humanising pause in seconds
+HUMAN_PAUSE = (0.4, 1.2)
+
+OVERLAY_SELECTORS = (
+    "[class*='overlay'], [class*='spinner'], [class*='loader'], [class*='loading'], "
+    "[class*='backdrop'], [class*='progress'], [aria-busy='true']"
+)
+
+# Counts in-flight fetch/XHR requests; installed once per document
+NETWORK_PROBE_SCRIPT = """
+if (!window.__attendancePending) {
+    window.__attendancePending = {count: 0};
+    var pending = window.__attendancePending;
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function() {
+            pending.count++;
+            return originalFetch.apply(this, arguments).finally(function() { pending.count--; });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        pending.count++;
+        this.addEventListener('loadend', function() { pending.count--; });
+        return originalSend.apply(this, arguments);
+    };
+}
+return [window.__attendancePending.count, performance.getEntriesByType('resource').length];
+"""
+
+OVERLAY_VISIBLE_SCRIPT = """
+var nodes = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < nodes.length; i++) {
+    var style = window.getComputedStyle(nodes[i]);
+    var rect = nodes[i].getBoundingClientRect();
+    if (style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0'
+            && rect.width > 0 && rect.height > 0) {
+        return true;
+    }
+}
+return false;
+"""
+
+
+def document_ready(driver):
+    """The document finished parsing (images and other subresources may still load)"""
+    return driver.execute_script("return document.readyState") in ('interactive', 'complete')
+
+
+def overlay_gone(driver):
+    """No loading overlay, spinner or busy region is visible"""
+    return not driver.execute_script(OVERLAY_VISIBLE_SCRIPT, OVERLAY_SELECTORS)
+
+
+class network_idle:
+    """No fetch/XHR in flight and no new resource loaded for idle_seconds"""
+
+    def __init__(self, idle_seconds=NETWORK_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.last_state = None
+        self.quiet_since = None
+
+    def __call__(self, driver):
+        pending, resources = driver.execute_script(NETWORK_PROBE_SCRIPT)
+        now = time.monotonic()
+        state = (pending, resources)
+        if pending or state != self.last_state:
+            self.last_state = state
+            self.quiet_since = None if pending else now
+            return False
+        return now - self.quiet_since >= self.idle_seconds
+
+
+class element_stable:
+    """The located element is visible and its position did not change between two polls"""
+
+    def __init__(self, locator):
+        self.locator = locator
+        self.last_rect = None
+
+    def __call__(self, driver):
+        try:
+            element = driver.find_element(*self.locator)
+            if not element.is_displayed():
+                return False
+            rect = element.rect
+        except (StaleElementReferenceException, WebDriverException):
+            self.last_rect = None
+            return False
+        if rect == self.last_rect:
+            return element
+        self.last_rect = rect
+        return False
+
+
+class WaitEngine:
+    def __init__(self, driver, step_waits=None, humanize=False):
+        """step_waits overrides DEFAULT_STEP_WAITS per step; humanize adds random pauses"""
+        self.driver = driver
+        self.step_waits = {step: dict(values) for step, values in DEFAULT_STEP_WAITS.items()}
+        for step, values in (step_waits or {}).items():
+            self.step_waits.setdefault(step, dict(DEFAULT_STEP_WAITS['default'])).update(values)
+        self.humanize = humanize
+
+    def until(self, step, condition, message='', timeout=None):
+        """Wait for condition using the timeout (unless given) and poll interval configured for step"""
+        config = self.step_waits.get(step, self.step_waits['default'])
+        return WebDriverWait(
+            self.driver,
+            config['timeout'] if timeout is None else timeout,
+            poll_frequency=config['poll'],
+            ignored_exceptions=(StaleElementReferenceException,),
+        ).until(condition, message)
+
+    def settled(self, step):
+        """Wait until overlays are gone and the network is idle. Returns False on timeout"""
+        try:
+            self.until(step, overlay_gone, f"{step}: overlay still visible")
+            self.until(step, network_idle(), f"{step}: network not idle")
+            return True
+        except TimeoutException as e:
+            print(f"Page did not settle after {step}: {e.msg}")
+            return False
+
+    def page_ready(self, step='navigate'):
+        """Wait for the document to be ready and the page to settle"""
+        self.until(step, document_ready, f"{step}: document not ready")
+        return self.settled(step)
+
+    def stable(self, step, locator, timeout=None):
+        """Wait for an element to stop moving and return it"""
+        return self.until(step, element_stable(locator), f"{step}: element not stable {locator}", timeout)
+
+    def clickable(self, step, locator, timeout=None):
+        """Wait for the element to be clickable and return it"""
+        return self.until(step, EC.element_to_be_clickable(locator), f"{step}: not clickable {locator}", timeout)
+
+    def human_pause(self):
+        """Random pause between actions, only when humanize mode is on"""
+        if self.humanize:
+            time.sleep(random.uniform(*HUMAN_PAUSE))